@@ -0,0 +1,54 @@
+"""Measures transferred bytes and wall time of paging through a large agent list
+with and without gzip compression.
+
+Usage: python -m benchmarks.bench_compression [--agents N] [--pages N] [--mbps N]
+"""
+import argparse
+import time
+
+import syntropy_sdk as sdk
+from syntropy_sdk import utils as sdk_utils
+
+from benchmarks.standin import StandInServer, agents_payload
+from syntropynac import session
+
+
+def run(server, compression, pages):
+    config = sdk.Configuration()
+    config.host = server.url
+    api = session.create_api_client(
+        config, session.SessionSettings(jobs=1, compression=compression)
+    )
+    agents = sdk.AgentsApi(api)
+
+    server.reset()
+    start = time.perf_counter()
+    for page in range(pages):
+        sdk_utils.deserialize_result(
+            agents.v1_network_agents_get(_preload_content=False, skip=page)
+        )
+    return time.perf_counter() - start, server.bytes_sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, default=10000)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument(
+        "--mbps", type=float, default=100, help="Simulated link bandwidth, 0 for none."
+    )
+    args = parser.parse_args()
+
+    with StandInServer(
+        agents_payload(args.agents),
+        compress=True,
+        bandwidth=args.mbps * 125000 or None,
+    ) as server:
+        print(f"{'case':<16} {'wall, s':>9} {'MiB sent':>10}")
+        for name, compression in (("identity", False), ("gzip", True)):
+            wall, sent = run(server, compression, args.pages)
+            print(f"{name:<16} {wall:>9.3f} {sent / 2 ** 20:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
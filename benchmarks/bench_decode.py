@@ -0,0 +1,58 @@
+"""Compares generated-model deserialisation followed by `.to_dict()` with decoding
+the raw response body once, on a large agent search payload.
+
+Usage: python -m benchmarks.bench_decode [--agents N] [--runs N]
+"""
+import argparse
+import time
+
+import syntropy_sdk as sdk
+from syntropy_sdk import models
+from syntropy_sdk import utils as sdk_utils
+
+from benchmarks.standin import StandInServer, agents_payload
+from syntropynac import session
+
+
+def search_body():
+    return models.V1NetworkAgentsSearchRequest(
+        filter=models.V1AgentFilter(agent_tag_name=["tag-1"])
+    )
+
+
+def models_path(agents):
+    return agents.v1_network_agents_search(search_body()).to_dict()["data"]
+
+
+def raw_path(agents):
+    return sdk_utils.deserialize_result(
+        agents.v1_network_agents_search(search_body(), _preload_content=False)
+    )["data"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, default=50000)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    with StandInServer(agents_payload(args.agents)) as server:
+        config = sdk.Configuration()
+        config.host = server.url
+        api = session.create_api_client(config, session.SessionSettings(jobs=1))
+        agents = sdk.AgentsApi(api)
+        print(f"{'path':<24} {'best, s':>9} {'records':>9}")
+        for name, path in (("models + to_dict", models_path), ("raw JSON", raw_path)):
+            timings = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                records = path(agents)
+                timings.append(time.perf_counter() - start)
+            print(f"{name:<24} {min(timings):>9.3f} {len(records):>9}")
+        # NOTE: ApiClient starts a thread pool that must be closed before interpreter shutdown.
+        api.pool.close()
+        api.pool.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Measures CLI startup import time using `python -X importtime`.
+
+Exits with a non-zero status if importing the CLI takes longer than the budget
+or imports any of the modules that must be loaded lazily.
+
+Usage: python -m benchmarks.bench_import [--budget MS] [--runs N]
+"""
+import argparse
+import subprocess
+import sys
+
+STARTUP_CODE = "from syntropynac import __main__"
+LAZY_MODULES = ("syntropy_sdk", "yaml", "urllib3")
+DEFAULT_BUDGET_MS = 60
+
+
+def import_times(code):
+    """Runs code in a fresh interpreter and parses `-X importtime` output.
+
+    Returns:
+        tuple: Cumulative import time in microseconds per top-level imported module
+            and a set of all imported modules.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    times, modules = {}, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules.add(name.strip())
+        # NOTE: Nested imports are indented, only top-level ones are summed up.
+        if not name.startswith("  ", 1):
+            times[name.strip()] = int(cumulative)
+    return times, modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    # Imports are cached in __pycache__ by the first run.
+    _, modules = import_times(STARTUP_CODE)
+    # NOTE: Modules imported by the interpreter itself, e.g. by site, are not accounted.
+    interpreter = set(import_times("pass")[0])
+    runs = [
+        {
+            name: micros
+            for name, micros in import_times(STARTUP_CODE)[0].items()
+            if name not in interpreter
+        }
+        for _ in range(args.runs)
+    ]
+    best = min(runs, key=lambda times: sum(times.values()))
+    total_ms = sum(best.values()) / 1000
+
+    for name, micros in sorted(best.items(), key=lambda item: -item[1])[:10]:
+        print(f"{name:<40} {micros / 1000:>8.1f} ms")
+    print(f"{'total':<40} {total_ms:>8.1f} ms (budget {args.budget:.0f} ms)")
+
+    failed = False
+    eager = [
+        name
+        for name in LAZY_MODULES
+        if any(imported.split(".")[0] == name for imported in modules)
+    ]
+    if eager:
+        print(f"FAIL: {', '.join(eager)} imported at startup")
+        failed = True
+    if total_ms > args.budget:
+        print("FAIL: startup import time exceeds the budget")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
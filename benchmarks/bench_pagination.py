@@ -0,0 +1,51 @@
+"""Compares serial `WithPagination` with `ParallelPagination` on a long agent list
+served with simulated request latency.
+
+Usage: python -m benchmarks.bench_pagination [--agents N] [--latency S] [--jobs N]
+"""
+
+import argparse
+import time
+
+import syntropy_sdk as sdk
+from syntropy_sdk import utils as sdk_utils
+
+from benchmarks.standin import StandInServer, agent_records
+from syntropynac import pagination, session
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--agents", type=int, default=20000)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--jobs", type=int, default=8)
+    args = parser.parse_args()
+
+    records = agent_records(args.agents)
+    with StandInServer(b"{}", latency=args.latency, records=records) as server:
+        config = sdk.Configuration()
+        config.host = server.url
+        api = session.create_api_client(config, session.SessionSettings(jobs=args.jobs))
+        get = sdk.AgentsApi(api).v1_network_agents_get
+        paths = (
+            ("WithPagination", sdk_utils.WithPagination(get)),
+            (
+                f"ParallelPagination x{args.jobs}",
+                pagination.ParallelPagination(get, jobs=args.jobs),
+            ),
+        )
+        print(f"{'paginator':<26} {'time, s':>9} {'requests':>9} {'records':>9}")
+        for name, paginator in paths:
+            server.reset()
+            start = time.perf_counter()
+            data = paginator(_preload_content=False)["data"]
+            elapsed = time.perf_counter() - start
+            assert data == records, name
+            print(f"{name:<26} {elapsed:>9.3f} {server.requests:>9} {len(data):>9}")
+        # NOTE: ApiClient starts a thread pool that must be closed before interpreter shutdown.
+        api.pool.close()
+        api.pool.join()
+
+
+if __name__ == "__main__":
+    main()
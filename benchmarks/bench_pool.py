@@ -0,0 +1,55 @@
+"""Measures request throughput and connection reuse for different pool settings.
+
+Usage: python -m benchmarks.bench_pool [--requests N] [--latency SECONDS]
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import syntropy_sdk as sdk
+
+from benchmarks.standin import StandInServer, agents_payload
+from syntropynac import session
+
+CASES = (
+    ("SDK defaults, 1 job", session.SessionSettings(jobs=1, pool_maxsize=4)),
+    ("SDK defaults, 16 jobs", session.SessionSettings(jobs=16, pool_maxsize=4)),
+    ("16 jobs, no keep-alive", session.SessionSettings(jobs=16, keepalive=False)),
+    ("16 jobs", session.SessionSettings(jobs=16)),
+    ("32 jobs", session.SessionSettings(jobs=32)),
+)
+
+
+def run(server, settings, requests):
+    config = sdk.Configuration()
+    config.host = server.url
+    api = session.create_api_client(config, settings)
+    agents = sdk.AgentsApi(api)
+
+    def fetch(_):
+        agents.v1_network_agents_get(_preload_content=False).data
+
+    server.reset()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(settings.jobs) as executor:
+        list(executor.map(fetch, range(requests)))
+    return time.perf_counter() - start, server.connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    with StandInServer(agents_payload(10), latency=args.latency) as server:
+        print(f"{'case':<28} {'wall, s':>9} {'req/s':>9} {'connections':>12}")
+        for name, settings in CASES:
+            wall, connections = run(server, settings, args.requests)
+            print(
+                f"{name:<28} {wall:>9.3f} {args.requests / wall:>9.0f} {connections:>12}"
+            )
+
+
+if __name__ == "__main__":
+    main()
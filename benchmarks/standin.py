@@ -0,0 +1,144 @@
+"""Local stand-in for the Syntropy API used by the benchmarks.
+
+Serves a fixed JSON payload for every request, or pages of records selected by the
+`skip` and `take` query parameters, and counts accepted connections so that
+connection reuse can be measured.
+"""
+
+import gzip
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class StandInServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self, payload, latency=0.0, compress=False, bandwidth=None, records=None
+    ):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.payload = payload
+        self.compressed = gzip.compress(payload, compresslevel=6)
+        # Records served page by page to requests with `skip` and `take` parameters.
+        self.records = records
+        self.latency = latency
+        self.compress = compress
+        # Simulated link bandwidth in bytes per second, unlimited if None.
+        self.bandwidth = bandwidth
+        self.connections = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, connections=0, requests=0, bytes_sent=0):
+        with self._lock:
+            self.connections += connections
+            self.requests += requests
+            self.bytes_sent += bytes_sent
+
+    def page(self, path):
+        """Returns the encoded page of records requested by the path or None."""
+        query = parse_qs(urlsplit(path).query)
+        if self.records is None or "take" not in query:
+            return None
+        skip = int(query.get("skip", ["0"])[0])
+        take = int(query["take"][0])
+        return json.dumps({"data": self.records[skip : skip + take]}).encode()
+
+    def reset(self):
+        with self._lock:
+            self.connections = self.requests = self.bytes_sent = 0
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.count(connections=1)
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        body = self.server.page(self.path)
+        gzipped = self.server.compress and "gzip" in self.headers.get(
+            "Accept-Encoding", ""
+        )
+        if body is not None:
+            body = gzip.compress(body, compresslevel=6) if gzipped else body
+        else:
+            body = self.server.compressed if gzipped else self.server.payload
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if gzipped:
+            self.send_header("Content-Encoding", "gzip")
+        if self.headers.get("Connection", "").lower() == "close":
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        self.end_headers()
+        if self.server.bandwidth:
+            time.sleep(len(body) / self.server.bandwidth)
+        self.wfile.write(body)
+        self.server.count(requests=1, bytes_sent=len(body))
+
+    do_GET = _respond
+    do_POST = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+def agents_payload(count):
+    """Returns a JSON agent list with all the fields that the SDK models require."""
+    return json.dumps({"data": agent_records(count)}).encode()
+
+
+def agent_records(count):
+    """Returns agent records with all the fields that the SDK models require."""
+    return [
+        {
+            "agent_id": i,
+            "agent_name": f"agent-{i}",
+            "agent_public_ipv4": f"10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}",
+            "agent_location_city": "Vilnius",
+            "agent_location_country": "LT",
+            "agent_device_id": f"device-{i}",
+            "agent_status": "CONNECTED",
+            "agent_version": "0.1.0",
+            "agent_locked_fields": {"agent_name": False, "agent_tags": []},
+            "agent_modified_at": "2021-06-01T12:00:00.000Z",
+            "agent_is_virtual": False,
+            "agent_type": "LINUX",
+            "agent_provider": {"agent_provider_name": "aws", "agent_provider_id": 1},
+            "agent_tags": [{"agent_tag_name": f"tag-{i % 16}", "agent_tag_id": i % 16}],
+            "agent_services_subnets_enabled_count": 1,
+            "agent_services_subnets_count": 2,
+            "agent_is_online": True,
+        }
+        for i in range(count)
+    ]
@@ -1,118 +1,194 @@
 #!/usr/bin/env python
-import json
+import importlib
 
 import click
-import syntropy_sdk as sdk
-import yaml
 
-from syntropynac import configure as configure_module
-from syntropynac import fields, transform, utils
-from syntropynac.decorators import syntropy_api
-
-
-@click.group()
-def apis():
-    """Syntropy Network As Code Command Line Interface."""
+from syntropynac import progress, settings, tracing
+
+# Command name: (module:attribute, short help). Commands are imported only when
+# invoked, so that `--help` and argument errors don't import the SDK.
+LAZY_COMMANDS = {
+    "configure": (
+        "syntropynac.commands.configure:configure",
+        "Configure connections using a configuration YAML/JSON file.",
+    ),
+    "estimate": (
+        "syntropynac.commands.estimate:estimate",
+        "Estimates the cost of applying a configuration file without making changes.",
+    ),
+    "export": (
+        "syntropynac.commands.export:export",
+        "Exports existing connections to configuration YAML/JSON file.",
+    ),
+    "fingerprint": (
+        "syntropynac.commands.fingerprint:fingerprint_agents",
+        "Prints a digest of connections among given endpoint ids.",
+    ),
+    "validate": (
+        "syntropynac.commands.validate:validate",
+        "Validates configuration YAML/JSON files offline.",
+    ),
+}
+
+
+class LazyGroup(click.Group):
+    """Click group that imports subcommands on first use."""
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            module_name, attribute = self.lazy_commands[cmd_name][0].split(":")
+            module = importlib.import_module(module_name)
+            self.add_command(getattr(module, attribute), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx, formatter):
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.commands:
+                command = self.commands[name]
+                if command.hidden:
+                    continue
+                rows.append((name, command.get_short_help_str(formatter.width)))
+            else:
+                rows.append((name, self.lazy_commands[name][1]))
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
 
 
-@apis.command()
-@click.argument("config")
+@click.group(cls=LazyGroup, lazy_commands=LAZY_COMMANDS)
 @click.option(
-    "--dry-run",
-    is_flag=True,
-    default=False,
-    help="Perform a dry run without configuring anything.",
+    "--stats-json",
+    default=None,
+    type=click.Path(dir_okay=False, allow_dash=True),
+    help="Write API call statistics per endpoint as JSON to a file or to stderr if -.",
 )
 @click.option(
-    "--json",
-    "-j",
-    "from_json",
-    is_flag=True,
-    default=False,
-    help="Imports configuration from JSON instead of YAML.",
+    "--trace-json",
+    default=None,
+    type=click.Path(dir_okay=False),
+    help="Write a trace of all phases and API calls viewable in Chrome's trace viewer.",
 )
-@syntropy_api
-def configure(config, dry_run, from_json, api):
-    """Configure connections using a configuration YAML/JSON file.
-
-    \b
-    Example YAML file:
-        name: test-network
-        state: present
-        topology: P2M
-        connections:
-            gateway-endpoint:
-                state: present
-                type: endpoint
-                services:
-                - postgres
-                - redis
-                connect_to:
-                    endpoint-1:
-                        type: endpoint
-                        services:
-                        - app
-                    endpoint2:
-                        state: present
-                        type: endpoint
-                        services:
-                        - app
-    """
-    try:
-        with open(config, "rb") as cfg_file:
-            if from_json:
-                config = json.load(cfg_file)
-                config = config if isinstance(config, list) else [config]
-            else:
-                config = list(yaml.safe_load_all(cfg_file))
-    except FileNotFoundError:
-        click.secho(f"Could not find {config} file.", err=True, fg="red")
-        return
-    except json.decoder.JSONDecodeError:
-        click.secho(f"Could not parse {config} file as JSON.", err=True, fg="red")
-        return
-    except yaml.YAMLError:
-        click.secho(f"Could not parse {config} file as YAML.", err=True, fg="red")
-        return
-
-    for index, net in enumerate(config):
-        if any(i not in net for i in ("topology", "state")):
-            click.secho(
-                f"Skipping {index} entry as no name, topology or state found.",
-                fg="yellow",
-            )
-            continue
-        configure_module.configure_network(api, net, dry_run)
-
-    click.secho("Done", fg="green")
-
-
-@apis.command()
-@click.option("--topology", default=None, type=str, help="Override network topology.")
 @click.option(
-    "--json",
-    "-j",
-    "to_json",
-    is_flag=True,
-    default=False,
-    help="Outputs a JSON instead of YAML.",
+    "--token-cache/--no-token-cache",
+    default=True,
+    help=(
+        "Reuse the access token across invocations. Tokens are cached in "
+        "SYNTROPY_NAC_CACHE_DIR or ~/.cache/syntropynac."
+    ),
 )
-@syntropy_api
-def export(topology, to_json, api):
-    """Exports existing connections to configuration YAML/JSON file.
-
-    If exact topology export is required - use P2P topology.
-    """
-    all_agents = sdk.utils.WithPagination(sdk.AgentsApi(api).v1_network_agents_get)(
-        _preload_content=False
-    )["data"]
-    all_agents = {agent["agent_id"]: agent for agent in all_agents}
-
-    network = utils.export_network(api, all_agents, topology)
-    if to_json:
-        click.echo(json.dumps(network, indent=4))
-    else:
-        click.echo(yaml.dump_all([network]))
+@click.option(
+    "--jobs",
+    default=settings.DEFAULT_JOBS,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="Number of concurrent API requests.",
+)
+@click.option(
+    "--pool-maxsize",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Number of connections kept open per host. Defaults to JOBS + 2.",
+)
+@click.option(
+    "--pool-size",
+    default=settings.DEFAULT_POOL_SIZE,
+    type=click.IntRange(min=1),
+    show_default=True,
+    help="Number of per-host connection pools.",
+)
+@click.option(
+    "--keepalive/--no-keepalive",
+    default=True,
+    help="Reuse HTTP connections between requests.",
+)
+@click.option(
+    "--connect-timeout",
+    default=None,
+    type=click.FloatRange(min=0),
+    help="Connect timeout of API requests in seconds.",
+)
+@click.option(
+    "--timeout",
+    default=None,
+    type=click.FloatRange(min=0),
+    help="Read timeout of API requests in seconds.",
+)
+@click.option(
+    "--compression/--no-compression",
+    default=True,
+    help="Request gzip compressed responses from list and search API endpoints.",
+)
+@click.option(
+    "--retries",
+    default=settings.DEFAULT_RETRIES,
+    type=click.IntRange(min=0),
+    show_default=True,
+    help="Number of retries of throttled or transiently failed API requests.",
+)
+@click.option(
+    "--progress",
+    "progress_mode",
+    default=progress.AUTO,
+    type=click.Choice(progress.MODES),
+    show_default=True,
+    help=(
+        "Report progress of long phases to stderr as a status line(tty), as periodic "
+        "log lines(log) or not at all(off). auto picks tty if stderr is a terminal."
+    ),
+)
+@click.option(
+    "--progress-interval",
+    default=None,
+    type=click.FloatRange(min=0),
+    help=(
+        f"Minimum seconds between progress updates. Defaults to {progress.TTY_INTERVAL} "
+        f"in a terminal and {progress.LOG_INTERVAL:g} otherwise."
+    ),
+)
+@click.pass_context
+def apis(
+    ctx,
+    stats_json,
+    trace_json,
+    token_cache,
+    jobs,
+    pool_maxsize,
+    pool_size,
+    keepalive,
+    connect_timeout,
+    timeout,
+    compression,
+    retries,
+    progress_mode,
+    progress_interval,
+):
+    """Syntropy Network As Code Command Line Interface."""
+    obj = ctx.ensure_object(dict)
+    obj["stats_json"] = stats_json
+    obj["token_cache"] = token_cache
+    obj["session"] = settings.SessionSettings(
+        jobs=jobs,
+        pool_size=pool_size,
+        pool_maxsize=pool_maxsize,
+        keepalive=keepalive,
+        connect_timeout=connect_timeout,
+        read_timeout=timeout,
+        compression=compression,
+        retries=retries,
+    )
+    if progress.start(progress_mode, progress_interval) is not None:
+        ctx.call_on_close(progress.stop)
+    if trace_json:
+        tracing.start()
+        ctx.call_on_close(lambda: tracing.stop(trace_json))
 
 
 def main():
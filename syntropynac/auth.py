@@ -0,0 +1,146 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+
+from syntropy_sdk import utils as sdk_utils
+from syntropy_sdk.rest import ApiException
+
+# Access tokens are refreshed this many seconds before they expire.
+EXPIRY_MARGIN = 60
+# Lifetime to assume for access tokens that do not carry an expiry claim.
+DEFAULT_TTL = 300
+
+
+def default_cache_dir():
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "syntropynac")
+
+
+def token_expiry(access_token):
+    """Retrieves expiry timestamp from the JWT `exp` claim.
+
+    Returns:
+        float: Expiry as a UNIX timestamp or None if it could not be determined.
+    """
+    try:
+        payload = access_token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenCache:
+    """On-disk cache of JWT access tokens keyed by API server and API token hash.
+
+    The directory is created with or restricted to 0700 and files with 0600 permissions.
+    Tokens are not cached in a directory whose permissions can not be restricted.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or default_cache_dir()
+
+    def _path(self, api_url, api_token):
+        key = hashlib.sha256(f"{api_url}\0{api_token}".encode()).hexdigest()
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, api_url, api_token):
+        """Returns a cached access token unless it is about to expire."""
+        try:
+            with open(self._path(api_url, api_token)) as f:
+                entry = json.load(f)
+            if entry["expires_at"] - EXPIRY_MARGIN > time.time():
+                return entry["access_token"]
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+
+    def set(self, api_url, api_token, access_token):
+        expires_at = token_expiry(access_token) or time.time() + DEFAULT_TTL
+        path = self._path(api_url, api_token)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            # NOTE: An existing directory keeps its mode, e.g. if created by other tools.
+            os.chmod(self.directory, 0o700)
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump({"access_token": access_token, "expires_at": expires_at}, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            # NOTE: Caching is an optimization, failing to write the cache must not fail the run.
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+
+    def delete(self, api_url, api_token):
+        try:
+            os.unlink(self._path(api_url, api_token))
+        except OSError:
+            pass
+
+
+def login(api_url, api_token, cache=None, refresh=False):
+    """Exchanges API token for JWT access token reusing a cached one if possible.
+
+    Args:
+        api_url (str): Syntropy API server URL.
+        api_token (str): API authorization token.
+        cache (TokenCache, optional): Token cache, caching is disabled if None. Defaults to None.
+        refresh (bool, optional): Ignore cached access token. Defaults to False.
+
+    Returns:
+        str: JWT access token.
+    """
+    if cache is not None and not refresh:
+        access_token = cache.get(api_url, api_token)
+        if access_token:
+            return access_token
+
+    access_token = sdk_utils.login_with_access_token(api_url, api_token)
+    if cache is not None and isinstance(access_token, str):
+        cache.set(api_url, api_token, access_token)
+    return access_token
+
+
+def install_refresh(api, api_url, api_token, cache=None):
+    """Makes the ApiClient log in again and retry a request once when it gets 401.
+
+    Args:
+        api (ApiClient): SDK API client.
+        api_url (str): Syntropy API server URL.
+        api_token (str): API authorization token.
+        cache (TokenCache, optional): Token cache to update. Defaults to None.
+    """
+    request = api.request
+    lock = threading.Lock()
+
+    def refreshing_request(method, url, *args, headers=None, **kwargs):
+        try:
+            return request(method, url, *args, headers=headers, **kwargs)
+        except ApiException as err:
+            if err.status != 401 or not headers or "Authorization" not in headers:
+                raise
+            with lock:
+                authorization = api.configuration.api_key["Authorization"]
+                # Another thread might have already refreshed the token.
+                if headers["Authorization"] == authorization:
+                    authorization = "Bearer " + login(
+                        api_url, api_token, cache=cache, refresh=True
+                    )
+                    api.configuration.api_key["Authorization"] = authorization
+            return request(
+                method,
+                url,
+                *args,
+                headers={**headers, "Authorization": authorization},
+                **kwargs,
+            )
+
+    api.request = refreshing_request
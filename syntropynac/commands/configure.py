@@ -0,0 +1,214 @@
+import json
+
+import click
+
+from syntropynac import profiling
+from syntropynac.decorators import budget_options, profile_options, syntropy_api
+
+
+def _require_config(ctx, param, value):
+    # NOTE: CONFIG is optional only with --watch, which is eager and therefore
+    # parsed first. Checking here reports the usage error before logging in.
+    if value is None and ctx.params.get("watch_dir") is None:
+        raise click.UsageError("Missing argument 'CONFIG' or --watch option.", ctx)
+    return value
+
+
+@click.command()
+@click.argument("config", required=False, callback=_require_config)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    default=False,
+    help="Perform a dry run without configuring anything.",
+)
+@click.option(
+    "--json",
+    "-j",
+    "from_json",
+    is_flag=True,
+    default=False,
+    help="Imports configuration from JSON instead of YAML.",
+)
+@click.option(
+    "--watch",
+    "watch_dir",
+    default=None,
+    type=click.Path(exists=True, file_okay=False),
+    is_eager=True,
+    help="Keep running and apply YAML/JSON files in the directory as they change.",
+)
+@click.option(
+    "--interval",
+    default=2.0,
+    type=float,
+    show_default=True,
+    help="Polling interval in seconds for --watch.",
+)
+@click.option(
+    "--report",
+    "report_path",
+    default=None,
+    type=click.Path(dir_okay=False, allow_dash=True),
+    help=(
+        "Write a JSON report with planned and applied changes, API usage and "
+        "phase durations of every document to PATH, or stderr if PATH is '-'."
+    ),
+)
+@budget_options
+@profile_options
+@syntropy_api
+def configure(
+    config,
+    dry_run,
+    from_json,
+    watch_dir,
+    interval,
+    report_path,
+    max_pairs,
+    max_calls,
+    max_duration,
+    api,
+):
+    """Configure connections using a configuration YAML/JSON file.
+
+    \b
+    Example YAML file:
+        name: test-network
+        state: present
+        topology: P2M
+        connections:
+            gateway-endpoint:
+                state: present
+                type: endpoint
+                services:
+                - postgres
+                - redis
+                connect_to:
+                    endpoint-1:
+                        type: endpoint
+                        services:
+                        - app
+                    endpoint2:
+                        state: present
+                        type: endpoint
+                        services:
+                        - app
+
+    With --watch DIR the command keeps running, polls configuration files in DIR
+    and applies only the documents that changed.
+
+    Budgets(--max-pairs, --max-calls, --max-duration) are checked against an
+    estimate of the whole file before any changes are made, see `estimate`.
+    """
+    from syntropynac import prefetch, report, watch
+
+    if watch_dir is not None:
+        if report_path is not None:
+            raise click.UsageError("--report cannot be used with --watch.")
+        if any(i is not None for i in (max_pairs, max_calls, max_duration)):
+            raise click.UsageError("Budgets cannot be used with --watch.")
+        watch.watch(api, watch_dir, dry_run, interval=interval)
+        return
+
+    run_report = report.RunReport()
+    try:
+        # NOTE: Independent reads run in the background while the file is parsed and validated.
+        with prefetch.Prefetch(api) as reads:
+            _configure_file(
+                api,
+                config,
+                dry_run,
+                from_json,
+                reads,
+                run_report,
+                budgets=(max_pairs, max_calls, max_duration),
+            )
+    finally:
+        if report_path is not None:
+            run_report.write(report_path)
+
+
+def _configure_file(api, config, dry_run, from_json, reads, run_report, budgets):
+    import yaml
+
+    from syntropynac import configure as configure_module
+    from syntropynac import estimate, resolve, subnets, watch
+
+    try:
+        with open(config, "rb") as cfg_file, profiling.phase("parse"):
+            if from_json:
+                config = json.load(cfg_file)
+                config = config if isinstance(config, list) else [config]
+            else:
+                config = list(yaml.safe_load_all(cfg_file))
+    except FileNotFoundError:
+        click.secho(f"Could not find {config} file.", err=True, fg="red")
+        return
+    except json.decoder.JSONDecodeError:
+        click.secho(f"Could not parse {config} file as JSON.", err=True, fg="red")
+        return
+    except yaml.YAMLError:
+        click.secho(f"Could not parse {config} file as YAML.", err=True, fg="red")
+        return
+
+    with profiling.phase("discover"):
+        for net in config:
+            reads.discover(net)
+
+    if any(budget is not None for budget in budgets):
+        with profiling.phase("estimate"):
+            _, total = estimate.estimate_documents(
+                config, resolve.AgentIndex(reads.agents)
+            )
+        estimate.enforce_budgets(total, *budgets)
+
+    snapshot = watch.ConnectionSnapshot(reads.connections)
+    # NOTE: Services of connections shared by several documents are merged and updated once.
+    updates = None if dry_run else subnets.ServicesUpdates()
+
+    def flush():
+        with profiling.phase("update services"):
+            connections, toggled = configure_module.flush_services_updates(api, updates)
+        run_report.services_updated(connections, toggled)
+        return connections, toggled
+
+    try:
+        for index, net in enumerate(config):
+            document_report = run_report.add(index, net)
+            if any(i not in net for i in ("topology", "state")):
+                click.secho(
+                    f"Skipping {index} entry as no name, topology or state found.",
+                    fg="yellow",
+                )
+                document_report.error = "Skipped as no topology or state found."
+                continue
+            with document_report.measure(api):
+                configure_module.configure_network(
+                    api,
+                    net,
+                    dry_run,
+                    index=reads,
+                    snapshot=snapshot,
+                    report=document_report,
+                    updates=updates,
+                )
+    except Exception:
+        # Services of the documents applied before the failure are still updated, but
+        # the failure is what gets reported.
+        if updates:
+            try:
+                flush()
+            except Exception as err:
+                click.secho(
+                    f"Could not update services of applied documents: {err}",
+                    err=True,
+                    fg="yellow",
+                )
+        raise
+    else:
+        if updates:
+            connections, toggled = flush()
+            click.echo(f"Configured {connections} connections and {toggled} subnets")
+
+    click.secho("Done", fg="green")
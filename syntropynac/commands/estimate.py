@@ -0,0 +1,65 @@
+import json
+
+import click
+
+from syntropynac import profiling
+from syntropynac.decorators import budget_options, profile_options, syntropy_api
+
+
+@click.command()
+@click.argument("config", type=click.Path(exists=True, dir_okay=False))
+@click.option(
+    "--json",
+    "-j",
+    "to_json",
+    is_flag=True,
+    default=False,
+    help="Print estimates as JSON.",
+)
+@click.option(
+    "--latency",
+    default=None,
+    type=click.FloatRange(min=0),
+    help="Assumed seconds per API call. Defaults to 0.25.",
+)
+@budget_options
+@profile_options
+@syntropy_api
+def estimate(config, to_json, latency, max_pairs, max_calls, max_duration, api):
+    """Estimates the cost of applying a configuration file without making changes.
+
+    Predicts the number of connection pairs, API calls, request bytes and
+    duration per document using only the agent inventory: tags are expanded
+    by their sizes and pairs are counted, not enumerated. Exits with status 1
+    if any of the budgets is exceeded.
+    """
+    from syntropynac import estimate as estimate_module
+    from syntropynac import resolve, validation
+
+    latency = estimate_module.DEFAULT_LATENCY if latency is None else latency
+    with profiling.phase("parse"):
+        documents = [
+            document
+            for document in validation.load_documents(config)
+            if document is not None
+        ]
+    with profiling.phase("fetch agents"):
+        index = resolve.AgentIndex.fetch(api)
+    with profiling.phase("estimate"):
+        estimates, total = estimate_module.estimate_documents(
+            documents, index, latency=latency
+        )
+
+    if to_json:
+        click.echo(
+            json.dumps(
+                {
+                    "total": total.to_dict(),
+                    "documents": [estimate.to_dict() for estimate in estimates],
+                },
+                indent=4,
+            )
+        )
+    else:
+        estimate_module.echo(estimates, total)
+    estimate_module.enforce_budgets(total, max_pairs, max_calls, max_duration)
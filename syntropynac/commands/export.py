@@ -0,0 +1,43 @@
+import json
+
+import click
+
+from syntropynac import profiling
+from syntropynac.decorators import profile_options, syntropy_api
+
+
+@click.command()
+@click.option("--topology", default=None, type=str, help="Override network topology.")
+@click.option(
+    "--json",
+    "-j",
+    "to_json",
+    is_flag=True,
+    default=False,
+    help="Outputs a JSON instead of YAML.",
+)
+@profile_options
+@syntropy_api
+def export(topology, to_json, api):
+    """Exports existing connections to configuration YAML/JSON file.
+
+    If exact topology export is required - use P2P topology.
+    """
+    import syntropy_sdk as sdk
+    import yaml
+
+    from syntropynac import utils
+
+    with profiling.phase("fetch agents"):
+        all_agents = sdk.utils.WithPagination(sdk.AgentsApi(api).v1_network_agents_get)(
+            _preload_content=False
+        )["data"]
+        all_agents = {agent["agent_id"]: agent for agent in all_agents}
+
+    network = utils.export_network(api, all_agents, topology)
+    with profiling.phase("serialize"):
+        if to_json:
+            output = json.dumps(network, indent=4)
+        else:
+            output = yaml.dump_all([network])
+    click.echo(output)
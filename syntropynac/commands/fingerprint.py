@@ -0,0 +1,40 @@
+import json
+
+import click
+
+from syntropynac.decorators import syntropy_api
+
+
+@click.command("fingerprint")
+@click.argument("agent_ids", nargs=-1, required=True, type=int)
+@click.option(
+    "--json",
+    "-j",
+    "to_json",
+    is_flag=True,
+    default=False,
+    help="Outputs a JSON instead of a plain digest.",
+)
+@syntropy_api
+def fingerprint_agents(agent_ids, to_json, api):
+    """Prints a digest of connections among given endpoint ids.
+
+    The digest includes connection subnet states and changes whenever any of
+    the connections or their enabled services change.
+    """
+    from syntropynac import fingerprint
+
+    result = fingerprint.get_agents_fingerprint(api, agent_ids)
+    if to_json:
+        click.echo(
+            json.dumps(
+                {
+                    "agents": sorted(result.agent_ids),
+                    "connections": len(result),
+                    "fingerprint": result.hexdigest(),
+                },
+                indent=4,
+            )
+        )
+    else:
+        click.echo(result.hexdigest())
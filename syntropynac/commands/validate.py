@@ -0,0 +1,63 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import click
+
+# Below this number of files validation runs in-process since starting workers costs more.
+PARALLEL_THRESHOLD = 16
+
+
+@click.command()
+@click.argument(
+    "files", nargs=-1, required=True, type=click.Path(dir_okay=False, allow_dash=False)
+)
+@click.option(
+    "--workers",
+    default=None,
+    type=click.IntRange(min=1),
+    help="Number of worker processes. Defaults to the number of CPUs.",
+)
+@click.option(
+    "--strict",
+    is_flag=True,
+    default=False,
+    help="Treat warnings as errors.",
+)
+def validate(files, workers, strict):
+    """Validates configuration YAML/JSON files offline.
+
+    Checks the structure of every document, e.g. topology, state, endpoint
+    types and ids, without logging in or making any API calls. Exits with
+    status 1 if any errors are found.
+    """
+    from syntropynac import validation
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(files) >= PARALLEL_THRESHOLD:
+        chunksize = max(1, len(files) // (workers * 4))
+        with ProcessPoolExecutor(workers) as executor:
+            results = list(
+                executor.map(validation.validate_file, files, chunksize=chunksize)
+            )
+    else:
+        results = [validation.validate_file(path) for path in files]
+
+    documents = errors = warnings = 0
+    for path, (count, issues) in zip(files, results):
+        documents += count
+        for index, severity, message in issues:
+            location = path if index is None else f"{path}[{index}]"
+            if severity == validation.ERROR or strict:
+                errors += 1
+                click.secho(f"{location}: {severity}: {message}", err=True, fg="red")
+            else:
+                warnings += 1
+                click.secho(f"{location}: {severity}: {message}", err=True, fg="yellow")
+
+    summary = (
+        f"Validated {documents} documents in {len(files)} files: "
+        f"{errors} errors, {warnings} warnings."
+    )
+    click.secho(summary, fg="red" if errors else "green")
+    if errors:
+        raise SystemExit(1)
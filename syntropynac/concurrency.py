@@ -0,0 +1,423 @@
+import email.utils
+import queue
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from syntropy_sdk.rest import ApiException
+
+from syntropynac import stats
+
+# Throttling statuses that shrink the concurrency limit. Writes are retried on 429 that rejects
+# them before processing, but on 503 only with Retry-After, since a proxy might also return 503
+# after the request has reached the platform.
+THROTTLE_STATUSES = (429, 503)
+# Statuses that are retried only for requests without side effects.
+TRANSIENT_STATUSES = (408, 500, 502, 504)
+# Longest Retry-After delay in seconds that is honoured.
+MAX_RETRY_AFTER = 300
+# Default capacity of the input queue of a pipeline stage.
+STAGE_QUEUE_SIZE = 1000
+
+_DONE = object()
+_local = threading.local()
+
+
+class AIMDLimiter:
+    """Limits the number of in-flight requests with additive increase and multiplicative decrease.
+
+    The limit grows by one after `limit` successful requests and is multiplied by
+    `decrease` when a request is throttled. Only requests started after the last
+    decrease may decrease the limit again, so that a burst of throttled responses
+    to requests that were already in flight shrinks the limit once.
+
+    Args:
+        limit (int): Initial and maximum number of in-flight requests.
+        minimum (int, optional): Lowest limit. Defaults to 1.
+        decrease (float, optional): Multiplicative decrease factor. Defaults to 0.5.
+    """
+
+    def __init__(self, limit, minimum=1, decrease=0.5):
+        self.maximum = max(minimum, limit)
+        self.minimum = minimum
+        self.decrease = decrease
+        self.limit = float(self.maximum)
+        self.in_flight = 0
+        self.throttled = 0
+        self._generation = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """Blocks until a request may be started.
+
+        Returns:
+            int: Token to pass to `release`.
+        """
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+            return self._generation
+
+    def release(self, token, throttled=False):
+        """Marks a request as finished and adjusts the limit.
+
+        Args:
+            token (int): Token returned by `acquire`.
+            throttled (bool, optional): Indicates that the request was throttled. Defaults to False.
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                if token == self._generation:
+                    self._generation += 1
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+            elif self.limit < self.maximum:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def __repr__(self):
+        return f"AIMDLimiter(limit={self.limit:.2f}, in_flight={self.in_flight}, throttled={self.throttled})"
+
+
+class AdaptiveBatchSize:
+    """Adapts the size of write batches to the observed latency and error rate.
+
+    The size doubles after a batch that finished within half of the target latency without
+    errors and halves after a batch that was slower than the target or saw errors, e.g.
+    throttled attempts that were retried. Sizes in between are kept.
+
+    Args:
+        size (int, optional): Initial batch size. Defaults to 100.
+        minimum (int, optional): Smallest batch size. Defaults to 10.
+        maximum (int, optional): Largest batch size. Defaults to 1000.
+        target (float, optional): Target latency of a batch in seconds. Defaults to 5.
+    """
+
+    def __init__(self, size=100, minimum=10, maximum=1000, target=5.0):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.size = min(self.maximum, max(self.minimum, size))
+        self.target = target
+        self._lock = threading.Lock()
+
+    def next(self):
+        """Returns the size of the next batch."""
+        with self._lock:
+            return self.size
+
+    def record(self, latency, errors=0):
+        """Adjusts the size after a batch has finished.
+
+        Args:
+            latency (float): Seconds the batch took.
+            errors (int, optional): Number of failed or throttled attempts. Defaults to 0.
+        """
+        with self._lock:
+            if errors or latency > self.target:
+                self.size = max(self.minimum, self.size // 2)
+            elif latency < self.target / 2:
+                self.size = min(self.maximum, self.size * 2)
+
+    def __repr__(self):
+        return f"AdaptiveBatchSize(size={self.size})"
+
+
+def is_read_request(method, url):
+    """Indicates whether the request lists or searches for objects without side effects."""
+    return method == "GET" or url.split("?")[0].endswith("/search")
+
+
+class RetryPolicy:
+    """Jittered exponential backoff that honours Retry-After header.
+
+    Args:
+        retries (int, optional): Number of retries after the first attempt. Defaults to 5.
+        base (float, optional): Backoff of the first retry in seconds. Defaults to 0.5.
+        cap (float, optional): Maximum backoff in seconds. Defaults to 30.
+    """
+
+    def __init__(self, retries=5, base=0.5, cap=30.0):
+        self.retries = retries
+        self.base = base
+        self.cap = cap
+
+    def should_retry(self, attempt, method, url, err):
+        if attempt >= self.retries:
+            return False
+        if is_read_request(method, url):
+            return err.status in THROTTLE_STATUSES + TRANSIENT_STATUSES
+        return err.status == 429 or (
+            err.status == 503 and retry_after_delay(err) is not None
+        )
+
+    def delay(self, attempt, err=None):
+        """Returns number of seconds to wait before the retry."""
+        retry_after = retry_after_delay(err) if err is not None else None
+        if retry_after is not None:
+            return min(retry_after, MAX_RETRY_AFTER)
+        # NOTE: "Full jitter" spreads retries of concurrent requests evenly over the backoff window.
+        return random.uniform(0, min(self.cap, self.base * 2 ** attempt))
+
+
+def retry_after_delay(err):
+    """Parses Retry-After header of the error response.
+
+    Returns:
+        float: Number of seconds to wait or None if the header is absent or invalid.
+    """
+    headers = err.headers or {}
+    value = headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        date = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date is None:
+        return None
+    return max(0.0, date.timestamp() - time.time())
+
+
+class RetryCounter:
+    """Counts retries of the requests made by the current thread within the `with` block.
+
+    Unlike the limiter's throttled count, retries of requests made by other threads at the
+    same time are not included.
+    """
+
+    def __init__(self):
+        self.retries = 0
+        self._outer = None
+
+    def __enter__(self):
+        self._outer = getattr(_local, "retry_counter", None)
+        _local.retry_counter = self
+        return self
+
+    def __exit__(self, *exc):
+        _local.retry_counter = self._outer
+        if self._outer is not None:
+            self._outer.retries += self.retries
+        return False
+
+
+def _count_retry():
+    counter = getattr(_local, "retry_counter", None)
+    if counter is not None:
+        counter.retries += 1
+
+
+def install(api, policy=None, limiter=None):
+    """Installs retries and adaptive concurrency limiting on the ApiClient instance.
+
+    Throttled and transiently failed requests are retried according to the policy.
+    Requests do not occupy the limiter while waiting for a retry. Retries are counted by
+    RetryCounter and by ApiStats if installed on the ApiClient beforehand.
+
+    Args:
+        api (ApiClient): SDK API client.
+        policy (RetryPolicy, optional): Retry policy. Defaults to RetryPolicy().
+        limiter (AIMDLimiter, optional): Concurrency limiter. Defaults to None(no limiting).
+    """
+    policy = policy if policy is not None else RetryPolicy()
+    api_stats = stats.get_stats(api)
+    request = api.request
+
+    def retrying_request(method, url, *args, **kwargs):
+        attempt = 0
+        while True:
+            token = limiter.acquire() if limiter is not None else None
+            throttled = False
+            try:
+                return request(method, url, *args, **kwargs)
+            except ApiException as err:
+                throttled = err.status in THROTTLE_STATUSES
+                if not policy.should_retry(attempt, method, url, err):
+                    raise
+                delay = policy.delay(attempt, err)
+            finally:
+                if limiter is not None:
+                    limiter.release(token, throttled)
+            _count_retry()
+            if api_stats is not None:
+                api_stats.record_retry(
+                    stats.endpoint_name(f"{method} {url.split('?')[0]}")
+                )
+            time.sleep(delay)
+            attempt += 1
+
+    api.request = retrying_request
+    api.limiter = limiter
+
+
+def run_graph(tasks, jobs=None):
+    """Runs tasks concurrently, each as soon as the tasks it depends on have finished.
+
+    Tasks that depend on a failed task are not started, independent ones run to completion
+    and the first error is raised afterwards.
+
+    Args:
+        tasks (dict): Task name to a (callable, names of the tasks it depends on) tuple.
+        jobs (int, optional): Number of tasks to run at once. Defaults to the number of tasks.
+
+    Returns:
+        dict: Task name to the value returned by its callable.
+    """
+    results = {}
+    failed = set()
+    waiting = dict(tasks)
+    running = {}
+    error = None
+    with ThreadPoolExecutor(jobs or max(1, len(tasks))) as executor:
+        while waiting or running:
+            for name, (func, depends) in list(waiting.items()):
+                if any(dep in failed for dep in depends):
+                    failed.add(name)
+                    del waiting[name]
+                elif all(dep in results for dep in depends):
+                    running[executor.submit(func)] = name
+                    del waiting[name]
+            if not running:
+                # NOTE: Only unknown or circular dependencies are left.
+                raise ValueError(f"Unresolved dependencies of {sorted(waiting)}")
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as err:
+                    failed.add(name)
+                    error = error or err
+    if error is not None:
+        raise error
+    return results
+
+
+class Stage:
+    """A step of `run_pipeline` with its own worker threads and a bounded input queue.
+
+    Workers block when the queue of the next stage is full, so that a slow stage holds back
+    the ones before it instead of letting their output pile up.
+
+    Args:
+        name (str): Stage name.
+        func (callable): Called with an input item, or a list of them if `batch` is set, and
+            returns an iterable of items for the next stage.
+        workers (int, optional): Number of worker threads. Defaults to 1.
+        queue_size (int, optional): Capacity of the input queue. Defaults to STAGE_QUEUE_SIZE.
+        batch (callable, optional): Returns the number of input items to pass to `func` at once.
+            A batch is cut short only by the end of the input. Defaults to None(single items).
+        cancel_on_error (bool, optional): Drop the remaining input once any stage has failed,
+            e.g. so that no further writes are started. Defaults to False.
+    """
+
+    def __init__(
+        self,
+        name,
+        func,
+        workers=1,
+        queue_size=STAGE_QUEUE_SIZE,
+        batch=None,
+        cancel_on_error=False,
+    ):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.batch = batch
+        self.cancel_on_error = cancel_on_error
+        self._lock = threading.Lock()
+
+    def _take(self, inbox):
+        """Returns the next input of a worker, _DONE if there is none, and whether the input ended."""
+        if self.batch is None:
+            item = inbox.get()
+            return item, item is _DONE
+        # NOTE: Batches are collected one at a time, so that they keep the input order.
+        with self._lock:
+            items = []
+            size = self.batch()
+            while len(items) < size:
+                item = inbox.get()
+                if item is _DONE:
+                    return items or _DONE, True
+                items.append(item)
+            return items, False
+
+    def __repr__(self):
+        return f"Stage(name={self.name!r}, workers={self.workers})"
+
+
+def run_pipeline(source, stages):
+    """Passes items of `source` through stages that run concurrently.
+
+    Items are fed from the calling thread. Each stage has its own workers and hands its
+    output to the next stage through a bounded queue, so at most a few queues worth of items
+    are held at once and all the stages overlap in time. Output of the last stage is dropped.
+    If any stage fails, no further items are fed, the ones already in the pipeline are
+    processed, except by stages that cancel on errors, and the first error is raised afterwards.
+
+    Args:
+        source (iterable): Input items of the first stage.
+        stages (list): Stage objects in the order items pass through them.
+    """
+    inboxes = [queue.Queue(stage.queue_size) for stage in stages]
+    remaining = [stage.workers for stage in stages]
+    errors = []
+    lock = threading.Lock()
+
+    def work(position):
+        stage = stages[position]
+        last = position == len(stages) - 1
+        try:
+            done = False
+            while not done:
+                items, done = stage._take(inboxes[position])
+                if items is _DONE or (stage.cancel_on_error and errors):
+                    continue
+                try:
+                    for item in stage.func(items):
+                        if not last:
+                            inboxes[position + 1].put(item)
+                except Exception as err:
+                    with lock:
+                        errors.append(err)
+        finally:
+            with lock:
+                remaining[position] -= 1
+                finished = remaining[position] == 0
+            if finished and not last:
+                for _ in range(stages[position + 1].workers):
+                    inboxes[position + 1].put(_DONE)
+
+    threads = [
+        threading.Thread(
+            target=work, args=(position,), name=f"{stage.name}-{worker}", daemon=True
+        )
+        for position, stage in enumerate(stages)
+        for worker in range(stage.workers)
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        for item in source:
+            inboxes[0].put(item)
+            if errors:
+                break
+    except Exception as err:
+        with lock:
+            errors.append(err)
+    finally:
+        for _ in range(stages[0].workers):
+            inboxes[0].put(_DONE)
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
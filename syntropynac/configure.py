@@ -1,13 +1,70 @@
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
 import click
 import syntropy_sdk as sdk
 from syntropy_sdk import models, utils
 
-from syntropynac import resolve, transform
+from syntropynac import (
+    concurrency,
+    pagination,
+    profiling,
+    progress,
+    resolve,
+    session,
+    subnets,
+    tracing,
+    transform,
+    validation,
+)
 from syntropynac.exceptions import ConfigureNetworkError
 from syntropynac.fields import ALLOWED_TOPOLOGIES, ConfigFields, PeerState, Topology
+from syntropynac.report import DocumentReport
+
+# Pairs per create request. The size adapts between the bounds to the latency and errors of
+# previous requests, shrinking when a batch takes longer than CREATE_BATCH_LATENCY seconds.
+CREATE_BATCH_SIZE = 100
+CREATE_BATCH_MIN = 10
+CREATE_BATCH_MAX = 1000
+CREATE_BATCH_LATENCY = 5.0
+# Connection group ids per remove request and agent pairs per search request when deleting.
+DELETE_CHUNK_SIZE = 500
+
+
+def get_all_connections(api):
+    """Returns a paginator over all the connections of the account."""
+    return pagination.ParallelPagination(
+        sdk.ConnectionsApi(api).v1_network_connections_get,
+        jobs=session.get_settings(api).jobs,
+    )
+
+
+def _created_connection(item):
+    """Shapes an item of a create response like a connection record."""
+    return {
+        "agent_connection_group_id": item["agent_connection_group_id"],
+        "agent_1": {"agent_id": item["agent_1_id"]},
+        "agent_2": {"agent_id": item["agent_2_id"]},
+    }
+
 
+def create_batch(api, peers, sizer=None):
+    """Creates connections between pairs of agents with a single request.
 
-def create_connections(api, peers, silent=False):
+    Connections are taken from the create response. If the response does not list them,
+    they are searched for.
+
+    Args:
+        api (PlatformApi): Instance of the platform API.
+        peers (list): Pairs of agent ids to connect.
+        sizer (AdaptiveBatchSize, optional): Batch size controller to report latency and errors to.
+            Defaults to None.
+
+    Returns:
+        list: Created connections with agent ids and connection group ids.
+    """
     body = models.V1NetworkConnectionsCreateP2PRequest(
         agent_pairs=[
             models.V1NetworkConnectionsCreateP2PRequestAgentPairs(
@@ -17,102 +74,317 @@ def create_connections(api, peers, silent=False):
             for a, b in peers
         ],
     )
-    sdk.ConnectionsApi(api).v1_network_connections_create_p2_p(
-        body=body, _preload_content=False
+    start = time.monotonic()
+    with concurrency.RetryCounter() as counter:
+        try:
+            with tracing.span("create p2p", batch_size=len(peers)):
+                response = sdk.ConnectionsApi(api).v1_network_connections_create_p2_p(
+                    body=body, _preload_content=False
+                )
+        except Exception:
+            if sizer is not None:
+                sizer.record(time.monotonic() - start, errors=counter.retries + 1)
+            raise
+    if sizer is not None:
+        sizer.record(time.monotonic() - start, errors=counter.retries)
+
+    data = utils.deserialize_result(response)
+    data = data.get("data") if isinstance(data, dict) else None
+    if isinstance(data, list):
+        return [_created_connection(item) for item in data]
+
+    with tracing.span("search connections", pairs=len(peers)) as span:
+        frozen_peers = {frozenset(peer) for peer in peers}
+        connections = [
+            con
+            for con in search_connections(api, peers)
+            if frozenset((con["agent_1"]["agent_id"], con["agent_2"]["agent_id"]))
+            in frozen_peers
+        ]
+        span.set(connections=len(connections))
+    return connections
+
+
+def _create_sizer():
+    """Returns a batch size controller for connection creates."""
+    return concurrency.AdaptiveBatchSize(
+        CREATE_BATCH_SIZE, CREATE_BATCH_MIN, CREATE_BATCH_MAX, CREATE_BATCH_LATENCY
     )
 
-    connections = utils.WithPagination(
-        sdk.ConnectionsApi(api).v1_network_connections_get
-    )(_preload_content=False)["data"]
 
-    frozen_peers = [frozenset(peer) for peer in peers]
-    connections = [
-        con
-        for con in connections
-        if frozenset((con["agent_1"]["agent_id"], con["agent_2"]["agent_id"]))
-        in frozen_peers
-    ]
+def _create_stage(api, sizer, task=progress.NOOP_TASK):
+    """Returns a pipeline stage that creates connections in batches sized by `sizer`.
+
+    Input items are (pair, connection, value) tuples. Pairs of the items without a
+    connection are created with one request per batch, items with `pair` set to None are
+    passed through. Every batch outputs a list of (value, connection) tuples, where
+    connection is None if the pair was not created, and a list of the created connections.
+    Once a batch fails, no further batches are started.
+    """
+
+    def create(items):
+        peers = [pair for pair, _, _ in items if pair is not None]
+        created = []
+        if peers:
+            created = create_batch(api, peers, sizer)
+            task.advance(len(peers))
+        by_pair = connections_by_pair(created)
+        return [
+            (
+                [
+                    (
+                        value,
+                        connection if pair is None else by_pair.get(frozenset(pair)),
+                    )
+                    for pair, connection, value in items
+                ],
+                created,
+            )
+        ]
+
+    return concurrency.Stage(
+        "create",
+        profiling.inherit(create),
+        workers=session.get_settings(api).jobs,
+        batch=sizer.next,
+        cancel_on_error=True,
+    )
+
 
-    not silent and click.echo(f"Created {len(connections)} connections")
+def create_connections(api, peers, silent=False, on_created=None, sizer=None):
+    """Creates connections between pairs of agents in concurrent batches.
 
+    Up to `jobs` batches are in flight at once and the size of every next batch adapts to
+    the latency and errors of the previous ones. Connections of each batch are passed to
+    `on_created` one batch at a time as soon as the batch returns, so that they can be
+    configured while the remaining batches are being created. If a batch fails, no further
+    batches are started, the ones in flight are completed and the error is raised.
+
+    Args:
+        api (PlatformApi): Instance of the platform API.
+        peers (list): Pairs of agent ids to connect.
+        silent (bool, optional): Indicates whether to suppress messages - used with Ansible. Defaults to False.
+        on_created (callable, optional): Called with the connections created by each batch. Defaults to None.
+        sizer (AdaptiveBatchSize, optional): Batch size controller. Defaults to a new one.
+
+    Returns:
+        list: Created connections with agent ids and connection group ids.
+    """
+    sizer = sizer if sizer is not None else _create_sizer()
+    connections = []
+
+    def collect(batch):
+        _, created = batch
+        connections.extend(created)
+        if on_created is not None:
+            on_created(created)
+        return []
+
+    with progress.task("create", len(peers), api) as task:
+        try:
+            concurrency.run_pipeline(
+                ((peer, None, None) for peer in peers),
+                [
+                    _create_stage(api, sizer, task=task),
+                    concurrency.Stage("created", profiling.inherit(collect)),
+                ],
+            )
+        finally:
+            not silent and click.echo(f"Created {len(connections)} connections")
     return connections
 
 
-def delete_connections(api, absent):
-    connections = (
-        sdk.ConnectionsApi(api)
-        .v1_network_connections_search(
+def search_connections(api, pairs):
+    """Searches connections between pairs of agents."""
+    return utils.deserialize_result(
+        sdk.ConnectionsApi(api).v1_network_connections_search(
             body=models.V1NetworkConnectionsSearchRequest(
                 filter=models.V1ConnectionFilter(
                     agent_pair=[
                         models.V1AgentPairFilter(agent_1_id=a, agent_2_id=b)
-                        for a, b in absent
+                        for a, b in pairs
                     ]
                 )
             ),
+            _preload_content=False,
         )
-        .to_dict()["data"]
-    )
-
-    sdk.ConnectionsApi(api).v1_network_connections_remove(
-        body=models.V1NetworkConnectionsRemoveRequest(
-            agent_connection_group_ids=[
-                conn["agent_connection_group_id"] for conn in connections
-            ],
-        ),
-    )
+    )["data"]
 
 
-def configure_connection(api, config, connection, silent=False):
-    agents = {
-        connection["agent_1"]["agent_id"]: connection["agent_1"],
-        connection["agent_2"]["agent_id"]: connection["agent_2"],
+def connections_by_pair(connections):
+    """Maps frozensets of agent ids to connections."""
+    return {
+        frozenset(
+            (connection["agent_1"]["agent_id"], connection["agent_2"]["agent_id"])
+        ): connection
+        for connection in connections
     }
 
-    enabled_subnets = set(config.get_subnets(1, agents) + config.get_subnets(2, agents))
-    current_subnets = {
-        subnet["agent_service_subnet_id"]: subnet["agent_connection_subnet_is_enabled"]
-        for subnet in connection["agent_connection_subnets"]
-    }
 
-    # First collect all the changes to the original configured subnets
-    changes = [
-        models.AgentServicesUpdateChanges(
-            agent_service_subnet_id=id,
-            is_enabled=id in enabled_subnets,
+def _delete_recorder(report, deleted=None, updates=None):
+    """Returns an `on_chunk` callback that records delete chunks to a DocumentReport.
+
+    Group ids of the removed chunks are also appended to `deleted` and discarded from
+    ServicesUpdates `updates` if given.
+    """
+
+    def record(chunk, error):
+        report.delete_chunks.append(
+            {
+                "connections": len(chunk),
+                "error": (str(error) or error.__class__.__name__) if error else None,
+            }
         )
-        for id, enabled in current_subnets.items()
-        if (id in enabled_subnets) != enabled
-    ]
-    # Then configure any missing subnets
-    changes += [
-        models.AgentServicesUpdateChanges(
-            agent_service_subnet_id=id,
-            is_enabled=True,
+        if error is None:
+            report.deleted += len(chunk)
+            if deleted is not None:
+                deleted.extend(chunk)
+            if updates is not None:
+                updates.discard(chunk)
+
+    return record
+
+
+def _chunks(items, size):
+    items = list(items)
+    return [items[i : i + size] for i in range(0, len(items), size)]
+
+
+def delete_connections(api, absent, current=None, silent=False, on_chunk=None):
+    """Removes connections between pairs of agents in concurrent chunks.
+
+    Connection group ids of pairs found in `current` are used directly and only the remaining
+    pairs are searched for. Group ids are removed in chunks of DELETE_CHUNK_SIZE with up to
+    `jobs` chunks in flight. A failed chunk does not stop the others, the first error is
+    raised after all of them have finished.
+
+    Args:
+        api (PlatformApi): Instance of the platform API.
+        absent (list): Pairs of agent ids to disconnect.
+        current (dict, optional): Known connections keyed by frozensets of agent ids. Defaults to None.
+        silent (bool, optional): Indicates whether to suppress messages - used with Ansible. Defaults to False.
+        on_chunk (callable, optional): Called in the calling thread with the group ids of each chunk
+            and the exception it failed with or None. Defaults to None.
+
+    Returns:
+        int: Number of removed connections.
+    """
+    current = current if current is not None else {}
+    ids = []
+    unmapped = []
+    for pair in absent:
+        connection = current.get(frozenset(pair))
+        if connection is not None:
+            ids.append(connection["agent_connection_group_id"])
+        else:
+            unmapped.append(pair)
+
+    jobs = session.get_settings(api).jobs
+    with ThreadPoolExecutor(jobs) as executor:
+        if unmapped:
+            with tracing.span("search connections", pairs=len(unmapped)) as span:
+                for found in executor.map(
+                    lambda pairs: search_connections(api, pairs),
+                    _chunks(unmapped, DELETE_CHUNK_SIZE),
+                ):
+                    ids += [conn["agent_connection_group_id"] for conn in found]
+                span.set(connections=len(ids))
+
+        ids = list(dict.fromkeys(ids))
+        removed = 0
+        error = None
+        with progress.task("delete", len(ids), api) as task:
+            futures = {
+                executor.submit(remove_connections, api, chunk): chunk
+                for chunk in _chunks(ids, DELETE_CHUNK_SIZE)
+            }
+            for future in as_completed(futures):
+                chunk = futures[future]
+                chunk_error = future.exception()
+                if chunk_error is None:
+                    removed += len(chunk)
+                else:
+                    error = error or chunk_error
+                    not silent and click.secho(
+                        f"Warning: Failed to remove {len(chunk)} connections: {chunk_error}",
+                        fg="yellow",
+                        err=True,
+                    )
+                if on_chunk is not None:
+                    on_chunk(chunk, chunk_error)
+                task.advance(len(chunk))
+
+    if error is not None:
+        raise error
+    return removed
+
+
+def remove_connections(api, ids):
+    """Removes connections by their group ids with a single request."""
+    with tracing.span("remove connections", batch_size=len(ids)):
+        sdk.ConnectionsApi(api).v1_network_connections_remove(
+            body=models.V1NetworkConnectionsRemoveRequest(
+                agent_connection_group_ids=ids,
+            ),
         )
-        for id in enabled_subnets
-        if id not in current_subnets
-    ]
 
+
+def update_services(api, connection, changes):
+    """Sends subnet changes of a connection, if any.
+
+    Args:
+        api (PlatformApi): Instance of the platform API.
+        connection (dict): Connection with its services.
+        changes (list): (subnet id, enabled) tuples.
+
+    Returns:
+        int: Number of changed subnets.
+    """
     if not changes:
         return 0
 
     body = models.V1NetworkConnectionsServicesUpdateRequest(
         agent_connection_group_id=connection["agent_connection_group_id"],
-        changes=changes,
+        changes=[
+            models.AgentServicesUpdateChanges(
+                agent_service_subnet_id=id,
+                is_enabled=enabled,
+            )
+            for id, enabled in changes
+        ],
     )
-    sdk.ConnectionsApi(api).v1_network_connections_services_update(body=body)
+    with tracing.span("update services", changes=len(changes)):
+        sdk.ConnectionsApi(api).v1_network_connections_services_update(body=body)
     return len(changes)
 
 
-def configure_connections(api, services_config, connections, silent=False):
+def configure_connection(api, config, connection, silent=False):
+    # First the changes to the original configured subnets, then any missing subnets
+    states = subnets.SubnetStates.collect([(config, connection)])
+    return update_services(api, connection, subnets.diff(states)[0])
+
+
+def fetch_services(api, services_config, connections, silent=False):
+    """Fetches services of connections and matches them to ConnectionServices.
+
+    Args:
+        api (PlatformApi): Instance of the platform API.
+        services_config (list): ConnectionServices of the pairs to configure.
+        connections (list): Connections to fetch services of.
+        silent (bool, optional): Indicates whether to suppress messages - used with Ansible. Defaults to False.
+
+    Returns:
+        list: (ConnectionServices, connection with services) tuples in the order of services_config.
+            Pairs without a connection are left out with a warning.
+    """
     ids = [connection["agent_connection_group_id"] for connection in connections]
-    if not ids:
-        return 0, 0
-    connections_services = utils.BatchedRequestFilter(
-        sdk.ConnectionsApi(api).v1_network_connections_services_get,
-        utils.MAX_QUERY_FIELD_SIZE,
-    )(filter=ids, _preload_content=False)["data"]
+    connections_services = []
+    if ids:
+        with tracing.span("fetch services", connections=len(ids)):
+            connections_services = utils.BatchedRequestFilter(
+                sdk.ConnectionsApi(api).v1_network_connections_services_get,
+                utils.MAX_QUERY_FIELD_SIZE,
+            )(filter=ids, _preload_content=False)["data"]
 
     # Build a map of connections so that it would be quicker to resolve them to subnets
     services_map = {}
@@ -121,9 +393,7 @@ def configure_connections(api, services_config, connections, silent=False):
             frozenset((conn["agent_1"]["agent_id"], conn["agent_2"]["agent_id"]))
         ] = conn
 
-    updated_connections = 0
-    updated_subnets = 0
-    # Update subnets with connection subnets
+    matched = []
     for config in services_config:
         key = frozenset((config.agent_1, config.agent_2))
         if key not in services_map:
@@ -133,16 +403,107 @@ def configure_connections(api, services_config, connections, silent=False):
                 err=True,
             )
             continue
+        matched.append((config, services_map[key]))
+    return matched
+
+
+def apply_services(api, matched, updates=None, task=progress.NOOP_TASK):
+    """Enables and disables service subnets of connections matched by `fetch_services`.
+
+    Args:
+        api (PlatformApi): Instance of the platform API.
+        matched (list): (ConnectionServices, connection with services) tuples.
+        updates (ServicesUpdates, optional): Buffer to merge the desired subnets into instead of
+            updating connections right away. Defaults to None.
+        task (Task, optional): Progress task to advance per connection. Defaults to NOOP_TASK.
+
+    Returns:
+        tuple: Numbers of configured connections and toggled subnets, 0 if buffered.
+    """
+    if updates is not None:
+        for config, connection in matched:
+            updates.add(config, connection)
+            task.advance()
+        return len(matched), 0
+
+    # Subnet changes of all the connections are computed at once.
+    with tracing.span("diff subnets", connections=len(matched)):
+        changes = subnets.diff(subnets.SubnetStates.collect(matched))
+
+    updated_subnets = 0
+    for (config, connection), connection_changes in zip(matched, changes):
+        updated_subnets += update_services(api, connection, connection_changes)
+        task.advance()
+    return len(matched), updated_subnets
+
 
-        updated_connections += 1
-        updated_subnets += configure_connection(
-            api, config, services_map[key], silent=silent
+def configure_connections(
+    api, services_config, connections, silent=False, updates=None
+):
+    """Enables and disables service subnets of connections according to services_config.
+
+    Only connections between pairs referenced by `services_config` are fetched with their
+    services.
+
+    Args:
+        api (PlatformApi): Instance of the platform API.
+        services_config (list): ConnectionServices of the pairs to configure.
+        connections (list): Connections to configure the pairs on.
+        silent (bool, optional): Indicates whether to suppress messages - used with Ansible. Defaults to False.
+        updates (ServicesUpdates, optional): Buffer to merge the desired subnets into instead of
+            updating connections right away. Defaults to None.
+
+    Returns:
+        tuple: Numbers of configured connections and toggled subnets, 0 if buffered.
+    """
+    pairs = {frozenset((config.agent_1, config.agent_2)) for config in services_config}
+    connections = [
+        connection
+        for connection in connections
+        if frozenset(
+            (connection["agent_1"]["agent_id"], connection["agent_2"]["agent_id"])
         )
+        in pairs
+    ]
+    if not connections:
+        return 0, 0
+
+    matched = fetch_services(api, services_config, connections, silent=silent)
+    with progress.task("configure services", len(services_config), api) as task:
+        task.advance(len(services_config) - len(matched))
+        return apply_services(api, matched, updates=updates, task=task)
 
-    return updated_connections, updated_subnets
 
+def flush_services_updates(api, updates):
+    """Sends a single services update per connection buffered in ServicesUpdates.
+
+    Args:
+        api (PlatformApi): Instance of the platform API.
+        updates (ServicesUpdates): Buffer filled by configuring documents.
 
-def configure_network_update(api, config, dry_run, silent=False):
+    Returns:
+        tuple: Numbers of configured connections and toggled subnets.
+    """
+    with tracing.span("diff subnets", connections=len(updates)):
+        plan = updates.plan()
+    updated_subnets = 0
+    with progress.task("update services", len(plan), api) as task:
+        for connection, changes in plan:
+            updated_subnets += update_services(api, connection, changes)
+            task.advance()
+    return len(plan), updated_subnets
+
+
+def configure_network_update(
+    api,
+    config,
+    dry_run,
+    silent=False,
+    index=None,
+    snapshot=None,
+    report=None,
+    updates=None,
+):
     """Updates existing network's connection.
     NOTE: This will ignore any preconfigured connections that are not
     explicitly specified in the config dictionary.
@@ -221,97 +582,219 @@ def configure_network_update(api, config, dry_run, silent=False):
         config (dict): Configuration dictionary.
         dry_run (bool): Indicates whether to perform a dry run (without any configuration).
         silent (bool, optional): Indicates whether to suppress messages - used with Ansible. Defaults to False.
+        index (AgentIndex, optional): Agent index to use instead of fetching all agents. Defaults to None.
+        snapshot (ConnectionSnapshot, optional): Cached connections to use instead of fetching them.
+            The snapshot is updated with the changes once they are applied. Defaults to None.
+        report (DocumentReport, optional): Report to record planned and applied changes to. Defaults to None.
+        updates (ServicesUpdates, optional): Run-wide buffer to merge services of the connections into
+            instead of updating them right away. Defaults to None.
     Returns:
         (bool): True if any changes were made and False otherwise
     """
+    report = report if report is not None else DocumentReport()
     topology = config[ConfigFields.TOPOLOGY].upper()
-    connections = utils.WithPagination(
-        sdk.ConnectionsApi(api).v1_network_connections_get
-    )(_preload_content=False)["data"]
-    all_agents = resolve.get_all_agents(api, silent)
-    resolved_connections = transform.transform_connections(
-        all_agents,
-        connections,
-        topology,
-        group_tags=False,
-        silent=silent,
-    )
-    current_connections = {
-        frozenset(
-            (connection["agent_1"]["agent_id"], connection["agent_2"]["agent_id"])
-        ): connection
-        for connection in connections
-    }
+    with profiling.phase("fetch connections") as span:
+        if snapshot is not None:
+            connections = snapshot.get_connections()
+        else:
+            connections = get_all_connections(api)(_preload_content=False)["data"]
+        span.set(connections=len(connections))
+    with profiling.phase("fetch agents") as span:
+        if index is not None:
+            all_agents = index.agents
+        else:
+            all_agents = resolve.get_all_agents(api, silent)
+        span.set(agents=len(all_agents))
+    with profiling.phase("transform", topology=topology):
+        resolved_connections = transform.transform_connections(
+            all_agents,
+            connections,
+            topology,
+            group_tags=False,
+            silent=silent,
+        )
+        current_connections = connections_by_pair(connections)
     config_connections = config.get(ConfigFields.CONNECTIONS, {})
 
-    if topology == Topology.P2P:
-        present, absent, services = resolve.resolve_p2p_connections(
-            api, config_connections, silent=silent
-        )
-    elif topology == Topology.P2M:
-        present, absent, services = resolve.resolve_p2m_connections(
-            api, config_connections, silent=silent
-        )
-    else:
-        present, absent, services = resolve.resolve_mesh_connections(
-            api, config_connections, silent=silent
-        )
-    if topology == Topology.P2P:
-        current, _, _ = resolve.resolve_p2p_connections(
-            api, resolved_connections, silent=silent
-        )
-    elif topology == Topology.P2M:
-        current, _, _ = resolve.resolve_p2m_connections(
-            api, resolved_connections, silent=silent
-        )
-    else:
-        current, _, _ = resolve.resolve_mesh_connections(
-            api, resolved_connections, silent=silent
-        )
+    with profiling.phase("resolve config", topology=topology) as span:
+        if topology == Topology.P2P:
+            pairs, absent = resolve.resolve_p2p_connections(
+                api, config_connections, silent=silent, index=index, lazy=True
+            )
+        elif topology == Topology.P2M:
+            pairs, absent = resolve.resolve_p2m_connections(
+                api, config_connections, silent=silent, index=index, lazy=True
+            )
+        else:
+            pairs, absent = resolve.resolve_mesh_connections(
+                api, config_connections, silent=silent, index=index, lazy=True
+            )
+        span.set(absent=len(absent))
+    with profiling.phase("resolve current", topology=topology) as span:
+        if topology == Topology.P2P:
+            current, _, _ = resolve.resolve_p2p_connections(
+                api, resolved_connections, silent=silent, index=index
+            )
+        elif topology == Topology.P2M:
+            current, _, _ = resolve.resolve_p2m_connections(
+                api, resolved_connections, silent=silent, index=index
+            )
+        else:
+            current, _, _ = resolve.resolve_mesh_connections(
+                api, resolved_connections, silent=silent, index=index
+            )
+        span.set(current=len(current))
 
-    present = [frozenset(i) for i in present]
     absent = [frozenset(i) for i in absent]
-    current = [frozenset(i) for i in current]
-
-    to_add = [list(link) for link in present if link not in current]
+    current = {frozenset(i) for i in current}
+    deleted_agents = {id for link in absent for id in link}
+    report.pairs_to_delete = len(absent)
+
+    # Present pairs are counted as they stream, rather than in a pass of their own.
+    agent_ids = set(deleted_agents)
+
+    def count(link):
+        key = frozenset(link)
+        report.pairs_planned += 1
+        if key in current:
+            report.pairs_unchanged += 1
+        else:
+            report.pairs_to_create += 1
+        agent_ids.update(key)
+        return key
 
     if dry_run:
+        with profiling.phase("diff") as span:
+            for link in pairs.links():
+                count(link)
+            span.set(present=report.pairs_planned, to_add=report.pairs_to_create)
         not silent and click.echo(f"Would remove {len(absent)} connections.")
-    else:
-        delete_connections(api, absent)
+        not silent and click.echo(f"Would create {report.pairs_to_create} connections.")
+        not silent and click.echo(
+            f"Would configure {report.pairs_planned} connections."
+        )
+        return False
+
+    jobs = session.get_settings(api).jobs
+    lock = threading.Lock()
+    created = []
+    deleted = []
+    delete_done = threading.Event()
+    delete_failed = False
+
+    def delete():
+        nonlocal delete_failed
+        try:
+            with profiling.phase("delete", pairs=len(absent)):
+                delete_connections(
+                    api,
+                    absent,
+                    current_connections,
+                    silent=silent,
+                    on_chunk=_delete_recorder(report, deleted, updates),
+                )
+        except Exception:
+            delete_failed = True
+            raise
+        finally:
+            delete_done.set()
         not silent and click.echo(f"Removed {len(absent)} connections.")
 
-    added_connections = []
-    if dry_run:
-        not silent and click.echo(f"Would create {len(to_add)} connections.")
-    elif to_add:
-        added_connections = create_connections(api, to_add, silent)
-
-    to_remove = [
-        conn["agent_connection_group_id"]
-        for link, conn in current_connections.items()
-        if link in absent
-    ]
-    connections = [
-        connection
-        for connection in connections + added_connections
-        if connection["agent_connection_group_id"] not in to_remove
-    ]
+    def diff(item):
+        link, service = item
+        key = count(link)
+        if key in current:
+            return [(None, current_connections.get(key), service)]
+        # Creating a pair waits for the deletes only if it shares an endpoint with a
+        # deleted pair, and is skipped if they failed.
+        if not deleted_agents.isdisjoint(key) and not delete_done.is_set():
+            with profiling.phase("wait for delete"):
+                delete_done.wait()
+        if delete_failed and not deleted_agents.isdisjoint(key):
+            return []
+        return [(list(key), None, service)]
+
+    def fetch(batch, task):
+        items, batch_created = batch
+        with lock:
+            report.created += len(batch_created)
+            created.extend(batch_created)
+        services = [service for service, _ in items]
+        connections = [connection for _, connection in items if connection is not None]
+        with profiling.phase("fetch services", connections=len(connections)):
+            matched = fetch_services(api, services, connections, silent=silent)
+        task.advance(len(services) - len(matched))
+        return [matched]
+
+    def update(matched, task):
+        with profiling.phase("update services", connections=len(matched)):
+            updated_connections, updated_subnets = apply_services(
+                api, matched, updates=updates, task=task
+            )
+        with lock:
+            report.connections_configured += updated_connections
+            report.subnets_toggled += updated_subnets
+        return []
+
+    def apply():
+        # Pairs stream through bounded queues from resolving to services updates, so that
+        # only a few batches of them are held at once and every stage keeps working.
+        # NOTE: The number of configured pairs is not known upfront, pairs of the config
+        # are an upper bound.
+        with progress.task("configure", len(pairs.present), api) as task:
+            stages = [
+                concurrency.Stage("diff", profiling.inherit(diff)),
+                _create_stage(api, _create_sizer()),
+                concurrency.Stage(
+                    "fetch services",
+                    profiling.inherit(functools.partial(fetch, task=task)),
+                    workers=jobs,
+                    queue_size=2 * jobs,
+                ),
+                concurrency.Stage(
+                    "update services",
+                    profiling.inherit(functools.partial(update, task=task)),
+                    # NOTE: ServicesUpdates buffer is not thread safe.
+                    workers=jobs if updates is None else 1,
+                    queue_size=2 * jobs,
+                ),
+            ]
+            concurrency.run_pipeline(pairs, stages)
+
+    concurrency.run_graph(
+        {
+            "delete": (profiling.inherit(delete), ()),
+            "apply": (profiling.inherit(apply), ()),
+        }
+    )
 
-    if dry_run:
-        not silent and click.echo(f"Would configure {len(connections)} connections.")
-    else:
-        updated_connections, updated_subnets = configure_connections(
-            api, services, connections, silent=silent
+    not silent and report.pairs_to_create and click.echo(
+        f"Created {report.created} connections"
+    )
+    if updates is not None:
+        not silent and click.echo(
+            f"Queued services of {report.connections_configured} connections"
         )
+    else:
         not silent and click.echo(
-            f"Configured {updated_connections} connections and {updated_subnets} subnets"
+            f"Configured {report.connections_configured} connections and {report.subnets_toggled} subnets"
         )
-        return True
-    return False
-
-
-def configure_network_delete(api, config, dry_run, silent=False):
+    if snapshot is not None:
+        with profiling.phase("update snapshot"):
+            snapshot.update(api, agent_ids, created, deleted, agents=all_agents)
+    return True
+
+
+def configure_network_delete(
+    api,
+    config,
+    dry_run,
+    silent=False,
+    index=None,
+    snapshot=None,
+    report=None,
+    updates=None,
+):
     """Deletes existing network's connections and the network itself.
 
     Args:
@@ -319,35 +802,68 @@ def configure_network_delete(api, config, dry_run, silent=False):
         network (dict): Dictionary containing id and name keys.
         dry_run (bool): Indicates whether to perform a dry run (without any configuration).
         silent (bool, optional): Indicates whether to suppress messages - used with Ansible. Defaults to False.
+        index (AgentIndex, optional): Agent index to resolve names and tags with. Defaults to None.
+        snapshot (ConnectionSnapshot, optional): Cached connections to update after deletion. Defaults to None.
+        report (DocumentReport, optional): Report to record planned and applied changes to. Defaults to None.
+        updates (ServicesUpdates, optional): Run-wide buffer to discard the removed connections from.
+            Defaults to None.
 
     Returns:
         (bool): True if any changes were made and False otherwise
     """
+    report = report if report is not None else DocumentReport()
     config_connections = config.get(ConfigFields.CONNECTIONS, {})
     topology = config[ConfigFields.TOPOLOGY].upper()
 
-    if topology == Topology.P2P:
-        _, absent, _ = resolve.resolve_p2p_connections(
-            api, config_connections, silent=silent
-        )
-    elif topology == Topology.P2M:
-        _, absent, _ = resolve.resolve_p2m_connections(
-            api, config_connections, silent=silent
-        )
-    else:
-        _, absent, _ = resolve.resolve_mesh_connections(
-            api, config_connections, silent=silent
-        )
+    with profiling.phase("resolve config"):
+        if topology == Topology.P2P:
+            _, absent, _ = resolve.resolve_p2p_connections(
+                api, config_connections, silent=silent, index=index
+            )
+        elif topology == Topology.P2M:
+            _, absent, _ = resolve.resolve_p2m_connections(
+                api, config_connections, silent=silent, index=index
+            )
+        else:
+            _, absent, _ = resolve.resolve_mesh_connections(
+                api, config_connections, silent=silent, index=index
+            )
 
+    report.pairs_to_delete = len(absent)
     if dry_run:
         not silent and click.echo(f"Would delete {len(absent)} connections...")
         return False
     else:
-        delete_connections(api, absent)
+        current_connections = None
+        deleted = []
+        if snapshot is not None:
+            current_connections = connections_by_pair(snapshot.get_connections())
+        with profiling.phase("delete", pairs=len(absent)):
+            delete_connections(
+                api,
+                absent,
+                current_connections,
+                silent=silent,
+                on_chunk=_delete_recorder(report, deleted, updates),
+            )
+        if snapshot is not None:
+            with profiling.phase("update snapshot"):
+                snapshot.update(
+                    api, {id for link in absent for id in link}, deleted=deleted
+                )
         return True
 
 
-def configure_network(api, config, dry_run, silent=False):
+def configure_network(
+    api,
+    config,
+    dry_run,
+    silent=False,
+    index=None,
+    snapshot=None,
+    report=None,
+    updates=None,
+):
     """Configures Syntropy Network based on the current state and the requested state.
 
     Args:
@@ -355,31 +871,35 @@ def configure_network(api, config, dry_run, silent=False):
         config (dict): Configuration dictionary.
         dry_run (bool): Indicates whether to perform a dry run (without any configuration).
         silent (bool, optional): Indicates whether to suppress messages - used with Ansible. Defaults to False.
+        index (AgentIndex, optional): Agent index to resolve names and tags with. Defaults to None.
+        snapshot (ConnectionSnapshot, optional): Cached connections of a long running process. Defaults to None.
+        report (DocumentReport, optional): Report to record planned and applied changes to. Defaults to None.
+        updates (ServicesUpdates, optional): Run-wide buffer to merge services of the connections into.
+            Pass the buffer to `flush_services_updates` once all the documents are configured. Defaults to None.
 
     Returns:
         (bool): True if any changes were made and False otherwise
     """
-    if not all(i in config for i in (ConfigFields.TOPOLOGY, ConfigFields.STATE)):
-        error = f"{ConfigFields.TOPOLOGY} and {ConfigFields.STATE} must be present"
-        if not silent:
-            click.secho(error, err=True, fg="red")
-        else:
-            raise ConfigureNetworkError(error)
-        return False
-
-    state = config[ConfigFields.STATE]
-    if state not in (PeerState.PRESENT, PeerState.ABSENT):
-        error = f"Invalid state {state}"
+    report = report if report is not None else DocumentReport()
+    report.dry_run = dry_run
+    # NOTE: Documents are refused for the same reasons as by the `validate` command.
+    for _, error in validation.header_issues(config):
+        report.error = error
         if not silent:
             click.secho(error, fg="red", err=True)
             return False
         else:
             raise ConfigureNetworkError(error)
 
-    if not resolve.validate_connections(
-        config.get(ConfigFields.CONNECTIONS, {}), silent
-    ):
+    state = config[ConfigFields.STATE]
+
+    with profiling.phase("validate"):
+        valid = resolve.validate_connections(
+            config.get(ConfigFields.CONNECTIONS, {}), silent
+        )
+    if not valid:
         error = f"Invalid {ConfigFields.CONNECTIONS} format."
+        report.error = error
         if not silent:
             click.secho(error, fg="red", err=True)
             return False
@@ -389,7 +909,17 @@ def configure_network(api, config, dry_run, silent=False):
     not silent and click.secho(f"Configuring network", fg="green")
 
     if state == PeerState.PRESENT:
-        return configure_network_update(api, config, dry_run, silent=silent)
-    elif state == PeerState.ABSENT:
-        return configure_network_delete(api, config, dry_run, silent=silent)
-    return False
+        configure = configure_network_update
+    else:
+        configure = configure_network_delete
+    report.changed = configure(
+        api,
+        config,
+        dry_run,
+        silent=silent,
+        index=index,
+        snapshot=snapshot,
+        report=report,
+        updates=updates,
+    )
+    return report.changed
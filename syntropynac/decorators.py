@@ -2,13 +2,22 @@ import functools
 import os
 
 import click
-import syntropy_sdk as sdk
-from syntropy_sdk.rest import ApiException
+
+from syntropynac import profiling
 
 
 class EnvVars:
     API_URL = "SYNTROPY_API_SERVER"
     TOKEN = "SYNTROPY_API_TOKEN"
+    CACHE_DIR = "SYNTROPY_NAC_CACHE_DIR"
+
+
+def _get_option(name, default=None):
+    """Retrieves an option that was passed to the command group."""
+    ctx = click.get_current_context(silent=True)
+    if ctx is None or not isinstance(ctx.obj, dict):
+        return default
+    return ctx.obj.get(name, default)
 
 
 def syntropy_api(func):
@@ -16,6 +25,12 @@ def syntropy_api(func):
 
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
+        # NOTE: The SDK is imported only when a command that talks to the API runs
+        # in order to keep CLI startup fast.
+        from syntropy_sdk.rest import ApiException
+
+        from syntropynac import auth, session, stats
+
         API_URL = os.environ.get(EnvVars.API_URL)
         API_KEY = os.environ.get(EnvVars.TOKEN)
 
@@ -36,16 +51,75 @@ def syntropy_api(func):
             raise SystemExit(1)
 
         try:
-            config = sdk.Configuration()
-            config.host = API_URL
-            config.api_key[
-                "Authorization"
-            ] = "Bearer " + sdk.utils.login_with_access_token(API_URL, API_KEY)
-            api = sdk.ApiClient(config)
-            return func(*args, api=api, **kwargs)
+            cache = None
+            if _get_option("token_cache", True):
+                cache = auth.TokenCache(os.environ.get(EnvVars.CACHE_DIR))
+            api = session.connect(
+                API_URL, API_KEY, settings=_get_option("session"), cache=cache
+            )
+            api_stats = stats.get_stats(api)
+            try:
+                return func(*args, api=api, **kwargs)
+            finally:
+                stats_json = _get_option("stats_json")
+                if stats_json:
+                    api_stats.write(stats_json)
         except ApiException as err:
             click.secho("API error occured", err=True, fg="red")
             click.secho(f"Reason: {str(err)}", err=True, fg="red")
             raise SystemExit(2)
 
     return wrapper
+
+
+def profile_options(func):
+    """Helper decorator that adds --profile and --profile-output options to a command"""
+
+    @click.option(
+        "--profile",
+        is_flag=True,
+        default=False,
+        help="Print wall and CPU time spent in every phase to stderr.",
+    )
+    @click.option(
+        "--profile-output",
+        default=None,
+        type=click.Path(dir_okay=False),
+        help=(
+            "Run every thread under cProfile and write PATH.pstats and "
+            "PATH.collapsed(flamegraph stacks) files."
+        ),
+    )
+    @functools.wraps(func)
+    def wrapper(*args, profile, profile_output, **kwargs):
+        with profiling.profile_run(profile, profile_output):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+def budget_options(func):
+    """Helper decorator that adds --max-pairs, --max-calls and --max-duration options to a command"""
+    options = (
+        click.option(
+            "--max-pairs",
+            default=None,
+            type=click.IntRange(min=0),
+            help="Refuse to proceed if more connection pairs would be created or deleted.",
+        ),
+        click.option(
+            "--max-calls",
+            default=None,
+            type=click.IntRange(min=0),
+            help="Refuse to proceed if more API calls are estimated.",
+        ),
+        click.option(
+            "--max-duration",
+            default=None,
+            type=click.FloatRange(min=0),
+            help="Refuse to proceed if the run is estimated to take longer(in seconds).",
+        ),
+    )
+    for option in reversed(options):
+        func = option(func)
+    return func
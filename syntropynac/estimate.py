@@ -0,0 +1,281 @@
+import math
+from collections import Counter
+from dataclasses import dataclass
+
+import click
+
+from syntropynac import validation
+from syntropynac.configure import CREATE_BATCH_SIZE, DELETE_CHUNK_SIZE
+from syntropynac.fields import ConfigFields, PeerState, PeerType, Topology
+from syntropynac.progress import format_duration
+
+# NOTE: Byte and latency figures are rough averages that are only good for orders of magnitude.
+DEFAULT_LATENCY = 0.25
+CREATE_PAIR_BYTES = 40
+DELETE_PAIR_BYTES = 40
+SERVICES_UPDATE_BYTES = 160
+
+
+@dataclass
+class Estimate:
+    """Predicted cost of applying a configuration document or a whole run.
+
+    Pair counts assume that none of the present pairs exist yet, so create and services
+    figures are upper bounds.
+    """
+
+    index: int = None
+    name: str = None
+    topology: str = None
+    endpoints: int = 0
+    pairs_present: int = 0
+    pairs_absent: int = 0
+    create_calls: int = 0
+    delete_calls: int = 0
+    services_calls: int = 0
+    services_update_calls: int = 0
+    request_bytes: int = 0
+    duration: float = 0.0
+    error: str = None
+
+    @property
+    def pairs(self):
+        return self.pairs_present + self.pairs_absent
+
+    @property
+    def api_calls(self):
+        return (
+            self.create_calls
+            + self.delete_calls
+            + self.services_calls
+            + self.services_update_calls
+        )
+
+    def add(self, other):
+        """Adds counts of another estimate, e.g. to compute run totals."""
+        for name in (
+            "endpoints",
+            "pairs_present",
+            "pairs_absent",
+            "create_calls",
+            "delete_calls",
+            "services_calls",
+            "services_update_calls",
+            "request_bytes",
+            "duration",
+        ):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+
+    def to_dict(self):
+        return {
+            "index": self.index,
+            "name": self.name,
+            "topology": self.topology,
+            "endpoints": self.endpoints,
+            "pairs": self.pairs,
+            "pairs_present": self.pairs_present,
+            "pairs_absent": self.pairs_absent,
+            "create_calls": self.create_calls,
+            "delete_calls": self.delete_calls,
+            "services_calls": self.services_calls,
+            "services_update_calls": self.services_update_calls,
+            "api_calls": self.api_calls,
+            "request_bytes": self.request_bytes,
+            "duration": round(self.duration, 3),
+            "error": self.error,
+        }
+
+
+def _pairs(count):
+    return count * (count - 1) // 2
+
+
+def _member_counts(index, entries):
+    """Counts distinct endpoints of a connections dictionary after tag expansion.
+
+    Follows `resolve.expand_agents_tags`: tag members are keyed by agent name, absent tags
+    win over present ones and explicit entries override tag members.
+
+    Returns:
+        dict: Endpoint name to a (state, has services) tuple.
+    """
+    members = {}
+    for name, entry in entries.items():
+        if entry.get(ConfigFields.PEER_TYPE) != PeerType.TAG:
+            continue
+        state = entry.get(ConfigFields.STATE, PeerState.PRESENT)
+        member = (state, bool(entry.get(ConfigFields.SERVICES)))
+        for agent in index.tags.get(name, []):
+            agent_name = agent["agent_name"]
+            if agent_name not in members or (
+                state == PeerState.ABSENT
+                and members[agent_name][0] == PeerState.PRESENT
+            ):
+                members[agent_name] = member
+    for name, entry in entries.items():
+        if entry.get(ConfigFields.PEER_TYPE) != PeerType.TAG:
+            members[name] = (
+                entry.get(ConfigFields.STATE, PeerState.PRESENT),
+                bool(entry.get(ConfigFields.SERVICES)),
+            )
+    return members
+
+
+def _count(counts, state, services=None):
+    return sum(
+        count
+        for (member_state, member_services), count in counts.items()
+        if (member_state == PeerState.ABSENT) == (state == PeerState.ABSENT)
+        and (services is None or member_services == services)
+    )
+
+
+def _estimate_pairs(topology, connections, index):
+    """Returns numbers of endpoints, present pairs, absent pairs and present pairs with services.
+
+    For P2P and P2M topologies endpoints of every source are counted separately.
+    """
+    if topology == Topology.MESH:
+        counts = Counter(_member_counts(index, connections).values())
+        total = sum(counts.values())
+        present = _pairs(_count(counts, PeerState.PRESENT))
+        with_services = present - _pairs(_count(counts, PeerState.PRESENT, False))
+        return total, present, _pairs(total) - present, with_services
+
+    endpoints = present = absent = with_services = 0
+    for name, src in connections.items():
+        dst_dict = src.get(ConfigFields.CONNECT_TO)
+        if not dst_dict:
+            continue
+        if topology == Topology.P2P:
+            dst_dict = dict([next(iter(dst_dict.items()))])
+        members = _member_counts(index, dst_dict)
+        # NOTE: Pairs of an endpoint with itself are dropped, e.g. when it has a tag it connects to.
+        members.pop(name, None)
+        counts = Counter(members.values())
+        dst_total = sum(counts.values())
+        endpoints += 1 + dst_total
+        if src.get(ConfigFields.STATE) == PeerState.ABSENT:
+            absent += dst_total
+            continue
+        dst_present = _count(counts, PeerState.PRESENT)
+        absent += dst_total - dst_present
+        present += dst_present
+        with_services += (
+            dst_present
+            if src.get(ConfigFields.SERVICES)
+            else _count(counts, PeerState.PRESENT, True)
+        )
+    return endpoints, present, absent, with_services
+
+
+def estimate_document(config, index, latency=DEFAULT_LATENCY):
+    """Predicts the cost of applying a configuration document without enumerating pairs.
+
+    Args:
+        config (dict): Configuration document.
+        index (AgentIndex): Agent index used to determine tag sizes.
+        latency (float, optional): Assumed seconds per API call. Defaults to DEFAULT_LATENCY.
+
+    Returns:
+        Estimate: Predicted numbers of pairs, API calls, bytes and duration.
+    """
+    estimate = Estimate()
+    errors = [
+        message
+        for severity, message in validation.document_issues(config)
+        if severity == validation.ERROR
+    ]
+    if errors:
+        estimate.error = errors[0]
+        return estimate
+
+    estimate.name = config.get(ConfigFields.NAME)
+    estimate.topology = config[ConfigFields.TOPOLOGY].upper()
+    endpoints, present, absent, with_services = _estimate_pairs(
+        estimate.topology, config.get(ConfigFields.CONNECTIONS, {}), index
+    )
+    if config[ConfigFields.STATE] == PeerState.ABSENT:
+        # NOTE: Deleting a network only removes the pairs marked as absent.
+        present, with_services = 0, 0
+
+    estimate.endpoints = endpoints
+    estimate.pairs_present = present
+    estimate.pairs_absent = absent
+    # Pairs are created in batches of the initial size and services of every batch are
+    # fetched separately. Deletion searches for connections, unless they are already known,
+    # and removes them in chunks.
+    estimate.create_calls = math.ceil(present / CREATE_BATCH_SIZE)
+    estimate.delete_calls = 2 * math.ceil(absent / DELETE_CHUNK_SIZE)
+    estimate.services_calls = estimate.create_calls
+    estimate.services_update_calls = with_services
+    estimate.request_bytes = (
+        present * CREATE_PAIR_BYTES
+        + absent * DELETE_PAIR_BYTES
+        + with_services * SERVICES_UPDATE_BYTES
+    )
+    # NOTE: Calls are assumed to be made one after another, although create batches overlap.
+    estimate.duration = estimate.api_calls * latency
+    return estimate
+
+
+def over_budget(estimate, max_pairs=None, max_calls=None, max_duration=None):
+    """Returns a list of messages describing exceeded budgets, empty if within budgets."""
+    messages = []
+    if max_pairs is not None and estimate.pairs > max_pairs:
+        messages.append(f"{estimate.pairs} pairs exceed the budget of {max_pairs}.")
+    if max_calls is not None and estimate.api_calls > max_calls:
+        messages.append(
+            f"{estimate.api_calls} API calls exceed the budget of {max_calls}."
+        )
+    if max_duration is not None and estimate.duration > max_duration:
+        messages.append(
+            f"Estimated {estimate.duration:.0f}s exceed the budget of {max_duration:g}s."
+        )
+    return messages
+
+
+def estimate_documents(documents, index, latency=DEFAULT_LATENCY):
+    """Estimates every document of a run.
+
+    Returns:
+        tuple: A list of Estimates per document and an Estimate of the whole run.
+    """
+    estimates = []
+    total = Estimate()
+    for position, document in enumerate(documents):
+        estimate = estimate_document(document, index, latency=latency)
+        estimate.index = position
+        estimates.append(estimate)
+        total.add(estimate)
+    return estimates, total
+
+
+def echo(estimates, total):
+    """Prints estimates as a table."""
+    click.echo(
+        f"{'document':<24} {'topology':<8} {'endpoints':>9} {'pairs':>10} "
+        f"{'calls':>8} {'bytes':>11} {'duration':>9}"
+    )
+    for estimate in estimates + [total]:
+        if estimate is total:
+            name = "total"
+        else:
+            name = f"{estimate.index}: {estimate.name or ''}"
+        if estimate.error:
+            click.secho(f"{name[:24]:<24} {estimate.error}", fg="yellow")
+            continue
+        click.echo(
+            f"{name[:24]:<24} {estimate.topology or '':<8} {estimate.endpoints:>9} "
+            f"{estimate.pairs:>10} {estimate.api_calls:>8} {estimate.request_bytes:>11} "
+            f"{format_duration(estimate.duration):>9}"
+        )
+
+
+def enforce_budgets(total, max_pairs=None, max_calls=None, max_duration=None):
+    """Prints exceeded budgets and exits with status 1 if any budget is exceeded."""
+    messages = over_budget(total, max_pairs, max_calls, max_duration)
+    for message in messages:
+        click.secho(f"Budget exceeded: {message}", err=True, fg="red")
+    if messages:
+        raise SystemExit(1)
@@ -0,0 +1,153 @@
+import hashlib
+import json
+
+import syntropy_sdk as sdk
+from syntropy_sdk import utils
+
+from syntropynac import pagination, session
+
+DIGEST_BITS = 256
+DIGEST_MODULUS = 1 << DIGEST_BITS
+
+
+def connection_digest(connection, services=None):
+    """Computes a stable digest of a single connection and its subnet states.
+
+    Args:
+        connection (dict): A connection object as returned by the connections API.
+        services (dict, optional): Connection services object as returned by
+            v1_network_connections_services_get. Defaults to None.
+
+    Returns:
+        int: A 256 bit digest of the connection.
+    """
+    agent_ids = sorted(
+        (connection["agent_1"]["agent_id"], connection["agent_2"]["agent_id"])
+    )
+    subnets = sorted(
+        (
+            subnet["agent_service_subnet_id"],
+            bool(subnet["agent_connection_subnet_is_enabled"]),
+        )
+        for subnet in (services or {}).get("agent_connection_subnets", [])
+    )
+    payload = json.dumps(
+        [connection["agent_connection_group_id"], agent_ids, subnets],
+        separators=(",", ":"),
+    )
+    return int.from_bytes(hashlib.sha256(payload.encode()).digest(), "big")
+
+
+class Fingerprint:
+    """Order independent digest of the connections among a set of agents.
+
+    The digest is a sum of per connection digests modulo 2**256, therefore two
+    fingerprints can be combined without rehashing and agents can be added
+    one by one using `extend`, which only fetches the connections of new agents.
+    """
+
+    def __init__(self, agent_ids=(), digests=None):
+        self.agent_ids = set(agent_ids)
+        self.digests = {}
+        self._sum = 0
+        for group_id, digest in (digests or {}).items():
+            self.add(group_id, digest)
+
+    def add(self, group_id, digest):
+        """Adds a connection digest unless the connection is already accounted for."""
+        if group_id in self.digests:
+            return
+        self.digests[group_id] = digest
+        self._sum = (self._sum + digest) % DIGEST_MODULUS
+
+    def remove(self, group_id):
+        """Removes a connection digest if it is present."""
+        digest = self.digests.pop(group_id, None)
+        if digest is not None:
+            self._sum = (self._sum - digest) % DIGEST_MODULUS
+
+    def combine(self, other):
+        """Returns a new fingerprint covering connections of both fingerprints.
+
+        NOTE: Connections between agents of different fingerprints are not fetched,
+        use `extend` in order to get the fingerprint of the union of agent sets.
+        """
+        result = Fingerprint(self.agent_ids | other.agent_ids, self.digests)
+        for group_id, digest in other.digests.items():
+            result.add(group_id, digest)
+        return result
+
+    __add__ = combine
+
+    def extend(self, api, agent_ids):
+        """Adds agents to the fingerprint fetching only the connections of new agents.
+
+        Args:
+            api (PlatformApi): API object to communicate with the platform.
+            agent_ids (iterable): Agent ids to add.
+
+        Returns:
+            Fingerprint: self
+        """
+        new_ids = set(agent_ids) - self.agent_ids
+        if not new_ids:
+            return self
+        self.agent_ids |= new_ids
+
+        connections = pagination.search_agents_connections(
+            api, new_ids, jobs=session.get_settings(api).jobs
+        )
+        # Connections between two new agents are returned twice and connections
+        # to agents outside the set are irrelevant.
+        connections = {
+            connection["agent_connection_group_id"]: connection
+            for connection in connections
+            if connection["agent_1"]["agent_id"] in self.agent_ids
+            and connection["agent_2"]["agent_id"] in self.agent_ids
+            and connection["agent_connection_group_id"] not in self.digests
+        }
+        if not connections:
+            return self
+
+        connections_services = utils.BatchedRequestFilter(
+            sdk.ConnectionsApi(api).v1_network_connections_services_get,
+            utils.MAX_QUERY_FIELD_SIZE,
+        )(filter=list(connections.keys()), _preload_content=False)["data"]
+        services_map = {
+            services["agent_connection_group_id"]: services
+            for services in connections_services
+        }
+
+        for group_id, connection in connections.items():
+            self.add(
+                group_id, connection_digest(connection, services_map.get(group_id))
+            )
+
+        return self
+
+    def hexdigest(self):
+        return format(self._sum, f"0{DIGEST_BITS // 4}x")
+
+    def __eq__(self, other):
+        return isinstance(other, Fingerprint) and self._sum == other._sum
+
+    def __len__(self):
+        return len(self.digests)
+
+    def __repr__(self):
+        return f"Fingerprint({self.hexdigest()}, connections={len(self)})"
+
+
+def get_agents_fingerprint(api, agent_ids):
+    """Computes a fingerprint of connections among given agents along with their subnet states.
+
+    Uses a single connections search and as few batched connection services requests as possible.
+
+    Args:
+        api (PlatformApi): API object to communicate with the platform.
+        agent_ids (iterable): Agent ids to compute the fingerprint for.
+
+    Returns:
+        Fingerprint: Fingerprint of the connections.
+    """
+    return Fingerprint().extend(api, agent_ids)
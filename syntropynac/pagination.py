@@ -0,0 +1,127 @@
+import collections
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+import syntropy_sdk as sdk
+from syntropy_sdk import models, utils
+
+from syntropynac import tracing
+from syntropynac.settings import DEFAULT_JOBS
+
+# Response headers that may carry the total number of entries. The list responses of the
+# platform currently do not include a count in the body.
+TOTAL_COUNT_HEADERS = ("X-Total-Count",)
+
+
+def total_count(response):
+    """Returns the total number of entries advertised by a raw response or None."""
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    for header in TOTAL_COUNT_HEADERS:
+        value = headers.get(header)
+        if value is not None:
+            try:
+                return int(value)
+            except ValueError:
+                return None
+    return None
+
+
+class ParallelPagination:
+    """Calls a paginated api method concurrently and reassembles the pages in order.
+
+    A drop-in replacement for `sdk.utils.WithPagination`. The first page is fetched alone
+    since most lists fit into it. If the first response advertises the total count, exactly
+    the remaining pages are requested, otherwise pages are requested speculatively, at most
+    `jobs` at a time, until the first short page.
+
+    Example:
+        ParallelPagination(sdk.AgentsApi(api).v1_network_agents_get, jobs=4)(_preload_content=False)
+    """
+
+    def __init__(self, func, jobs=DEFAULT_JOBS, max_take=utils.TAKE_MAX_ITEMS_PER_CALL):
+        self.func = func
+        self.jobs = max(1, jobs)
+        self.max_take = max_take
+
+    def __call__(self, *args, **kwargs):
+        return {"data": list(self.iter_records(*args, **kwargs))}
+
+    def iter_records(self, *args, **kwargs):
+        """Yields records as soon as the page containing them and all preceding pages arrive."""
+        for page in self.iter_pages(*args, **kwargs):
+            yield from page
+
+    def iter_pages(self, *args, **kwargs):
+        """Yields lists of records page by page in order."""
+        take = kwargs.pop("take", 0) or None
+        skip = kwargs.pop("skip", 0) or 0
+
+        def fetch(offset):
+            with tracing.span("fetch page", skip=offset):
+                response = self.func(*args, skip=offset, take=self.max_take, **kwargs)
+                return total_count(response), utils.deserialize_result(response)["data"]
+
+        total, first = fetch(skip)
+        rest = self._fetch_rest(fetch, skip, total, first)
+        remaining = take
+        try:
+            for page in itertools.chain((first,), rest):
+                if remaining is not None:
+                    page = page[:remaining]
+                    remaining -= len(page)
+                if page:
+                    yield page
+                if len(page) < self.max_take or remaining == 0:
+                    return
+        finally:
+            rest.close()
+
+    def _fetch_rest(self, fetch, skip, total, first):
+        if len(first) < self.max_take:
+            return
+        offsets = itertools.count(skip + self.max_take, self.max_take)
+        if total is not None:
+            offsets = iter(range(skip + self.max_take, total, self.max_take))
+
+        pending = collections.deque()
+        with ThreadPoolExecutor(self.jobs) as executor:
+            try:
+                for offset in itertools.islice(offsets, self.jobs):
+                    pending.append(executor.submit(fetch, offset))
+                while pending:
+                    _, page = pending.popleft().result()
+                    # NOTE: Keep the window full while the consumer processes this page.
+                    for offset in itertools.islice(offsets, 1):
+                        pending.append(executor.submit(fetch, offset))
+                    yield page
+            finally:
+                # NOTE: Speculative requests beyond the end are cancelled if not started yet.
+                for future in pending:
+                    future.cancel()
+
+
+def search_agents_connections(api, agent_ids, jobs=DEFAULT_JOBS):
+    """Returns all the connections of agents, searching for them page by page.
+
+    Args:
+        api (PlatformApi): API object to communicate with the platform.
+        agent_ids (iterable): Agent ids whose connections to return.
+        jobs (int, optional): Number of pages to request at once. Defaults to DEFAULT_JOBS.
+    """
+    agent_ids = sorted(agent_ids)
+    search = sdk.ConnectionsApi(api).v1_network_connections_search
+
+    def search_page(skip, take, **kwargs):
+        # NOTE: Search takes the page bounds in the body rather than in the query.
+        return search(
+            body=models.V1NetworkConnectionsSearchRequest(
+                filter=models.V1ConnectionFilter(agent_id=agent_ids),
+                skip=skip,
+                take=take,
+            ),
+            **kwargs,
+        )
+
+    return ParallelPagination(search_page, jobs=jobs)(_preload_content=False)["data"]
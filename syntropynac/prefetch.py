@@ -0,0 +1,111 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from syntropynac import configure, resolve, session, tracing, validation
+from syntropynac.fields import ConfigFields, PeerType
+
+
+def endpoint_lookups(config):
+    """Finds endpoint names and tags that resolving a configuration document will look up.
+
+    Documents with errors are skipped since they are not configured.
+
+    Returns:
+        tuple: Sets of endpoint names and tag names.
+    """
+    names, tags = set(), set()
+    if any(
+        severity == validation.ERROR
+        for severity, _ in validation.document_issues(config)
+    ):
+        return names, tags
+
+    def walk(connections, level):
+        for name, con in connections.items():
+            peer_type = con.get(ConfigFields.PEER_TYPE)
+            if peer_type == PeerType.TAG:
+                tags.add(name)
+            elif peer_type == PeerType.ENDPOINT and con.get(ConfigFields.ID) is None:
+                names.add(name)
+            if level == 0 and ConfigFields.CONNECT_TO in con:
+                walk(con[ConfigFields.CONNECT_TO], level + 1)
+
+    walk(config.get(ConfigFields.CONNECTIONS, {}), 0)
+    return names, tags
+
+
+class Prefetch:
+    """Reads the agent inventory, the connections and endpoint lookups in the background.
+
+    The reads are started as soon as the object is created, so that their latency overlaps
+    with parsing and validating configuration. The object can be passed as `index` to
+    `configure_network` since it answers the same questions as `resolve.AgentIndex`, waiting
+    for the corresponding future if it is not done yet. Names and tags that were not
+    discovered beforehand are looked up on demand.
+    """
+
+    def __init__(self, api):
+        self.api = api
+        self.executor = ThreadPoolExecutor(session.get_settings(api).jobs)
+        self._lock = threading.Lock()
+        self._names = {}
+        self._tags = {}
+        self._agents = self.executor.submit(
+            self._traced, "prefetch agents", resolve.get_all_agents, api
+        )
+        self.connections = self.executor.submit(
+            self._traced, "prefetch connections", self._fetch_connections
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def _traced(name, func, *args):
+        with tracing.span(name):
+            return func(*args)
+
+    def _fetch_connections(self):
+        return configure.get_all_connections(self.api)(_preload_content=False)["data"]
+
+    def discover(self, config):
+        """Starts looking up the endpoint names and tags of a configuration document."""
+        names, tags = endpoint_lookups(config)
+        for name in names:
+            self._lookup(self._names, name, resolve.resolve_agent_by_name)
+        for tag in tags:
+            self._lookup(self._tags, tag, resolve.search_agents_by_tag)
+
+    def _lookup(self, futures, key, func):
+        with self._lock:
+            if key not in futures:
+                futures[key] = self.executor.submit(
+                    self._traced, "prefetch lookup", func, self.api, key
+                )
+            return futures[key]
+
+    @property
+    def agents(self):
+        return self._agents.result()
+
+    def resolve_name(self, name):
+        return list(
+            self._lookup(self._names, name, resolve.resolve_agent_by_name).result()
+        )
+
+    def resolve_tag(self, tag):
+        return list(
+            self._lookup(self._tags, tag, resolve.search_agents_by_tag).result()
+        )
+
+    def close(self):
+        """Cancels reads that have not started yet."""
+        futures = [self._agents, self.connections]
+        with self._lock:
+            futures += [*self._names.values(), *self._tags.values()]
+        for future in futures:
+            future.cancel()
+        self.executor.shutdown(wait=False)
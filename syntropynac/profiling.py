@@ -0,0 +1,311 @@
+import contextlib
+import cProfile
+import functools
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+import click
+
+from syntropynac import tracing
+
+SAMPLE_INTERVAL = 0.005
+
+_profiler = None
+_local = threading.local()
+
+
+class PhaseProfiler:
+    """Accumulates wall and CPU time spent in named phases.
+
+    Nested phases are recorded under their full path, e.g. "configure/resolve/names".
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.order = []
+        self._lock = threading.Lock()
+
+    def register(self, path):
+        with self._lock:
+            if path not in self.phases:
+                self.phases[path] = [0, 0.0, 0.0]
+                self.order.append(path)
+
+    def record(self, path, wall, cpu):
+        with self._lock:
+            phase = self.phases[path]
+            phase[0] += 1
+            phase[1] += wall
+            phase[2] += cpu
+
+    def summary(self):
+        """Returns a list of dicts describing every recorded phase in the order of appearance."""
+        return [
+            {
+                "phase": path,
+                "calls": self.phases[path][0],
+                "wall": self.phases[path][1],
+                "cpu": self.phases[path][2],
+            }
+            for path in self.order
+        ]
+
+    def echo(self):
+        click.echo(f"{'phase':<48} {'calls':>6} {'wall, s':>9} {'cpu, s':>9}", err=True)
+        for row in self.summary():
+            depth = row["phase"].count("/")
+            name = "  " * depth + row["phase"].rsplit("/", 1)[-1]
+            click.echo(
+                f"{name:<48} {row['calls']:>6} {row['wall']:>9.3f} {row['cpu']:>9.3f}",
+                err=True,
+            )
+
+
+class _Phase:
+    __slots__ = (
+        "profiler",
+        "collectors",
+        "span",
+        "name",
+        "paths",
+        "stack",
+        "wall",
+        "cpu",
+    )
+
+    def __init__(self, profiler, collectors, name, span):
+        self.profiler = profiler
+        self.collectors = collectors
+        self.span = span
+        self.stack = _stack()
+        self.name = name
+        self.paths = None
+
+    def __enter__(self):
+        self.stack.append(self.name)
+        self.paths = []
+        if self.profiler is not None:
+            self.paths.append((self.profiler, "/".join(self.stack)))
+        for collector, depth in self.collectors:
+            self.paths.append((collector, "/".join(self.stack[depth:])))
+        for profiler, path in self.paths:
+            profiler.register(path)
+        self.span.__enter__()
+        self.wall, self.cpu = time.perf_counter(), time.process_time()
+        return self.span
+
+    def __exit__(self, *exc):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        for profiler, path in self.paths:
+            profiler.record(path, wall, cpu)
+        self.stack.pop()
+        return self.span.__exit__(*exc)
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def phase(name, **attributes):
+    """Records wall and CPU time of the enclosed block as a named phase.
+    The phase is traced as a span with given attributes as well.
+
+    Does nothing unless a profiling run, phase collection or tracing is active.
+
+    Returns:
+        A context manager that yields a span, so that attributes could be
+        added using `span.set(...)`.
+    """
+    profiler = _profiler
+    collectors = getattr(_local, "collectors", ())
+    if profiler is None and not collectors:
+        return tracing.span(name, **attributes)
+    return _Phase(profiler, tuple(collectors), name, tracing.span(name, **attributes))
+
+
+@contextlib.contextmanager
+def collect_phases():
+    """Records phases of the enclosed block into a separate profiler, e.g. for a report.
+
+    Works independently of `profile_run`. Only phases of the current thread are recorded
+    and their paths are relative to the enclosing phase.
+
+    Yields:
+        PhaseProfiler: The profiler that receives the phases.
+    """
+    profiler = PhaseProfiler()
+    collectors = getattr(_local, "collectors", None)
+    if collectors is None:
+        collectors = _local.collectors = []
+    entry = (profiler, len(_stack()))
+    collectors.append(entry)
+    try:
+        yield profiler
+    finally:
+        collectors.remove(entry)
+
+
+def inherit(func):
+    """Wraps a function so that phases it records in another thread nest under the current phase.
+
+    Phase collectors of the current thread, e.g. of a report, receive the phases as well.
+    """
+    stack = list(_stack())
+    collectors = list(getattr(_local, "collectors", ()))
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        saved = getattr(_local, "stack", None), getattr(_local, "collectors", None)
+        _local.stack, _local.collectors = list(stack), list(collectors)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.stack, _local.collectors = saved
+
+    return wrapper
+
+
+def timed(name):
+    """Decorator that records every call of the function as a named phase."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with phase(name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class StackSampler(threading.Thread):
+    """Periodically samples stacks of all the threads and counts collapsed stacks.
+
+    The result can be written in the collapsed stack format used by flamegraph tools.
+    """
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(name="syntropynac-sampler", daemon=True)
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop_event.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in names:
+                    names = {
+                        thread.ident: thread.name for thread in threading.enumerate()
+                    }
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ThreadProfiles:
+    """Runs cProfile in the calling thread and in every thread started meanwhile.
+
+    cProfile only profiles the thread it is enabled in, so threads of executors and
+    pipelines are given a profiler of their own through `threading.setprofile`. The stats
+    of all of them are merged when dumped.
+    """
+
+    def __init__(self):
+        self.profiles = [cProfile.Profile()]
+        self._lock = threading.Lock()
+
+    def _start_thread(self, frame, event, arg):
+        profile = cProfile.Profile()
+        with self._lock:
+            self.profiles.append(profile)
+        # NOTE: Replaces this hook in the new thread.
+        profile.enable()
+
+    def enable(self):
+        threading.setprofile(self._start_thread)
+        self.profiles[0].enable()
+
+    def disable(self):
+        self.profiles[0].disable()
+        threading.setprofile(None)
+
+    def dump_stats(self, path):
+        with self._lock:
+            profiles = list(self.profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        stats.dump_stats(path)
+
+
+@contextlib.contextmanager
+def profile_run(enabled=True, output=None):
+    """Activates phase profiling for the enclosed block.
+
+    Args:
+        enabled (bool, optional): Indicates whether to print the phases recorded. Defaults to True.
+        output (str, optional): If provided, the block and the threads it starts also run under
+            cProfile and a stack sampler, and `{output}.pstats` and `{output}.collapsed` files
+            are written. Defaults to None.
+
+    Yields:
+        PhaseProfiler: The active profiler or None if profiling is disabled.
+    """
+    global _profiler
+
+    if not enabled and not output:
+        yield None
+        return
+
+    profiler = PhaseProfiler()
+    previous, _profiler = _profiler, profiler
+    cprofile = sampler = None
+    if output:
+        cprofile = ThreadProfiles()
+        sampler = StackSampler()
+        sampler.start()
+        cprofile.enable()
+    try:
+        with phase("total"):
+            yield profiler
+    finally:
+        if output:
+            cprofile.disable()
+            sampler.stop()
+            cprofile.dump_stats(f"{output}.pstats")
+            sampler.write(f"{output}.collapsed")
+        _profiler = previous
+        if enabled:
+            profiler.echo()
@@ -0,0 +1,198 @@
+import collections
+import sys
+import threading
+import time
+
+# NOTE: This module is imported by the command line entry point, so it must stay light.
+
+AUTO = "auto"
+TTY = "tty"
+LOG = "log"
+OFF = "off"
+MODES = (AUTO, TTY, LOG, OFF)
+
+# Minimum seconds between rendered updates. Phases shorter than that are never shown.
+TTY_INTERVAL = 0.2
+LOG_INTERVAL = 10.0
+# Throughput is averaged over completions within this many seconds.
+RATE_WINDOW = 5.0
+
+_reporter = None
+
+
+class NoopTask:
+    """Task that does nothing, returned while progress reporting is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def advance(self, count=1):
+        pass
+
+
+NOOP_TASK = NoopTask()
+
+
+class Task:
+    """Counts completed operations of a phase and asks the reporter to render them."""
+
+    def __init__(self, reporter, name, total, api=None):
+        self.reporter = reporter
+        self.name = name
+        self.total = total
+        self.api = api
+        self.done = 0
+        self.start = time.monotonic()
+        self.rendered = False
+        self._samples = collections.deque([(self.start, 0)])
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.reporter.finish(self)
+        return False
+
+    def advance(self, count=1):
+        """Marks `count` operations as completed. Safe to call from worker threads."""
+        now = time.monotonic()
+        with self._lock:
+            self.done += count
+            self._samples.append((now, self.done))
+            while len(self._samples) > 2 and now - self._samples[0][0] > RATE_WINDOW:
+                self._samples.popleft()
+        self.reporter.update(self, now)
+
+    def rate(self, now):
+        """Returns recent throughput in operations per second."""
+        with self._lock:
+            since, done = self._samples[0]
+            current = self.done
+        elapsed = now - since
+        return (current - done) / elapsed if elapsed > 0 else 0.0
+
+    def in_flight(self):
+        limiter = getattr(self.api, "limiter", None)
+        return getattr(limiter, "in_flight", None)
+
+    def describe(self, now):
+        rate = self.rate(now)
+        parts = [f"{self.name}: {self.done}/{self.total}"]
+        if self.total:
+            parts[0] += f" ({self.done / self.total:.0%})"
+        parts.append(f"{rate:.1f} ops/s")
+        in_flight = self.in_flight()
+        if in_flight is not None:
+            parts.append(f"{in_flight} in flight")
+        remaining = self.total - self.done
+        if remaining <= 0:
+            parts.append(f"done in {format_duration(now - self.start)}")
+        elif rate > 0:
+            parts.append(f"ETA {format_duration(remaining / rate)}")
+        else:
+            parts.append("ETA unknown")
+        return ", ".join(parts)
+
+
+class Reporter:
+    """Renders progress of tasks at most once per `interval` seconds.
+
+    In a TTY the status line is rewritten in place, otherwise every update is
+    written as a separate log line.
+    """
+
+    def __init__(self, tty, interval, stream=None):
+        self.tty = tty
+        self.interval = interval
+        self.stream = stream if stream is not None else sys.stderr
+        self._last = 0.0
+        self._width = 0
+        self._lock = threading.Lock()
+
+    def task(self, name, total, api=None):
+        return Task(self, name, total, api)
+
+    def update(self, task, now):
+        # NOTE: Checked without the lock first, so that frequent updates stay cheap.
+        if now - max(self._last, task.start) < self.interval:
+            return
+        with self._lock:
+            if now - max(self._last, task.start) < self.interval:
+                return
+            self._last = now
+            self._write(task.describe(now))
+            task.rendered = True
+
+    def finish(self, task):
+        """Renders the final state of a task if it was shown at all."""
+        if not task.rendered:
+            return
+        with self._lock:
+            self._write(task.describe(time.monotonic()))
+            if self.tty:
+                self.stream.write("\n")
+                self._width = 0
+            self.stream.flush()
+
+    def _write(self, line):
+        if self.tty:
+            self.stream.write("\r" + line.ljust(self._width))
+            self._width = len(line)
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+
+def format_duration(seconds):
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    minutes, seconds = divmod(seconds, 60)
+    if minutes < 60:
+        return f"{minutes}m{seconds:02d}s"
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m"
+
+
+def task(name, total, api=None):
+    """Returns a context manager that reports progress of a phase with `total` operations.
+
+    Returns a shared no-op task unless progress reporting was started.
+
+    Args:
+        name (str): Phase name.
+        total (int): Number of operations expected.
+        api (ApiClient, optional): Client whose in-flight requests are shown. Defaults to None.
+    """
+    reporter = _reporter
+    if reporter is None:
+        return NOOP_TASK
+    return reporter.task(name, total, api)
+
+
+def start(mode=AUTO, interval=None, stream=None):
+    """Starts progress reporting and returns the reporter or None if mode is "off"."""
+    global _reporter
+    stream = stream if stream is not None else sys.stderr
+    if mode == OFF:
+        _reporter = None
+        return None
+    if mode == AUTO:
+        mode = TTY if stream.isatty() else LOG
+    tty = mode == TTY
+    if interval is None:
+        interval = TTY_INTERVAL if tty else LOG_INTERVAL
+    _reporter = Reporter(tty, interval, stream)
+    return _reporter
+
+
+def stop():
+    """Stops progress reporting."""
+    global _reporter
+    _reporter = None
@@ -0,0 +1,138 @@
+import contextlib
+import dataclasses
+import json
+import time
+from dataclasses import dataclass, field
+
+import click
+
+from syntropynac import profiling, stats
+
+# Counters that are summed up into the run totals.
+TOTAL_FIELDS = (
+    "pairs_planned",
+    "pairs_unchanged",
+    "pairs_to_create",
+    "pairs_to_delete",
+    "created",
+    "deleted",
+    "connections_configured",
+    "subnets_toggled",
+    "api_calls",
+    "request_bytes",
+    "response_bytes",
+)
+
+
+@dataclass
+class DocumentReport:
+    """Outcome of applying a single configuration document.
+
+    `pairs_*` fields describe the plan: pairs requested as present, those that already exist
+    and pairs to create and to delete. `created` and `deleted` count connections actually
+    created and deleted, so they stay 0 on a dry run. `delete_chunks` lists the number of
+    connections and the error, if any, of every remove request.
+    """
+
+    index: int = None
+    name: str = None
+    topology: str = None
+    state: str = None
+    dry_run: bool = False
+    changed: bool = False
+    pairs_planned: int = 0
+    pairs_unchanged: int = 0
+    pairs_to_create: int = 0
+    pairs_to_delete: int = 0
+    created: int = 0
+    deleted: int = 0
+    connections_configured: int = 0
+    subnets_toggled: int = 0
+    api_calls: int = 0
+    request_bytes: int = 0
+    response_bytes: int = 0
+    duration: float = 0.0
+    phases: dict = field(default_factory=dict)
+    delete_chunks: list = field(default_factory=list)
+    error: str = None
+
+    @contextlib.contextmanager
+    def measure(self, api):
+        """Records duration, phases and API usage of the enclosed block.
+
+        NOTE: API usage includes requests made by background threads, e.g. prefetching,
+        while the block runs.
+        """
+        api_stats = stats.get_stats(api)
+        before = api_stats.total() if api_stats is not None else None
+        start = time.perf_counter()
+        try:
+            with profiling.collect_phases() as phases:
+                yield self
+        except Exception as err:
+            self.error = str(err) or err.__class__.__name__
+            raise
+        finally:
+            self.duration = round(time.perf_counter() - start, 6)
+            for row in phases.summary():
+                self.phases[row["phase"]] = round(row["wall"], 6)
+            if before is not None:
+                after = api_stats.total()
+                self.api_calls = after.calls - before.calls
+                self.request_bytes = after.request_bytes - before.request_bytes
+                self.response_bytes = after.response_bytes - before.response_bytes
+
+    def to_dict(self):
+        return dataclasses.asdict(self)
+
+
+class RunReport:
+    """Collects DocumentReports of a single run and writes them as JSON.
+
+    Services updates that were merged across documents are only counted in the totals.
+    """
+
+    def __init__(self):
+        self.documents = []
+        self.services_connections = 0
+        self.services_subnets = 0
+        self.start = time.perf_counter()
+
+    def add(self, index, config):
+        """Creates a report for a configuration document."""
+        document = DocumentReport(index=index)
+        if isinstance(config, dict):
+            document.name = config.get("name")
+            document.topology = config.get("topology")
+            document.state = config.get("state")
+        self.documents.append(document)
+        return document
+
+    def services_updated(self, connections, subnets):
+        """Records services updates sent once for the whole run."""
+        self.services_connections += connections
+        self.services_subnets += subnets
+
+    def summary(self):
+        totals = {
+            name: sum(getattr(document, name) for document in self.documents)
+            for name in TOTAL_FIELDS
+        }
+        totals["subnets_toggled"] += self.services_subnets
+        totals["services_updates"] = self.services_connections
+        totals["documents"] = len(self.documents)
+        totals["errors"] = sum(1 for document in self.documents if document.error)
+        totals["duration"] = round(time.perf_counter() - self.start, 6)
+        return {
+            "total": totals,
+            "documents": [document.to_dict() for document in self.documents],
+        }
+
+    def write(self, path):
+        """Writes JSON summary to a file or to stderr if path is "-"."""
+        summary = json.dumps(self.summary(), indent=4)
+        if path == "-":
+            click.echo(summary, err=True)
+        else:
+            with open(path, "w") as f:
+                f.write(summary)
@@ -1,21 +1,72 @@
+import bisect
 import functools
-from dataclasses import dataclass
+from collections import defaultdict
 from itertools import combinations
 
 import click
 import syntropy_sdk as sdk
 from syntropy_sdk import models, utils
 
+from syntropynac import pagination, profiling, session, tracing, validation
 from syntropynac.exceptions import ConfigureNetworkError
 from syntropynac.fields import ALLOWED_PEER_TYPES, ConfigFields, PeerState, PeerType
 
 
-@dataclass
+class SubnetCache:
+    """Subnet ids of agent services, computed once per agent and tuple of service names.
+
+    Assumes that agents with the same id have the same services, e.g. that they come from
+    a single services response.
+    """
+
+    __slots__ = ("_subnets",)
+
+    def __init__(self):
+        self._subnets = {}
+
+    def get(self, agent, service_names):
+        key = (agent["agent_id"], tuple(service_names))
+        subnets = self._subnets.get(key)
+        if subnets is None:
+            names = set(service_names)
+            subnets = self._subnets[key] = [
+                subnet["agent_service_subnet_id"]
+                for service in agent["agent_services"]
+                if service["agent_service_name"] in names
+                for subnet in service["agent_service_subnets"]
+            ]
+        return subnets
+
+
 class ConnectionServices:
-    agent_1: int
-    agent_2: int
-    agent_1_service_names: list
-    agent_2_service_names: list
+    """Services to enable on both sides of a connection between two agents."""
+
+    __slots__ = (
+        "agent_1",
+        "agent_2",
+        "agent_1_service_names",
+        "agent_2_service_names",
+    )
+
+    def __init__(self, agent_1, agent_2, agent_1_service_names, agent_2_service_names):
+        self.agent_1 = agent_1
+        self.agent_2 = agent_2
+        self.agent_1_service_names = agent_1_service_names
+        self.agent_2_service_names = agent_2_service_names
+
+    def _fields(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{self.__class__.__name__}({fields})"
 
     @classmethod
     def create(cls, link, endpoints):
@@ -42,55 +93,104 @@ class ConnectionServices:
             )
         return service_names
 
-    def get_subnets(self, endpoint_id, agents):
-        agent_id = getattr(self, f"agent_{endpoint_id}")
-        service_names = getattr(self, f"agent_{endpoint_id}_service_names")
-        agent = agents[agent_id]
+    def get_subnets(self, endpoint_id, agents, cache=None):
+        """Returns subnet ids of the services to enable on one side of the connection.
 
-        return [
-            subnet["agent_service_subnet_id"]
-            for service in agent["agent_services"]
-            for subnet in service["agent_service_subnets"]
-            if service["agent_service_name"] in service_names
-        ]
+        Args:
+            endpoint_id (int): 1 or 2.
+            agents (dict): Agents with their services keyed by agent id.
+            cache (SubnetCache, optional): Cache shared between connections. Defaults to None.
+        """
+        if endpoint_id == 1:
+            agent, service_names = self.agent_1, self.agent_1_service_names
+        else:
+            agent, service_names = self.agent_2, self.agent_2_service_names
+        cache = cache if cache is not None else SubnetCache()
+        return cache.get(agents[agent], service_names)
 
 
 @functools.lru_cache(maxsize=None)
 def resolve_agent_by_name(api, name, silent=False):
-    agents = (
-        sdk.AgentsApi(api)
-        .v1_network_agents_search(
+    agents = utils.deserialize_result(
+        sdk.AgentsApi(api).v1_network_agents_search(
             models.V1NetworkAgentsSearchRequest(
                 filter=models.V1AgentFilter(agent_name=name),
             ),
+            _preload_content=False,
         )
-        .to_dict()["data"]
-    )
+    )["data"]
 
     return [agent["agent_id"] for agent in agents]
 
 
+def search_agents_by_tag(api, tag):
+    return utils.deserialize_result(
+        sdk.AgentsApi(api).v1_network_agents_search(
+            models.V1NetworkAgentsSearchRequest(
+                filter=models.V1AgentFilter(agent_tag_name=[tag]),
+            ),
+            _preload_content=False,
+        )
+    )["data"]
+
+
 @functools.lru_cache(maxsize=None)
 def get_all_agents(api, silent=False):
-    agents = sdk.utils.WithPagination(sdk.AgentsApi(api).v1_network_agents_get)(
-        _preload_content=False,
-    )["data"]
+    agents = pagination.ParallelPagination(
+        sdk.AgentsApi(api).v1_network_agents_get, jobs=session.get_settings(api).jobs
+    ).iter_records(_preload_content=False)
 
     return {agent["agent_id"]: agent for agent in agents}
 
 
-def resolve_agents(api, agents, silent=False):
+class AgentIndex:
+    """In-memory index of agents by name and by tag name.
+
+    Used instead of name and tag search requests when all the agents are already known.
+    """
+
+    def __init__(self, agents):
+        self.agents = agents
+        self.names = defaultdict(list)
+        self.tags = defaultdict(list)
+        for agent in agents.values():
+            self.names[agent["agent_name"]].append(agent["agent_id"])
+            for tag in agent.get("agent_tags") or []:
+                self.tags[tag["agent_tag_name"]].append(agent)
+
+    @classmethod
+    def fetch(cls, api, silent=False):
+        """Builds the index from a fresh list of all the agents."""
+        return cls(get_all_agents.__wrapped__(api, silent=silent))
+
+    def resolve_name(self, name):
+        return list(self.names.get(name, []))
+
+    def resolve_tag(self, tag):
+        return [
+            {"agent_id": agent["agent_id"], "agent_name": agent["agent_name"]}
+            for agent in self.tags.get(tag, [])
+        ]
+
+
+@profiling.timed("names")
+def resolve_agents(api, agents, silent=False, index=None):
     """Resolves endpoint names to ids inplace.
 
     Args:
         api (PlatformApi): API object to communicate with the platform.
         agents (dict): A dictionary containing endpoints.
         silent (bool, optional): Indicates whether to suppress messages - used with Ansible. Defaults to False.
+        index (AgentIndex, optional): Agent index to resolve names with instead of the API. Defaults to None.
     """
+    tracing.current_span().set(endpoints=len(agents))
     for name, id in agents.items():
         if id is not None:
             continue
-        result = resolve_agent_by_name(api, name, silent=silent)
+        if index is not None:
+            result = index.resolve_name(name)
+        else:
+            result = resolve_agent_by_name(api, name, silent=silent)
         if len(result) != 1:
             error = f"Could not resolve endpoint name {name}, found: {result}."
             if not silent:
@@ -118,7 +218,75 @@ def get_peer_id(peer_name, peer_config):
         return None
 
 
-def resolve_present_absent(agents, present, absent):
+class PresentPairs:
+    """Present connections of a config resolved into agent ids one at a time.
+
+    Iterating yields ([agent 1 id, agent 2 id], ConnectionServices) tuples in config order,
+    so that the pairs are never held in memory all at once. `links` yields agent ids only and
+    is what the length is counted with.
+    """
+
+    __slots__ = ("agents", "present", "absent")
+
+    def __init__(self, agents, present, absent):
+        self.agents = agents
+        self.present = present
+        self.absent = {tuple(link) for link in absent}
+
+    def _resolve(self):
+        agents, absent = self.agents, self.absent
+        for endpoints in self.present:
+            src, dst = endpoints
+            link = [agents[src[0]], agents[dst[0]]]
+            if (
+                link[0] != link[1]
+                and (link[0], link[1]) not in absent
+                and (link[1], link[0]) not in absent
+            ):
+                yield link, endpoints
+
+    def links(self):
+        """Yields [agent 1 id, agent 2 id] of every pair without resolving its services."""
+        for link, _ in self._resolve():
+            yield link
+
+    def __iter__(self):
+        for link, endpoints in self._resolve():
+            yield link, ConnectionServices.create(link, endpoints)
+
+    def __len__(self):
+        return sum(1 for _ in self.links())
+
+
+def _is_present(endpoint):
+    return endpoint[1].get(ConfigFields.STATE, PeerState.PRESENT) == PeerState.PRESENT
+
+
+class MeshPairs:
+    """Present (name, connection) pairs of a mesh, generated on every iteration.
+
+    A mesh of n endpoints has n * (n - 1) / 2 pairs, so they are not stored. Pairs of two
+    endpoints with invalid states are left out, see `resolve_mesh_connections`.
+    """
+
+    __slots__ = ("endpoints", "invalid")
+
+    def __init__(self, endpoints):
+        self.endpoints = endpoints
+        self.invalid = sum(1 for endpoint in endpoints if not _is_present(endpoint))
+
+    def __iter__(self):
+        for src, dst in combinations(self.endpoints, 2):
+            if _is_present(src) or _is_present(dst):
+                yield src, dst
+
+    def __len__(self):
+        count, invalid = len(self.endpoints), self.invalid
+        return count * (count - 1) // 2 - invalid * (invalid - 1) // 2
+
+
+@profiling.timed("pairs")
+def resolve_present_absent(agents, present, absent, lazy=False):
     """Resolves agent connections by objects into agent connections by ids.
     Additionally removes any present connections if they were already added to absent.
 
@@ -130,36 +298,35 @@ def resolve_present_absent(agents, present, absent):
 
     Args:
         agents (dict[str, int]): Agent map from name to id.
-        present (list): A list of connections that are marked as present in the config.
+        present (list): A list of connections that are marked as present in the config,
+            or any other sized iterable of them that can be iterated repeatedly, e.g. MeshPairs.
         absent (list): A list of connections that are marked as absent in the config.
+        lazy (bool, optional): Return PresentPairs instead of present connections and services.
+            Defaults to False.
 
     Returns:
         tuple: Three items that correspond to present/absent connections and a list
             of ConnectionServices objects that correspond to present connections.
+            If lazy is set, two items - PresentPairs and absent connections.
 
             Present/absent connections is a list of lists of two elements, where
             elements are agent ids.
     """
-    present_ids = [[agents[src[0]], agents[dst[0]]] for src, dst in present]
-    absent_ids = [[agents[src[0]], agents[dst[0]]] for src, dst in absent]
-    services = [
-        ConnectionServices.create(link, conn)
-        for link, conn in zip(present_ids, present)
-        if link not in absent_ids
-        and link[::-1] not in absent_ids
-        and link[0] != link[1]
+    tracing.current_span().set(present=len(present), absent=len(absent))
+    absent_ids = [
+        [agents[src[0]], agents[dst[0]]]
+        for src, dst in absent
+        if agents[src[0]] != agents[dst[0]]
     ]
-    return (
-        [
-            link
-            for link in present_ids
-            if link not in absent_ids
-            and link[::-1] not in absent_ids
-            and link[0] != link[1]
-        ],
-        [i for i in absent_ids if i[0] != i[1]],
-        services,
-    )
+    pairs = PresentPairs(agents, present, absent_ids)
+    if lazy:
+        return pairs, absent_ids
+    present_ids = []
+    services = []
+    for link, service in pairs:
+        present_ids.append(link)
+        services.append(service)
+    return present_ids, absent_ids, services
 
 
 def validate_connections(connections, silent=False, level=0):
@@ -178,143 +345,29 @@ def validate_connections(connections, silent=False, level=0):
     Returns:
         bool: Returns False in case of invalid connections structure.
     """
-    if level > 1:
-        silent or click.secho(
-            (
-                f"Field {ConfigFields.CONNECT_TO} found at level {level + 1}. This will be ignored, "
-                "however, please double check your configuration file."
-            )
-        )
-        return True
-
-    for name, con in connections.items():
-        if not name or not isinstance(name, (str, int)):
-            error = f"Invalid endpoint name found."
-            if not silent:
-                click.secho(error, err=True, fg="red")
-                return False
-            else:
-                raise ConfigureNetworkError(error)
-
-        if not isinstance(con, dict):
-            error = f"Entry '{name}' in {ConfigFields.CONNECT_TO} must be a dictionary, but found {con.__class__.__name__}."
-            if not silent:
-                click.secho(error, err=True, fg="red")
-                return False
-            else:
-                raise ConfigureNetworkError(error)
-
-        if ConfigFields.PEER_TYPE not in con:
-            error = f"Endpoint '{name}' {ConfigFields.PEER_TYPE} must be present."
-            if not silent:
-                click.secho(error, err=True, fg="red")
-                return False
-            else:
-                raise ConfigureNetworkError(error)
-
-        if con[ConfigFields.PEER_TYPE] not in ALLOWED_PEER_TYPES:
-            error = f"Endpoint '{name}' {ConfigFields.PEER_TYPE} '{con[ConfigFields.PEER_TYPE]}' is not allowed."
-            if not silent:
-                click.secho(error, err=True, fg="red")
-                return False
-            else:
-                raise ConfigureNetworkError(error)
-
-        probably_an_id = False
-        try:
-            name_as_id = int(name)
-            probably_an_id = True
-        except ValueError:
-            name_as_id = name
-        if probably_an_id and con[ConfigFields.PEER_TYPE] == PeerType.ENDPOINT:
-            click.secho(
-                (
-                    f"Endpoint '{name}' {ConfigFields.PEER_TYPE} is {PeerType.ENDPOINT}, however, "
-                    f"it appears to be an {PeerType.ID}."
-                ),
-                err=True,
-                fg="yellow",
-            )
-        if not probably_an_id and con[ConfigFields.PEER_TYPE] == PeerType.ID:
-            error = (
-                f"Endpoint '{name}' {ConfigFields.PEER_TYPE} is {PeerType.ID}, however, "
-                f"it appears to be an {PeerType.ENDPOINT}."
-            )
-            if not silent:
-                click.secho(error, err=True, fg="red")
-                return False
-            else:
-                raise ConfigureNetworkError(error)
-
-        if ConfigFields.ID in con and con[ConfigFields.ID] is not None:
-            try:
-                _ = int(con[ConfigFields.ID])
-                id_valid = True
-            except ValueError:
-                id_valid = False
-            if (
-                not isinstance(con[ConfigFields.ID], (str, int))
-                or not con[ConfigFields.ID]
-                or not id_valid
-            ):
-                error = f"Endpoint '{name}' {ConfigFields.ID} is invalid."
-                if not silent:
-                    click.secho(error, err=True, fg="red")
-                    return False
-                else:
-                    raise ConfigureNetworkError(error)
-
-            if (
-                con[ConfigFields.PEER_TYPE] == PeerType.ID
-                and int(con[ConfigFields.ID]) != name_as_id
-            ):
-                error = f"Endpoint '{name}' {ConfigFields.ID} field does not match endpoint id."
-                if not silent:
-                    click.secho(error, err=True, fg="red")
-                    return False
-                else:
-                    raise ConfigureNetworkError(error)
-
-        if ConfigFields.SERVICES in con:
-            if not isinstance(con[ConfigFields.SERVICES], (list, tuple)):
-                error = (
-                    f"Endpoint '{name}' {ConfigFields.SERVICES} must be a "
-                    f"list, but found {con[ConfigFields.SERVICES].__class__.__name__}."
-                )
-                if not silent:
-                    click.secho(error, err=True, fg="red")
-                    return False
-                else:
-                    raise ConfigureNetworkError(error)
-
-            for service in con[ConfigFields.SERVICES]:
-                if not isinstance(service, (str, int)):
-                    error = (
-                        f"Endpoint '{name}' service must be a string"
-                        f", but found {service.__class__.__name__}."
-                    )
-                    if not silent:
-                        click.secho(error, err=True, fg="red")
-                        return False
-                    else:
-                        raise ConfigureNetworkError(error)
-
-        if ConfigFields.CONNECT_TO in con:
-            if not validate_connections(
-                con[ConfigFields.CONNECT_TO], silent, level + 1
-            ):
-                return False
+    for severity, message in validation.connection_issues(connections, level):
+        if severity == validation.WARNING:
+            silent or click.secho(message, err=True, fg="yellow")
+            continue
+        if not silent:
+            click.secho(message, err=True, fg="red")
+            return False
+        else:
+            raise ConfigureNetworkError(message)
 
     return True
 
 
-def resolve_p2p_connections(api, connections, silent=False):
+def resolve_p2p_connections(api, connections, silent=False, index=None, lazy=False):
     """Resolves configuration connections for Point to Point topology.
 
     Args:
         api (PlatformApi): API object to communicate with the platform.
         connections (dict): A dictionary containing connections as described in the config file.
         silent (bool, optional): Indicates whether to suppress messages - used with Ansible. Defaults to False.
+        index (AgentIndex, optional): Agent index to resolve names and tags with. Defaults to None.
+        lazy (bool, optional): Resolve present connections lazily, see `resolve_present_absent`.
+            Defaults to False.
 
     Returns:
         list: A list of two item lists describing endpoint to endpoint connections.
@@ -349,20 +402,22 @@ def resolve_p2p_connections(api, connections, silent=False):
             else:
                 raise ConfigureNetworkError(error)
 
-    resolve_agents(api, agents, silent=silent)
+    resolve_agents(api, agents, silent=silent, index=index)
     if any(id is None for id in agents.keys()):
-        return resolve_present_absent({}, [], [])
+        return resolve_present_absent({}, [], [], lazy=lazy)
 
-    return resolve_present_absent(agents, present, absent)
+    return resolve_present_absent(agents, present, absent, lazy=lazy)
 
 
-def expand_agents_tags(api, dst_dict, silent=False):
+@profiling.timed("tags")
+def expand_agents_tags(api, dst_dict, silent=False, index=None):
     """Expand tag endpoints into individual endpoints.
 
     Args:
         api (PlatformApi): API object to communicate with the platform.
         dst_dict (dict): Connections dictionary that contain tags as endpoints.
         silent (bool, optional): Indicates whether to suppress messages - used with Ansible. Defaults to False.
+        index (AgentIndex, optional): Agent index to expand tags with instead of the API. Defaults to None.
 
     Raises:
         ConfigureNetworkError: In case of any errors
@@ -377,15 +432,10 @@ def expand_agents_tags(api, dst_dict, silent=False):
         if dst.get(ConfigFields.PEER_TYPE) != PeerType.TAG:
             continue
 
-        agents = (
-            sdk.AgentsApi(api)
-            .v1_network_agents_search(
-                models.V1NetworkAgentsSearchRequest(
-                    filter=models.V1AgentFilter(agent_tag_name=[name]),
-                ),
-            )
-            .to_dict()["data"]
-        )
+        if index is not None:
+            agents = index.resolve_tag(name)
+        else:
+            agents = search_agents_by_tag(api, name)
 
         if not agents:
             error = f"Could not find endpoints by the tag {name}"
@@ -415,16 +465,20 @@ def expand_agents_tags(api, dst_dict, silent=False):
             items[name] = dst
             continue
 
+    tracing.current_span().set(endpoints=len(items))
     return items
 
 
-def resolve_p2m_connections(api, connections, silent=False):
+def resolve_p2m_connections(api, connections, silent=False, index=None, lazy=False):
     """Resolves configuration connections for Point to Multipoint topology. Also, expands tags.
 
     Args:
         api (PlatformApi): API object to communicate with the platform.
         connections (dict): A dictionary containing connections as described in the config file.
         silent (bool, optional): Indicates whether to suppress messages - used with Ansible. Defaults to False.
+        index (AgentIndex, optional): Agent index to resolve names and tags with. Defaults to None.
+        lazy (bool, optional): Resolve present connections lazily, see `resolve_present_absent`.
+            Defaults to False.
 
     Returns:
         list: A list of two item lists describing endpoint to endpoint connections.
@@ -437,9 +491,9 @@ def resolve_p2m_connections(api, connections, silent=False):
         dst_dict = src[1].get(ConfigFields.CONNECT_TO)
         if dst_dict is None or len(dst_dict.keys()) == 0:
             continue
-        dst_dict = expand_agents_tags(api, dst_dict)
+        dst_dict = expand_agents_tags(api, dst_dict, index=index)
         if dst_dict is None:
-            return resolve_present_absent({}, [], [])
+            return resolve_present_absent({}, [], [], lazy=lazy)
 
         agents[src[0]] = get_peer_id(*src)
         for dst in dst_dict.items():
@@ -462,56 +516,64 @@ def resolve_p2m_connections(api, connections, silent=False):
                 else:
                     raise ConfigureNetworkError(error)
 
-    resolve_agents(api, agents, silent=silent)
+    resolve_agents(api, agents, silent=silent, index=index)
     if any(id is None for id in agents.keys()):
-        return resolve_present_absent({}, [], [])
+        return resolve_present_absent({}, [], [], lazy=lazy)
 
-    return resolve_present_absent(agents, present, absent)
+    return resolve_present_absent(agents, present, absent, lazy=lazy)
 
 
-def resolve_mesh_connections(api, connections, silent=False):
+def resolve_mesh_connections(api, connections, silent=False, index=None, lazy=False):
     """Resolves configuration connections for mesh topology. Also, expands tags.
 
     Args:
         api (PlatformApi): API object to communicate with the platform.
         connections (dict): A dictionary containing connections.
         silent (bool, optional): Indicates whether to suppress messages - used with Ansible. Defaults to False.
+        index (AgentIndex, optional): Agent index to resolve names and tags with. Defaults to None.
+        lazy (bool, optional): Resolve present connections lazily, see `resolve_present_absent`.
+            Defaults to False.
 
     Returns:
         list: A list of two item lists describing endpoint to endpoint connections.
     """
-    present = []
     absent = []
 
-    connections = expand_agents_tags(api, connections)
+    connections = expand_agents_tags(api, connections, index=index)
     if connections is None:
-        return resolve_present_absent({}, [], [])
+        return resolve_present_absent({}, [], [], lazy=lazy)
 
     agents = {
         name: get_peer_id(name, connection) for name, connection in connections.items()
     }
 
-    # NOTE: Assuming connections are bidirectional
-    for src, dst in combinations(connections.items(), 2):
-        if (
-            src[1].get(ConfigFields.STATE) == PeerState.ABSENT
-            or dst[1].get(ConfigFields.STATE) == PeerState.ABSENT
-        ):
-            absent.append((src, dst))
-        elif (
-            src[1].get(ConfigFields.STATE, PeerState.PRESENT) == PeerState.PRESENT
-            or dst[1].get(ConfigFields.STATE, PeerState.PRESENT) == PeerState.PRESENT
-        ):
-            present.append((src, dst))
+    # NOTE: Assuming connections are bidirectional. Every pair with an absent endpoint is
+    # absent, the others are present unless both endpoints have invalid states.
+    endpoints = list(connections.items())
+    is_absent = [
+        endpoint[1].get(ConfigFields.STATE) == PeerState.ABSENT
+        for endpoint in endpoints
+    ]
+    absent_indexes = [position for position, skip in enumerate(is_absent) if skip]
+    for position, src in enumerate(endpoints):
+        if is_absent[position]:
+            later = range(position + 1, len(endpoints))
         else:
-            error = f"Invalid state for agents {src[0]} or {dst[0]}"
-            if not silent:
-                click.secho(error, fg="red", err=True)
-            else:
-                raise ConfigureNetworkError(error)
+            later = absent_indexes[bisect.bisect_right(absent_indexes, position) :]
+        absent.extend((src, endpoints[other]) for other in later)
+    present = MeshPairs(
+        [endpoint for endpoint, skip in zip(endpoints, is_absent) if not skip]
+    )
+    invalid = [endpoint for endpoint in present.endpoints if not _is_present(endpoint)]
+    for src, dst in combinations(invalid, 2):
+        error = f"Invalid state for agents {src[0]} or {dst[0]}"
+        if not silent:
+            click.secho(error, fg="red", err=True)
+        else:
+            raise ConfigureNetworkError(error)
 
-    resolve_agents(api, agents, silent=silent)
+    resolve_agents(api, agents, silent=silent, index=index)
     if any(id is None for id in agents.keys()):
-        return resolve_present_absent({}, [], [])
+        return resolve_present_absent({}, [], [], lazy=lazy)
 
-    return resolve_present_absent(agents, present, absent)
+    return resolve_present_absent(agents, present, absent, lazy=lazy)
@@ -0,0 +1,114 @@
+import socket
+
+import syntropy_sdk as sdk
+from syntropy_sdk import rest
+from urllib3.connection import HTTPConnection
+
+from syntropynac import auth, concurrency, profiling, stats
+from syntropynac.settings import (  # noqa: F401
+    DEFAULT_JOBS,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_RETRIES,
+    POOL_HEADROOM,
+    SessionSettings,
+)
+
+COMPRESSED_ENCODING = "gzip"
+
+
+def _install_compression(api):
+    request = api.request
+
+    def compressed_request(method, url, *args, headers=None, **kwargs):
+        # NOTE: urllib3 decodes the response transparently, also when reading
+        # `.data` of responses requested with _preload_content=False.
+        # NOTE: Only lists and searches might return large responses.
+        if concurrency.is_read_request(method, url):
+            headers = {**(headers or {}), "Accept-Encoding": COMPRESSED_ENCODING}
+        return request(method, url, *args, headers=headers, **kwargs)
+
+    api.request = compressed_request
+
+
+def _install_timeout(api, timeout):
+    request = api.request
+
+    def timeout_request(method, url, *args, _request_timeout=None, **kwargs):
+        return request(
+            method,
+            url,
+            *args,
+            _request_timeout=_request_timeout or timeout,
+            **kwargs,
+        )
+
+    api.request = timeout_request
+
+
+def create_api_client(config, settings=None):
+    """Creates ApiClient with connection pooling configured according to settings.
+
+    Args:
+        config (Configuration): SDK configuration with host and authorization set.
+        settings (SessionSettings, optional): Transport settings. Defaults to SessionSettings().
+
+    Returns:
+        ApiClient: SDK API client. Settings are available as `api.session`.
+    """
+    settings = settings or SessionSettings()
+    config.connection_pool_maxsize = settings.pool_maxsize
+    api = sdk.ApiClient(config)
+    api.rest_client = rest.RESTClientObject(
+        config, pools_size=settings.pool_size, maxsize=settings.pool_maxsize
+    )
+    pool_kw = api.rest_client.pool_manager.connection_pool_kw
+    if settings.keepalive:
+        pool_kw["socket_options"] = HTTPConnection.default_socket_options + [
+            (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        ]
+    else:
+        api.set_default_header("Connection", "close")
+    if settings.compression:
+        _install_compression(api)
+    if settings.timeout is not None:
+        _install_timeout(api, settings.timeout)
+
+    api.session = settings
+    return api
+
+
+def get_settings(api):
+    """Returns SessionSettings of the ApiClient or defaults."""
+    settings = getattr(api, "session", None)
+    return settings if isinstance(settings, SessionSettings) else SessionSettings()
+
+
+def connect(api_url, api_token, settings=None, cache=None):
+    """Logs in and creates an instrumented ApiClient for library usage.
+
+    Args:
+        api_url (str): Syntropy API server URL.
+        api_token (str): API authorization token.
+        settings (SessionSettings, optional): Transport settings. Defaults to SessionSettings().
+        cache (auth.TokenCache, optional): Access token cache. Defaults to None.
+
+    Returns:
+        ApiClient: SDK API client that accounts requests, retries throttled requests adapting
+            concurrency and refreshes expired access tokens.
+    """
+    config = sdk.Configuration()
+    config.host = api_url
+    with profiling.phase("login"):
+        config.api_key["Authorization"] = "Bearer " + auth.login(
+            api_url, api_token, cache=cache
+        )
+    api = create_api_client(config, settings)
+    stats.install(api)
+    settings = get_settings(api)
+    concurrency.install(
+        api,
+        concurrency.RetryPolicy(retries=settings.retries),
+        concurrency.AIMDLimiter(settings.jobs),
+    )
+    auth.install_refresh(api, api_url, api_token, cache=cache)
+    return api
@@ -0,0 +1,61 @@
+# NOTE: Kept apart from syntropynac.session so that the CLI can parse its options without importing the SDK.
+DEFAULT_JOBS = 4
+# Number of distinct hosts to keep connection pools for.
+DEFAULT_POOL_SIZE = 4
+# Extra connections per host on top of --jobs for requests issued outside of workers, e.g. prefetching.
+POOL_HEADROOM = 2
+DEFAULT_RETRIES = 5
+
+
+class SessionSettings:
+    """HTTP transport settings of the ApiClient.
+
+    Args:
+        jobs (int, optional): Number of concurrent API requests. Defaults to DEFAULT_JOBS.
+        pool_size (int, optional): Number of per-host connection pools. Defaults to DEFAULT_POOL_SIZE.
+        pool_maxsize (int, optional): Number of connections kept open per host.
+            Defaults to jobs + POOL_HEADROOM.
+        keepalive (bool, optional): Reuse connections between requests and enable TCP keep-alive.
+            Defaults to True.
+        connect_timeout (float, optional): Connect timeout in seconds. Defaults to None(no timeout).
+        read_timeout (float, optional): Read timeout in seconds. Defaults to None(no timeout).
+        compression (bool, optional): Request gzip compressed responses from list and search
+            endpoints. Defaults to True.
+        retries (int, optional): Number of retries of throttled or transiently failed requests.
+            Defaults to DEFAULT_RETRIES.
+    """
+
+    def __init__(
+        self,
+        jobs=DEFAULT_JOBS,
+        pool_size=None,
+        pool_maxsize=None,
+        keepalive=True,
+        connect_timeout=None,
+        read_timeout=None,
+        compression=True,
+        retries=DEFAULT_RETRIES,
+    ):
+        self.jobs = max(1, jobs)
+        self.pool_size = pool_size or DEFAULT_POOL_SIZE
+        self.pool_maxsize = pool_maxsize or self.jobs + POOL_HEADROOM
+        self.keepalive = keepalive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.compression = compression
+        self.retries = retries
+
+    @property
+    def timeout(self):
+        """Returns timeout in the form accepted by `_request_timeout` or None."""
+        if self.connect_timeout is None and self.read_timeout is None:
+            return None
+        return (self.connect_timeout, self.read_timeout)
+
+    def __repr__(self):
+        return (
+            f"SessionSettings(jobs={self.jobs}, pool_size={self.pool_size}, "
+            f"pool_maxsize={self.pool_maxsize}, keepalive={self.keepalive}, "
+            f"connect_timeout={self.connect_timeout}, read_timeout={self.read_timeout}, "
+            f"compression={self.compression}, retries={self.retries})"
+        )
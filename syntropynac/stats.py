@@ -0,0 +1,224 @@
+import json
+import sys
+import threading
+import time
+
+import click
+from syntropy_sdk.rest import ApiException
+
+from syntropynac import tracing
+
+# Upper bounds of latency histogram buckets in milliseconds.
+LATENCY_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+ENDPOINT_SUFFIX = "_with_http_info"
+MAX_FRAME_DEPTH = 8
+
+
+class EndpointStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.latency = 0.0
+        self.max_latency = 0.0
+        self.statuses = {}
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, latency, request_bytes, response_bytes, status):
+        self.calls += 1
+        self.request_bytes += request_bytes
+        self.response_bytes += response_bytes
+        self.latency += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if not 200 <= status <= 299:
+            self.errors += 1
+        latency_ms = latency * 1000
+        for bucket, bound in enumerate(LATENCY_BUCKETS):
+            if latency_ms <= bound:
+                break
+        else:
+            bucket = len(LATENCY_BUCKETS)
+        self.histogram[bucket] += 1
+
+    def merge(self, other):
+        self.calls += other.calls
+        self.errors += other.errors
+        self.retries += other.retries
+        self.request_bytes += other.request_bytes
+        self.response_bytes += other.response_bytes
+        self.latency += other.latency
+        self.max_latency = max(self.max_latency, other.max_latency)
+        for status, count in other.statuses.items():
+            self.statuses[status] = self.statuses.get(status, 0) + count
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+            "latency": {
+                "total": round(self.latency, 6),
+                "mean": round(self.latency / self.calls, 6) if self.calls else 0,
+                "max": round(self.max_latency, 6),
+                "histogram_ms": {
+                    str(bound): count
+                    for bound, count in zip(LATENCY_BUCKETS + ("inf",), self.histogram)
+                },
+            },
+            "statuses": {str(status): count for status, count in self.statuses.items()},
+        }
+
+
+class ApiStats:
+    """Accounts every HTTP request made by an ApiClient per SDK endpoint.
+
+    Endpoints are named after the SDK methods, e.g. `v1_network_agents_search`. Response
+    sizes are the number of bytes received, i.e. compressed if the response was.
+    """
+
+    def __init__(self):
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, latency, request_bytes, response_bytes, status):
+        with self._lock:
+            if endpoint not in self.endpoints:
+                self.endpoints[endpoint] = EndpointStats()
+            self.endpoints[endpoint].record(
+                latency, request_bytes, response_bytes, status
+            )
+
+    def record_retry(self, endpoint):
+        """Accounts a retry of a request, called by the retry layer of `concurrency.install`."""
+        with self._lock:
+            if endpoint not in self.endpoints:
+                self.endpoints[endpoint] = EndpointStats()
+            self.endpoints[endpoint].retries += 1
+
+    @property
+    def calls(self):
+        return sum(stats.calls for stats in self.endpoints.values())
+
+    def total(self):
+        total = EndpointStats()
+        with self._lock:
+            for stats in self.endpoints.values():
+                total.merge(stats)
+        return total
+
+    def summary(self):
+        with self._lock:
+            endpoints = {
+                endpoint: stats.to_dict()
+                for endpoint, stats in sorted(self.endpoints.items())
+            }
+        return {"total": self.total().to_dict(), "endpoints": endpoints}
+
+    def write(self, path):
+        """Writes JSON summary to a file or to stderr if path is "-"."""
+        summary = json.dumps(self.summary(), indent=4)
+        if path == "-":
+            click.echo(summary, err=True)
+        else:
+            with open(path, "w") as f:
+                f.write(summary)
+
+
+def endpoint_name(default):
+    """Determines SDK endpoint method name that issued current request."""
+    frame = sys._getframe(1)
+    for _ in range(MAX_FRAME_DEPTH):
+        if frame is None:
+            break
+        name = frame.f_code.co_name
+        if name.endswith(ENDPOINT_SUFFIX):
+            return name[: -len(ENDPOINT_SUFFIX)]
+        frame = frame.f_back
+    return default
+
+
+def _response_size(response):
+    if response is None:
+        return 0
+    # NOTE: urllib3 decodes compressed bodies transparently, so the number of bytes
+    # read from the wire is taken from the raw response.
+    raw = getattr(response, "urllib3_response", None)
+    if raw is not None:
+        return raw.tell()
+    data = getattr(response, "data", None)
+    return len(data) if data else 0
+
+
+def _error_size(err):
+    try:
+        return int((err.headers or {}).get("Content-Length"))
+    except (TypeError, ValueError):
+        return len(err.body) if err.body else 0
+
+
+def install(api, stats=None):
+    """Installs request accounting on the ApiClient instance.
+
+    Args:
+        api (ApiClient): SDK API client.
+        stats (ApiStats, optional): Stats to record to. Defaults to a new instance.
+
+    Returns:
+        ApiStats: Stats object that records every request of the client.
+    """
+    stats = stats if stats is not None else ApiStats()
+    request = api.request
+
+    def instrumented_request(method, url, *args, body=None, **kwargs):
+        endpoint = endpoint_name(f"{method} {url.split('?')[0]}")
+        request_bytes = len(url) + (len(json.dumps(body)) if body is not None else 0)
+        with tracing.span(endpoint, method=method) as span:
+            start = time.perf_counter()
+            try:
+                response = request(method, url, *args, body=body, **kwargs)
+                # NOTE: Reading the body here so that latency includes transfer time
+                # and size is known even with _preload_content=False.
+                response_bytes = _response_size(response)
+            except ApiException as err:
+                response_bytes = _error_size(err)
+                stats.record(
+                    endpoint,
+                    time.perf_counter() - start,
+                    request_bytes,
+                    response_bytes,
+                    err.status or 0,
+                )
+                span.set(
+                    status=err.status,
+                    request_bytes=request_bytes,
+                    response_bytes=response_bytes,
+                )
+                raise
+            stats.record(
+                endpoint,
+                time.perf_counter() - start,
+                request_bytes,
+                response_bytes,
+                response.status,
+            )
+            span.set(
+                status=response.status,
+                request_bytes=request_bytes,
+                response_bytes=response_bytes,
+            )
+            return response
+
+    api.request = instrumented_request
+    api.stats = stats
+    return stats
+
+
+def get_stats(api):
+    """Returns ApiStats installed on the ApiClient or None."""
+    return getattr(api, "stats", None)
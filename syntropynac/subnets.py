@@ -0,0 +1,192 @@
+import threading
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from syntropynac import resolve
+
+# Below this number of subnet rows the pure Python diff is faster than converting to arrays.
+NUMPY_MIN_ROWS = 1024
+
+
+def desired_subnets(config, connection, cache=None):
+    """Returns subnet ids that ConnectionServices enable on a connection."""
+    agents = {
+        connection["agent_1"]["agent_id"]: connection["agent_1"],
+        connection["agent_2"]["agent_id"]: connection["agent_2"],
+    }
+    return config.get_subnets(1, agents, cache) + config.get_subnets(2, agents, cache)
+
+
+class SubnetStates:
+    """Desired and current subnet states of many connections held as flat columns.
+
+    Desired rows are (connection index, subnet id), current rows are
+    (connection index, subnet id, enabled). Connection index is the position of the
+    connection in the list the states were collected from.
+    """
+
+    def __init__(self, count):
+        self.count = count
+        self.desired_index = []
+        self.desired_id = []
+        self.current_index = []
+        self.current_id = []
+        self.current_enabled = []
+
+    @classmethod
+    def collect(cls, pairs):
+        """Collects subnet states of (ConnectionServices, connection) pairs."""
+        states = cls(len(pairs))
+        # Hubs repeat the same agents across many connections.
+        cache = resolve.SubnetCache()
+        for index, (config, connection) in enumerate(pairs):
+            states.add(index, desired_subnets(config, connection, cache), connection)
+        return states
+
+    def add(self, index, desired, connection):
+        """Adds desired subnet ids and current subnets of a connection."""
+        for subnet_id in desired:
+            self.desired_index.append(index)
+            self.desired_id.append(subnet_id)
+        for subnet in connection["agent_connection_subnets"]:
+            self.current_index.append(index)
+            self.current_id.append(subnet["agent_service_subnet_id"])
+            self.current_enabled.append(
+                bool(subnet["agent_connection_subnet_is_enabled"])
+            )
+
+    def __len__(self):
+        return len(self.desired_id) + len(self.current_id)
+
+
+def _diff_python(states, changes):
+    desired = set(zip(states.desired_index, states.desired_id))
+    current = set()
+    for index, subnet_id, enabled in zip(
+        states.current_index, states.current_id, states.current_enabled
+    ):
+        current.add((index, subnet_id))
+        wanted = (index, subnet_id) in desired
+        if wanted != enabled:
+            changes[index].append((subnet_id, wanted))
+    for index, subnet_id in sorted(desired - current):
+        changes[index].append((subnet_id, True))
+
+
+def _diff_numpy(states, changes):
+    # Rows are keyed by a single integer, so that a set difference covers all the connections.
+    width = max(states.desired_id + states.current_id) + 1
+
+    def keys(index, ids):
+        index = numpy.asarray(index, dtype=numpy.int64)
+        return index * width + numpy.asarray(ids, dtype=numpy.int64)
+
+    desired = numpy.sort(keys(states.desired_index, states.desired_id))
+    if len(desired):
+        desired = desired[numpy.concatenate(([True], desired[1:] != desired[:-1]))]
+    current = keys(states.current_index, states.current_id)
+    wanted = _isin(current, desired)
+    changed = numpy.flatnonzero(
+        wanted != numpy.asarray(states.current_enabled, dtype=bool)
+    )
+    for row, flag in zip(changed.tolist(), wanted[changed].tolist()):
+        changes[states.current_index[row]].append((states.current_id[row], flag))
+    missing = desired[~_isin(desired, numpy.sort(current))]
+    for index, subnet_id in zip(
+        *(column.tolist() for column in numpy.divmod(missing, width))
+    ):
+        changes[index].append((subnet_id, True))
+
+
+def _isin(keys, sorted_keys):
+    """Membership test of keys in a sorted array by binary search."""
+    if not len(sorted_keys):
+        return numpy.zeros(len(keys), dtype=bool)
+    positions = numpy.minimum(
+        numpy.searchsorted(sorted_keys, keys), len(sorted_keys) - 1
+    )
+    return sorted_keys[positions] == keys
+
+
+def diff(states, use_numpy=None):
+    """Computes subnet changes of every connection at once.
+
+    Changes of a connection list the current subnets whose state differs from the desired one,
+    in their original order, followed by the missing desired subnets in ascending order.
+    NumPy is used for large inputs if it is installed, the output is the same either way.
+
+    Args:
+        states (SubnetStates): Desired and current subnet states.
+        use_numpy (bool, optional): Force or disable NumPy. Defaults to None(decided by input size).
+
+    Raises:
+        ImportError: If use_numpy is True, but NumPy is not installed.
+
+    Returns:
+        list: A list of (subnet id, enabled) changes per connection.
+    """
+    if use_numpy is None:
+        use_numpy = numpy is not None and len(states) >= NUMPY_MIN_ROWS
+    elif use_numpy and numpy is None:
+        raise ImportError("use_numpy requires NumPy to be installed")
+    changes = [[] for _ in range(states.count)]
+    if not len(states):
+        return changes
+    if use_numpy:
+        _diff_numpy(states, changes)
+    else:
+        _diff_python(states, changes)
+    return changes
+
+
+class ServicesUpdates:
+    """Run-wide buffer of desired subnet states keyed by agent_connection_group_id.
+
+    Documents add the connections they configure and the buffer is planned once all of them
+    are done, so that every connection gets at most one services update. A subnet is enabled
+    if any document configuring the connection enables it, i.e. enabling takes precedence
+    over disabling and a later document never turns off services an earlier one turned on.
+    Current subnets are taken from the connection added last. Connections removed by a later
+    document are discarded.
+    """
+
+    def __init__(self):
+        self._connections = {}
+        self._desired = {}
+        self._cache = resolve.SubnetCache()
+        # NOTE: Connections are discarded by deletes running alongside the document's updates.
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._connections)
+
+    def add(self, config, connection):
+        """Merges subnets desired by ConnectionServices into the state of a connection."""
+        group_id = connection["agent_connection_group_id"]
+        subnet_ids = desired_subnets(config, connection, self._cache)
+        with self._lock:
+            desired = self._desired.setdefault(group_id, {})
+            for subnet_id in subnet_ids:
+                desired[subnet_id] = True
+            self._connections[group_id] = connection
+
+    def discard(self, group_ids):
+        """Forgets connections that were removed, so that they are not updated."""
+        with self._lock:
+            for group_id in group_ids:
+                self._connections.pop(group_id, None)
+                self._desired.pop(group_id, None)
+
+    def plan(self):
+        """Returns (connection, changes) tuples of every buffered connection and clears the buffer."""
+        with self._lock:
+            connections = list(self._connections.values())
+            desired = self._desired
+            self._connections, self._desired = {}, {}
+        states = SubnetStates(len(connections))
+        for index, connection in enumerate(connections):
+            states.add(index, desired[connection["agent_connection_group_id"]], connection)
+        return list(zip(connections, diff(states)))
@@ -0,0 +1,140 @@
+import json
+import os
+import threading
+import time
+
+_tracer = None
+_local = threading.local()
+
+
+class NoopSpan:
+    """Span that does nothing, returned while tracing is disabled."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+NOOP_SPAN = NoopSpan()
+
+
+class Span:
+    __slots__ = ("tracer", "name", "attributes", "start")
+
+    def __init__(self, tracer, name, attributes):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.start = None
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        _local.stack.pop()
+        if exc_type is not None:
+            self.attributes["error"] = exc_type.__name__
+        self.tracer.add(self, end)
+        return False
+
+    def set(self, **attributes):
+        """Adds attributes to the span, e.g. counts that are known only after the work is done."""
+        self.attributes.update(attributes)
+
+
+class Tracer:
+    """Collects finished spans and exports them in Chrome trace event format."""
+
+    def __init__(self):
+        self.events = []
+        self.threads = {}
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def add(self, span, end):
+        thread = threading.current_thread()
+        event = {
+            "name": span.name,
+            "ph": "X",
+            "ts": round((span.start - self.origin) * 1e6, 3),
+            "dur": round((end - span.start) * 1e6, 3),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": span.attributes,
+        }
+        with self._lock:
+            self.events.append(event)
+            self.threads[thread.ident] = thread.name
+
+    def to_dict(self):
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self.threads)
+        metadata = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in threads.items()
+        ]
+        return {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, default=str)
+
+
+def span(name, **attributes):
+    """Returns a context manager that traces the enclosed block.
+
+    Returns a shared no-op span unless tracing was started, so it is safe to use
+    on hot paths.
+    """
+    tracer = _tracer
+    if tracer is None:
+        return NOOP_SPAN
+    return Span(tracer, name, attributes)
+
+
+def current_span():
+    """Returns the innermost active span of the current thread or a no-op span."""
+    if _tracer is None:
+        return NOOP_SPAN
+    stack = getattr(_local, "stack", None)
+    return stack[-1] if stack else NOOP_SPAN
+
+
+def start():
+    """Starts collecting spans and returns the tracer."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop(path=None):
+    """Stops collecting spans and optionally writes the trace JSON file.
+
+    Returns:
+        Tracer: The tracer that was active or None.
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None and path:
+        tracer.write(path)
+    return tracer
@@ -2,6 +2,7 @@ from collections import defaultdict
 
 import click
 
+from syntropynac import tracing
 from syntropynac.exceptions import ConfigureNetworkError
 from syntropynac.fields import ConfigFields, PeerState, PeerType, Topology
 
@@ -348,6 +349,9 @@ def transform_connections(
         else:
             raise ConfigureNetworkError(error)
         return
-    return topology_map[topology](
-        all_agents, connections, reference=reference, group_tags=group_tags
-    )
+    with tracing.span(
+        "transform connections", topology=topology, connections=len(connections)
+    ):
+        return topology_map[topology](
+            all_agents, connections, reference=reference, group_tags=group_tags
+        )
@@ -4,21 +4,20 @@ import syntropy_sdk as sdk
 from syntropy_sdk import models
 from syntropy_sdk.utils import MAX_QUERY_FIELD_SIZE
 
-from syntropynac import fields, transform
+from syntropynac import fields, profiling, transform
 from syntropynac.fields import ConfigFields, PeerState, PeerType, Topology
 
 
 def get_agents_connections(api, agents):
     ids = list(agents.keys())
-    connections = (
-        sdk.ConnectionsApi(api)
-        .v1_network_connections_search(
+    connections = sdk.utils.deserialize_result(
+        sdk.ConnectionsApi(api).v1_network_connections_search(
             body=models.V1NetworkConnectionsSearchRequest(
                 filter=models.V1ConnectionFilter(agent_id=ids),
             ),
+            _preload_content=False,
         )
-        .to_dict()["data"]
-    )
+    )["data"]
     return connections
 
 
@@ -26,10 +25,11 @@ def export_connections(api, all_agents, network, net_agents, connections, topolo
     topology = Topology.P2M if not topology else topology.upper()
     ids = [connection["agent_connection_group_id"] for connection in connections]
     if ids:
-        connections_services = sdk.utils.BatchedRequestFilter(
-            sdk.ConnectionsApi(api).v1_network_connections_services_get,
-            MAX_QUERY_FIELD_SIZE,
-        )(filter=ids, _preload_content=False)["data"]
+        with profiling.phase("fetch services", connections=len(ids)):
+            connections_services = sdk.utils.BatchedRequestFilter(
+                sdk.ConnectionsApi(api).v1_network_connections_services_get,
+                MAX_QUERY_FIELD_SIZE,
+            )(filter=ids, _preload_content=False)["data"]
 
         connection_services = {
             connection["agent_connection_group_id"]: connection
@@ -44,11 +44,12 @@ def export_connections(api, all_agents, network, net_agents, connections, topolo
         }
         for connection in connections
     ]
-    transformed_connections = transform.transform_connections(
-        all_agents,
-        net_connections,
-        topology if topology else network[fields.ConfigFields.TOPOLOGY],
-    )
+    with profiling.phase("transform"):
+        transformed_connections = transform.transform_connections(
+            all_agents,
+            net_connections,
+            topology if topology else network[fields.ConfigFields.TOPOLOGY],
+        )
     if transformed_connections:
         network[fields.ConfigFields.CONNECTIONS] = transformed_connections
     network[fields.ConfigFields.TOPOLOGY] = topology
@@ -66,10 +67,13 @@ def export_connections(api, all_agents, network, net_agents, connections, topolo
     unused_endpoints = [id for id in net_agents if id not in used_endpoints]
 
     if unused_endpoints:
-        agents_services = sdk.utils.BatchedRequestFilter(
-            sdk.AgentsApi(api).v1_network_agents_services_get,
-            MAX_QUERY_FIELD_SIZE,
-        )(filter=unused_endpoints, _preload_content=False)["data"]
+        with profiling.phase(
+            "fetch endpoint services", endpoints=len(unused_endpoints)
+        ):
+            agents_services = sdk.utils.BatchedRequestFilter(
+                sdk.AgentsApi(api).v1_network_agents_services_get,
+                MAX_QUERY_FIELD_SIZE,
+            )(filter=unused_endpoints, _preload_content=False)["data"]
 
         agent_services = defaultdict(list)
         for agent_id, agent in zip(unused_endpoints, agents_services):
@@ -116,7 +120,9 @@ def export_network(api, all_agents, topology):
         ConfigFields.STATE: PeerState.PRESENT,
     }
 
-    connections = get_agents_connections(api, all_agents)
+    with profiling.phase("fetch connections", agents=len(all_agents)) as span:
+        connections = get_agents_connections(api, all_agents)
+        span.set(connections=len(connections))
 
     net_agents = [agent["agent_id"] for _, agent in all_agents.items()]
 
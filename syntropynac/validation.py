@@ -0,0 +1,203 @@
+import json
+
+import yaml
+
+from syntropynac.fields import (
+    ALLOWED_PEER_TYPES,
+    ALLOWED_TOPOLOGIES,
+    ConfigFields,
+    PeerState,
+    PeerType,
+)
+
+# NOTE: This module must not import the SDK since it is used by the offline `validate` command.
+
+ERROR = "error"
+WARNING = "warning"
+
+# LibYAML based loader is an order of magnitude faster if available.
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_documents(path):
+    """Loads all configuration documents from a YAML or JSON file."""
+    with open(path, "rb") as cfg_file:
+        if path.endswith(".json"):
+            config = json.load(cfg_file)
+            return config if isinstance(config, list) else [config]
+        return list(yaml.load_all(cfg_file, Loader=YAML_LOADER))
+
+
+def connection_issues(connections, level=0):
+    """Checks if the connections structure makes any sense.
+    Recursively goes inside 'connect_to' dictionary up to 1 level.
+
+    Args:
+        connections (dict): A dictionary describing connections.
+        level (int, optional): Recursion level depth. Defaults to 0.
+
+    Yields:
+        tuple: Severity(ERROR or WARNING) and a message of every issue found.
+    """
+    if level > 1:
+        yield WARNING, (
+            f"Field {ConfigFields.CONNECT_TO} found at level {level + 1}. This will be ignored, "
+            "however, please double check your configuration file."
+        )
+        return
+
+    if not isinstance(connections, dict):
+        field = ConfigFields.CONNECT_TO if level else ConfigFields.CONNECTIONS
+        yield ERROR, (
+            f"Field {field} must be a dictionary, "
+            f"but found {connections.__class__.__name__}."
+        )
+        return
+
+    for name, con in connections.items():
+        if not name or not isinstance(name, (str, int)):
+            yield ERROR, "Invalid endpoint name found."
+            continue
+
+        if not isinstance(con, dict):
+            yield ERROR, f"Entry '{name}' in {ConfigFields.CONNECT_TO} must be a dictionary, but found {con.__class__.__name__}."
+            continue
+
+        if ConfigFields.PEER_TYPE not in con:
+            yield ERROR, f"Endpoint '{name}' {ConfigFields.PEER_TYPE} must be present."
+            continue
+
+        if con[ConfigFields.PEER_TYPE] not in ALLOWED_PEER_TYPES:
+            yield ERROR, f"Endpoint '{name}' {ConfigFields.PEER_TYPE} '{con[ConfigFields.PEER_TYPE]}' is not allowed."
+            continue
+
+        probably_an_id = False
+        try:
+            name_as_id = int(name)
+            probably_an_id = True
+        except ValueError:
+            name_as_id = name
+        if probably_an_id and con[ConfigFields.PEER_TYPE] == PeerType.ENDPOINT:
+            yield WARNING, (
+                f"Endpoint '{name}' {ConfigFields.PEER_TYPE} is {PeerType.ENDPOINT}, however, "
+                f"it appears to be an {PeerType.ID}."
+            )
+        if not probably_an_id and con[ConfigFields.PEER_TYPE] == PeerType.ID:
+            yield ERROR, (
+                f"Endpoint '{name}' {ConfigFields.PEER_TYPE} is {PeerType.ID}, however, "
+                f"it appears to be an {PeerType.ENDPOINT}."
+            )
+            continue
+
+        if ConfigFields.ID in con and con[ConfigFields.ID] is not None:
+            try:
+                _ = int(con[ConfigFields.ID])
+                id_valid = True
+            except (TypeError, ValueError):
+                id_valid = False
+            if (
+                not isinstance(con[ConfigFields.ID], (str, int))
+                or not con[ConfigFields.ID]
+                or not id_valid
+            ):
+                yield ERROR, f"Endpoint '{name}' {ConfigFields.ID} is invalid."
+                continue
+
+            if (
+                con[ConfigFields.PEER_TYPE] == PeerType.ID
+                and int(con[ConfigFields.ID]) != name_as_id
+            ):
+                yield ERROR, f"Endpoint '{name}' {ConfigFields.ID} field does not match endpoint id."
+                continue
+
+        if ConfigFields.SERVICES in con:
+            if not isinstance(con[ConfigFields.SERVICES], (list, tuple)):
+                yield ERROR, (
+                    f"Endpoint '{name}' {ConfigFields.SERVICES} must be a "
+                    f"list, but found {con[ConfigFields.SERVICES].__class__.__name__}."
+                )
+                continue
+
+            invalid_services = [
+                service
+                for service in con[ConfigFields.SERVICES]
+                if not isinstance(service, (str, int))
+            ]
+            if invalid_services:
+                yield ERROR, (
+                    f"Endpoint '{name}' service must be a string"
+                    f", but found {invalid_services[0].__class__.__name__}."
+                )
+                continue
+
+        if ConfigFields.CONNECT_TO in con:
+            yield from connection_issues(con[ConfigFields.CONNECT_TO], level + 1)
+
+
+def document_issues(config):
+    """Checks a network configuration document the same way as `configure_network` does
+    before making any API calls.
+
+    Args:
+        config (dict): Configuration dictionary.
+
+    Yields:
+        tuple: Severity(ERROR or WARNING) and a message of every issue found.
+    """
+    if not isinstance(config, dict):
+        yield ERROR, f"Document must be a dictionary, but found {config.__class__.__name__}."
+        return
+
+    yield from header_issues(config)
+    if not all(i in config for i in (ConfigFields.TOPOLOGY, ConfigFields.STATE)):
+        return
+
+    yield from connection_issues(config.get(ConfigFields.CONNECTIONS, {}))
+
+
+def header_issues(config):
+    """Checks the topology and state of a network configuration document.
+
+    Used by `configure_network` as well, so that both refuse the same documents.
+
+    Args:
+        config (dict): Configuration dictionary.
+
+    Yields:
+        tuple: Severity(ERROR) and a message of every issue found.
+    """
+    if not all(i in config for i in (ConfigFields.TOPOLOGY, ConfigFields.STATE)):
+        yield ERROR, f"{ConfigFields.TOPOLOGY} and {ConfigFields.STATE} must be present"
+        return
+
+    state = config[ConfigFields.STATE]
+    if state not in (PeerState.PRESENT, PeerState.ABSENT):
+        yield ERROR, f"Invalid state {state}"
+
+    topology = config[ConfigFields.TOPOLOGY]
+    if not isinstance(topology, str) or topology.upper() not in ALLOWED_TOPOLOGIES:
+        yield ERROR, f"Network topology {topology} not supported."
+
+
+def validate_file(path):
+    """Loads and checks all documents of a configuration file.
+
+    Returns:
+        tuple: Number of documents and a list of (document index, severity, message) tuples.
+            Document index is None for errors concerning the whole file.
+    """
+    try:
+        documents = load_documents(path)
+    except (OSError, ValueError, yaml.YAMLError) as err:
+        return 0, [(None, ERROR, f"Could not load file: {err}")]
+    # NOTE: Empty documents, e.g. after a trailing document separator, are ignored.
+    documents = [
+        (index, document)
+        for index, document in enumerate(documents)
+        if document is not None
+    ]
+    return len(documents), [
+        (index, severity, message)
+        for index, document in documents
+        for severity, message in document_issues(document)
+    ]
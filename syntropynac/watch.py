@@ -0,0 +1,248 @@
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import Future
+
+import click
+import yaml
+
+from syntropynac import configure, pagination, resolve, session
+from syntropynac.validation import load_documents
+
+CONFIG_EXTENSIONS = (".yaml", ".yml", ".json")
+INDEX_MAX_AGE = 60
+
+
+class ConnectionSnapshot:
+    """In-memory copy of account connections that is kept up to date by the changes made.
+
+    Connections might be given as a future, e.g. of a background fetch, which is
+    waited for on the first access only. A `live` snapshot of a long running process
+    refetches the connections of affected agents after every change, since the account
+    might also be changed by others. Otherwise only the known changes are applied.
+    """
+
+    def __init__(self, connections, live=False):
+        self.live = live
+        self._pending = None
+        if isinstance(connections, Future):
+            self._pending, connections = connections, ()
+        self.connections = {
+            connection["agent_connection_group_id"]: connection
+            for connection in connections
+        }
+
+    def _wait(self):
+        if self._pending is not None:
+            self.connections = ConnectionSnapshot(self._pending.result()).connections
+            self._pending = None
+
+    @classmethod
+    def fetch(cls, api):
+        return cls(
+            configure.get_all_connections(api).iter_records(_preload_content=False),
+            live=True,
+        )
+
+    def get_connections(self):
+        self._wait()
+        return list(self.connections.values())
+
+    def update(self, api, agent_ids, created=(), deleted=(), agents=None):
+        """Records changes made to the connections of given agents.
+
+        Args:
+            api (PlatformApi): API object to communicate with the platform.
+            agent_ids (iterable): Agent ids whose connections might have changed.
+            created (iterable, optional): Created connections. Defaults to ().
+            deleted (iterable, optional): Connection group ids of removed connections. Defaults to ().
+            agents (dict, optional): Agents by id to complete created connections with. Defaults to None.
+        """
+        if self.live:
+            self.refresh(api, agent_ids)
+        else:
+            self.apply(created, deleted, agents)
+
+    def apply(self, created=(), deleted=(), agents=None):
+        """Applies created and removed connections without refetching them.
+
+        Args:
+            created (iterable, optional): Created connections. Defaults to ().
+            deleted (iterable, optional): Connection group ids of removed connections. Defaults to ().
+            agents (dict, optional): Agents by id to complete created connections with, since
+                create responses only carry agent ids. Defaults to None.
+        """
+        self._wait()
+        agents = agents or {}
+        for group_id in deleted:
+            self.connections.pop(group_id, None)
+        for connection in created:
+            connection = {
+                **connection,
+                **{
+                    key: {
+                        **agents.get(connection[key]["agent_id"], {}),
+                        **connection[key],
+                    }
+                    for key in ("agent_1", "agent_2")
+                },
+            }
+            self.connections[connection["agent_connection_group_id"]] = connection
+
+    def refresh(self, api, agent_ids):
+        """Refetches the connections of given agents only.
+
+        Args:
+            api (PlatformApi): API object to communicate with the platform.
+            agent_ids (iterable): Agent ids whose connections might have changed.
+        """
+        agent_ids = set(agent_ids)
+        if not agent_ids:
+            return
+        self._wait()
+        connections = pagination.search_agents_connections(
+            api, agent_ids, jobs=session.get_settings(api).jobs
+        )
+        self.connections = {
+            group_id: connection
+            for group_id, connection in self.connections.items()
+            if connection["agent_1"]["agent_id"] not in agent_ids
+            and connection["agent_2"]["agent_id"] not in agent_ids
+        }
+        self.connections.update(
+            {
+                connection["agent_connection_group_id"]: connection
+                for connection in connections
+            }
+        )
+
+
+def _document_digest(document):
+    return hashlib.sha256(
+        json.dumps(document, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+class DocumentWatcher:
+    """Polls configuration files in a directory and reports changed documents.
+
+    Files are only reread when their modification time or size changes and
+    documents are only reported when their contents change.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.stats = {}
+        self.file_digests = {}
+        self.document_digests = {}
+
+    def _paths(self):
+        for root, _, files in os.walk(self.directory):
+            for name in sorted(files):
+                if name.endswith(CONFIG_EXTENSIONS):
+                    yield os.path.join(root, name)
+
+    def poll(self, silent=False):
+        """Returns a list of (path, index, document) tuples that changed since the last poll."""
+        changed = []
+        for path in self._paths():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            key = (stat.st_mtime_ns, stat.st_size)
+            if self.stats.get(path) == key:
+                continue
+
+            try:
+                with open(path, "rb") as cfg_file:
+                    content = cfg_file.read()
+            except FileNotFoundError:
+                continue
+            digest = hashlib.sha256(content).hexdigest()
+            if self.file_digests.get(path) == digest:
+                self.stats[path] = key
+                continue
+
+            try:
+                documents = load_documents(path)
+            except (json.decoder.JSONDecodeError, yaml.YAMLError):
+                # NOTE: Files might be caught while being written, so they will be
+                # reread on the next modification.
+                not silent and click.secho(
+                    f"Could not parse {path} file.", err=True, fg="red"
+                )
+                self.stats[path] = key
+                continue
+
+            self.stats[path] = key
+            self.file_digests[path] = digest
+            for index, document in enumerate(documents):
+                document_digest = _document_digest(document)
+                if self.document_digests.get((path, index)) == document_digest:
+                    continue
+                self.document_digests[(path, index)] = document_digest
+                changed.append((path, index, document))
+        return changed
+
+
+def watch(api, directory, dry_run, interval=2.0, silent=False, iterations=None):
+    """Keeps reconciling configuration documents in a directory as they change.
+
+    Agents and connections are fetched once and kept in memory. Only changed
+    documents are applied and only the connections of affected agents are refetched.
+
+    Args:
+        api (PlatformApi): Instance of the platform API.
+        directory (str): A directory containing YAML/JSON configuration files.
+        dry_run (bool): Indicates whether to perform a dry run (without any configuration).
+        interval (float, optional): Polling interval in seconds. Defaults to 2.0.
+        silent (bool, optional): Indicates whether to suppress messages. Defaults to False.
+        iterations (int, optional): Number of polls to perform, forever if None. Defaults to None.
+    """
+    index = resolve.AgentIndex.fetch(api, silent)
+    index_time = time.monotonic()
+    snapshot = ConnectionSnapshot.fetch(api)
+    watcher = DocumentWatcher(directory)
+
+    not silent and click.secho(f"Watching {directory}", fg="green")
+    while iterations is None or iterations > 0:
+        changed = watcher.poll(silent=silent)
+        if changed and time.monotonic() - index_time > INDEX_MAX_AGE:
+            index = resolve.AgentIndex.fetch(api, silent)
+            index_time = time.monotonic()
+
+        for path, doc_index, document in changed:
+            if not isinstance(document, dict) or any(
+                i not in document for i in ("topology", "state")
+            ):
+                not silent and click.secho(
+                    f"Skipping {path}:{doc_index} entry as no name, topology or state found.",
+                    fg="yellow",
+                )
+                continue
+            not silent and click.echo(f"Applying {path}:{doc_index}")
+            try:
+                configure.configure_network(
+                    api,
+                    document,
+                    dry_run,
+                    silent=silent,
+                    index=index,
+                    snapshot=snapshot,
+                )
+            except Exception as err:
+                # NOTE: A failing document must not stop the watcher, it will
+                # be retried once it is modified.
+                click.secho(
+                    f"Failed to apply {path}:{doc_index}: {str(err) or err.__class__.__name__}",
+                    err=True,
+                    fg="red",
+                )
+
+        if iterations is not None:
+            iterations -= 1
+            if not iterations:
+                break
+        time.sleep(interval)
@@ -19,9 +19,14 @@ def login_mock():
 
 
 @pytest.fixture
-def env_mock():
+def env_mock(tmp_path):
     with mock.patch.dict(
-        os.environ, {"SYNTROPY_API_SERVER": "server", "SYNTROPY_API_TOKEN": "token"}
+        os.environ,
+        {
+            "SYNTROPY_API_SERVER": "server",
+            "SYNTROPY_API_TOKEN": "token",
+            "SYNTROPY_NAC_CACHE_DIR": str(tmp_path / "cache"),
+        },
     ) as the_mock:
         yield the_mock
 
@@ -682,16 +687,17 @@ def platform_agent_index_ex():
 
 @pytest.fixture
 def platform_agent_get_stub():
-    def func(*args, **kwargs):
+    def func(*args, skip=0, take=None, **kwargs):
+        agents = [
+            {
+                "agent_name": f"auto gen {i}",
+                "agent_id": i,
+                "agent_tags": [],
+            }
+            for i in range(256)
+        ]
         return models.V1NetworkAgentsGetResponse(
-            data=[
-                {
-                    "agent_name": f"auto gen {i}",
-                    "agent_id": i,
-                    "agent_tags": [],
-                }
-                for i in range(256)
-            ]
+            data=agents[skip : skip + take if take else None]
         )
 
     return func
@@ -0,0 +1,131 @@
+import base64
+import json
+import os
+import stat
+import time
+from unittest import mock
+
+import pytest
+import syntropy_sdk as sdk
+from syntropy_sdk.rest import ApiException
+
+from syntropynac import auth
+
+
+def make_jwt(exp):
+    def encode(value):
+        return (
+            base64.urlsafe_b64encode(json.dumps(value).encode()).rstrip(b"=").decode()
+        )
+
+    return f"{encode({'alg': 'HS256'})}.{encode({'exp': exp})}.signature"
+
+
+class FakeResponse:
+    def __init__(self, data=b'{"data": []}', status=200):
+        self.data = data
+        self.status = status
+        self.reason = "OK"
+
+    def getheaders(self):
+        return {}
+
+    def getheader(self, name, default=None):
+        return default
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return auth.TokenCache(str(tmp_path / "cache"))
+
+
+def test_token_expiry():
+    assert auth.token_expiry(make_jwt(1234)) == 1234
+    assert auth.token_expiry("not a jwt") is None
+    assert auth.token_expiry(None) is None
+
+
+def test_token_cache(cache):
+    token = make_jwt(time.time() + 3600)
+    assert cache.get("server", "token") is None
+    cache.set("server", "token", token)
+
+    assert cache.get("server", "token") == token
+    assert cache.get("server", "other token") is None
+    assert cache.get("other server", "token") is None
+
+    assert stat.S_IMODE(os.stat(cache.directory).st_mode) == 0o700
+    (path,) = os.listdir(cache.directory)
+    assert "token" not in path
+    assert stat.S_IMODE(os.stat(os.path.join(cache.directory, path)).st_mode) == 0o600
+
+
+def test_token_cache__existing_directory(cache):
+    os.makedirs(cache.directory, mode=0o755)
+    os.chmod(cache.directory, 0o755)
+    cache.set("server", "token", make_jwt(time.time() + 3600))
+    assert stat.S_IMODE(os.stat(cache.directory).st_mode) == 0o700
+
+
+def test_token_cache__expiring(cache):
+    cache.set("server", "token", make_jwt(time.time() + auth.EXPIRY_MARGIN / 2))
+    assert cache.get("server", "token") is None
+
+
+def test_login(cache):
+    token = make_jwt(time.time() + 3600)
+    with mock.patch(
+        "syntropy_sdk.utils.login_with_access_token", return_value=token
+    ) as login:
+        assert auth.login("server", "token", cache=cache) == token
+        assert auth.login("server", "token", cache=cache) == token
+        login.assert_called_once_with("server", "token")
+
+        assert auth.login("server", "token", cache=cache, refresh=True) == token
+        assert auth.login("server", "token") == token
+        assert login.call_count == 3
+
+
+def test_install_refresh(api_lock_fix, cache):
+    config = sdk.Configuration()
+    config.host = "http://server"
+    config.api_key["Authorization"] = "Bearer expired"
+    api = sdk.ApiClient(config)
+    token = make_jwt(time.time() + 3600)
+
+    def request(method, url, headers=None, **kwargs):
+        if headers["Authorization"] == "Bearer expired":
+            raise ApiException(status=401, reason="Unauthorized")
+        return FakeResponse()
+
+    with mock.patch.object(
+        api.rest_client, "request", autospec=True, side_effect=request
+    ) as the_mock, mock.patch(
+        "syntropy_sdk.utils.login_with_access_token", return_value=token
+    ) as login:
+        auth.install_refresh(api, "server", "token", cache=cache)
+        sdk.AgentsApi(api).v1_network_agents_get(_preload_content=False)
+        sdk.AgentsApi(api).v1_network_agents_get(_preload_content=False)
+
+    login.assert_called_once_with("server", "token")
+    assert the_mock.call_count == 3
+    assert config.api_key["Authorization"] == f"Bearer {token}"
+    assert cache.get("server", "token") == token
+
+
+def test_install_refresh__other_errors(api_lock_fix):
+    config = sdk.Configuration()
+    config.host = "http://server"
+    config.api_key["Authorization"] = "Bearer token"
+    api = sdk.ApiClient(config)
+
+    with mock.patch.object(
+        api.rest_client,
+        "request",
+        autospec=True,
+        side_effect=ApiException(status=403, reason="Forbidden"),
+    ), mock.patch("syntropy_sdk.utils.login_with_access_token") as login:
+        auth.install_refresh(api, "server", "token")
+        with pytest.raises(ApiException):
+            sdk.AgentsApi(api).v1_network_agents_get(_preload_content=False)
+    login.assert_not_called()
@@ -1,9 +1,19 @@
+import json
+import subprocess
+import sys
 from unittest import mock
 
 import pytest
 import syntropy_sdk as sdk
 
 from syntropynac import __main__ as ctl
+from syntropynac import resolve, session
+from syntropynac.commands import validate as validate_command
+from syntropynac.commands.configure import configure
+from syntropynac.commands.estimate import estimate
+from syntropynac.commands.export import export
+from syntropynac.commands.fingerprint import fingerprint_agents
+from syntropynac.commands.validate import validate
 
 
 @pytest.fixture
@@ -23,8 +33,16 @@ def test_yaml(runner, test_yaml):
         yield
 
 
-def test_configure_networks(runner, test_yaml, config_mock, login_mock):
-    runner.invoke(ctl.configure, ["test.yaml"], catch_exceptions=False)
+def test_configure_networks(
+    runner,
+    test_yaml,
+    config_mock,
+    login_mock,
+    api_agents_get,
+    api_agents_search,
+    api_connections,
+):
+    runner.invoke(configure, ["test.yaml"], catch_exceptions=False)
     config_mock.assert_called_once_with(
         mock.ANY,
         {
@@ -45,11 +63,23 @@ def test_configure_networks(runner, test_yaml, config_mock, login_mock):
             },
         },
         False,
+        index=mock.ANY,
+        snapshot=mock.ANY,
+        report=mock.ANY,
+        updates=mock.ANY,
     )
 
 
-def test_configure_networks__dry_run(runner, test_yaml, config_mock, login_mock):
-    runner.invoke(ctl.configure, ["--dry-run", "test.yaml"])
+def test_configure_networks__dry_run(
+    runner,
+    test_yaml,
+    config_mock,
+    login_mock,
+    api_agents_get,
+    api_agents_search,
+    api_connections,
+):
+    runner.invoke(configure, ["--dry-run", "test.yaml"])
     config_mock.assert_called_once_with(
         mock.ANY,
         {
@@ -70,7 +100,80 @@ def test_configure_networks__dry_run(runner, test_yaml, config_mock, login_mock)
             },
         },
         True,
+        index=mock.ANY,
+        snapshot=mock.ANY,
+        report=mock.ANY,
+        updates=None,
+    )
+
+
+def test_configure_networks__report(
+    runner,
+    test_yaml,
+    config_mock,
+    login_mock,
+    api_agents_get,
+    api_agents_search,
+    api_connections,
+):
+    def configure_network(api, config, dry_run, report=None, **kwargs):
+        report.pairs_planned = 3
+        return True
+
+    config_mock.side_effect = configure_network
+    result = runner.invoke(
+        configure, ["--dry-run", "--report", "report.json", "test.yaml"]
     )
+    assert result.exit_code == 0
+    with open("report.json") as f:
+        summary = json.load(f)
+    assert summary["total"]["documents"] == 1
+    assert summary["total"]["pairs_planned"] == 3
+    assert summary["documents"][0]["name"] == "edge_to_lb"
+    assert "duration" in summary["documents"][0]
+
+
+def test_configure_networks__flush_after_failure(
+    runner,
+    test_yaml,
+    config_mock,
+    login_mock,
+    api_agents_get,
+    api_agents_search,
+    api_connections,
+):
+    def configure_network(api, config, dry_run, updates=None, **kwargs):
+        agent = {"agent_id": 1, "agent_services": []}
+        updates.add(
+            resolve.ConnectionServices(1, 2, [], []),
+            {
+                "agent_connection_group_id": 1,
+                "agent_1": agent,
+                "agent_2": {**agent, "agent_id": 2},
+                "agent_connection_subnets": [],
+            },
+        )
+        raise ValueError("document failed")
+
+    config_mock.side_effect = configure_network
+    with mock.patch(
+        "syntropynac.configure.flush_services_updates",
+        autospec=True,
+        side_effect=ValueError("flush failed"),
+    ) as flush_mock:
+        result = runner.invoke(configure, ["test.yaml"])
+    flush_mock.assert_called_once()
+    # The document error is not replaced by the flush error.
+    assert str(result.exception) == "document failed"
+    assert "Could not update services of applied documents" in result.output
+    assert "Configured" not in result.output
+
+
+def test_configure_networks__missing_config(runner, login_mock, env_mock):
+    result = runner.invoke(configure, [])
+    assert result.exit_code == 2
+    assert "Missing argument 'CONFIG'" in result.output
+    login_mock.assert_not_called()
 
 
 def test_export_networks(
@@ -82,7 +185,7 @@ def test_export_networks(
     with_batched_filter,
     login_mock,
 ):
-    result = runner.invoke(ctl.export, catch_exceptions=False)
+    result = runner.invoke(export, catch_exceptions=False)
     assert "connections" in result.output
     assert "P2M" in result.output
     assert "topology" in result.output
@@ -90,3 +193,197 @@ def test_export_networks(
     assert "present" in result.output
     assert "endpoints" in result.output
     assert "nats-streaming" in result.output
+
+
+def test_fingerprint(
+    runner,
+    api_connections_services,
+    api_services,
+    with_batched_filter,
+    login_mock,
+):
+    result = runner.invoke(fingerprint_agents, ["9", "22"], catch_exceptions=False)
+    assert result.exit_code == 0
+    assert len(result.output.strip()) == 64
+
+    result = runner.invoke(
+        fingerprint_agents, ["--json", "9", "22"], catch_exceptions=False
+    )
+    assert '"connections": 2' in result.output
+
+
+def test_stats_json(
+    runner,
+    api_connections_services,
+    api_services,
+    with_batched_filter,
+    login_mock,
+):
+    with runner.isolated_filesystem():
+        result = runner.invoke(
+            ctl.apis,
+            ["--stats-json", "stats.json", "fingerprint", "9", "22"],
+            catch_exceptions=False,
+        )
+        assert result.exit_code == 0
+        with open("stats.json") as f:
+            summary = json.load(f)
+    assert summary["total"]["calls"] == 0
+    assert summary["endpoints"] == {}
+
+
+def test_session_options(
+    runner,
+    api_connections_services,
+    api_services,
+    with_batched_filter,
+    login_mock,
+):
+    with mock.patch(
+        "syntropynac.session.create_api_client",
+        autospec=True,
+        side_effect=session.create_api_client,
+    ) as the_mock:
+        result = runner.invoke(
+            ctl.apis,
+            ["--jobs", "8", "--timeout", "30", "fingerprint", "9", "22"],
+            catch_exceptions=False,
+        )
+    assert result.exit_code == 0
+    settings = the_mock.call_args[0][1]
+    assert settings.jobs == 8
+    assert settings.pool_maxsize == 10
+    assert settings.timeout == (None, 30)
+
+
+def test_progress_options(
+    runner,
+    api_connections_services,
+    api_services,
+    with_batched_filter,
+    login_mock,
+):
+    with mock.patch("syntropynac.progress.start", autospec=True) as the_mock:
+        result = runner.invoke(
+            ctl.apis,
+            ["--progress", "log", "--progress-interval", "5", "fingerprint", "9"],
+            catch_exceptions=False,
+        )
+    assert result.exit_code == 0
+    the_mock.assert_called_once_with("log", 5.0)
+
+    result = runner.invoke(ctl.apis, ["--progress", "always", "fingerprint", "9"])
+    assert result.exit_code == 2
+
+
+def test_help_does_not_import_sdk(tmp_path):
+    # NOTE: A subprocess is used since the SDK is already imported by the tests.
+    code = (
+        "import sys\n"
+        "from click.testing import CliRunner\n"
+        "from syntropynac import __main__ as ctl\n"
+        "result = CliRunner().invoke(ctl.apis, ['--help'])\n"
+        "assert 'fingerprint' in result.output, result.output\n"
+        "result = CliRunner().invoke(ctl.apis, ['configure', '--bad-option'])\n"
+        "assert result.exit_code == 2, result.output\n"
+        "assert 'syntropy_sdk' not in sys.modules\n"
+        "assert 'yaml' not in sys.modules\n"
+        "result = CliRunner().invoke(ctl.apis, ['validate', sys.argv[1]])\n"
+        "assert result.exit_code == 0, result.output\n"
+        "assert 'syntropy_sdk' not in sys.modules\n"
+    )
+    config = tmp_path / "config.yaml"
+    config.write_text("topology: p2p\nstate: present\n")
+    subprocess.run([sys.executable, "-c", code, str(config)], check=True)
+
+
+def test_lazy_commands(runner):
+    result = runner.invoke(ctl.apis, ["--help"])
+    for name, (_, short_help) in ctl.LAZY_COMMANDS.items():
+        assert name in result.output
+        command = ctl.apis.get_command(None, name)
+        assert command.name == name
+        assert command.get_short_help_str(limit=200) == short_help
+
+
+MESH_YAML = """
+name: mesh
+topology: mesh
+state: present
+connections:
+  auto gen 1: {type: endpoint, services: [ssh]}
+  auto gen 2: {type: endpoint}
+  auto gen 3: {type: endpoint}
+  auto gen 4: {type: endpoint}
+  auto gen 5: {type: endpoint}
+"""
+
+
+def test_estimate(runner, login_mock, api_agents_get, tmp_path):
+    path = tmp_path / "mesh.yaml"
+    path.write_text(MESH_YAML)
+
+    result = runner.invoke(estimate, [str(path)], catch_exceptions=False)
+    assert result.exit_code == 0
+    assert "0: mesh" in result.output
+
+    result = runner.invoke(estimate, ["--json", str(path)], catch_exceptions=False)
+    summary = json.loads(result.output)
+    assert summary["total"]["pairs"] == 10
+    assert summary["documents"][0]["services_update_calls"] == 4
+
+    result = runner.invoke(estimate, ["--max-pairs", "9", str(path)])
+    assert result.exit_code == 1
+    assert "10 pairs exceed the budget of 9." in result.output
+
+
+def test_configure_networks__budget(
+    runner,
+    config_mock,
+    login_mock,
+    api_agents_get,
+    api_agents_search,
+    api_connections,
+    tmp_path,
+):
+    path = tmp_path / "mesh.yaml"
+    path.write_text(MESH_YAML)
+
+    result = runner.invoke(configure, ["--max-pairs", "9", str(path)])
+    assert result.exit_code == 1
+    assert "Budget exceeded" in result.output
+    config_mock.assert_not_called()
+
+    result = runner.invoke(configure, ["--max-pairs", "10", str(path)])
+    assert result.exit_code == 0
+    config_mock.assert_called_once()
+
+
+def test_validate(runner, tmp_path):
+    valid = tmp_path / "valid.yaml"
+    valid.write_text(
+        "topology: p2p\nstate: present\nconnections:\n  a:\n    type: tag\n"
+    )
+    invalid = tmp_path / "invalid.json"
+    invalid.write_text('{"topology": "p2p", "state": "gone"}')
+
+    result = runner.invoke(validate, [str(valid)])
+    assert result.exit_code == 0
+    assert "1 documents in 1 files: 0 errors" in result.output
+
+    result = runner.invoke(validate, ["--workers", "2", str(valid), str(invalid)])
+    assert result.exit_code == 1
+    assert "invalid.json[0]: error: Invalid state gone" in result.output
+
+
+def test_validate__parallel(runner, tmp_path):
+    files = []
+    for i in range(validate_command.PARALLEL_THRESHOLD):
+        path = tmp_path / f"{i}.yaml"
+        path.write_text(f"topology: p2p\nstate: {'gone' if i == 3 else 'present'}\n")
+        files.append(str(path))
+
+    result = runner.invoke(validate, ["--workers", "2", *files])
+    assert result.exit_code == 1
+    assert "3.yaml[0]: error: Invalid state gone" in result.output
+    assert "16 documents in 16 files: 1 errors" in result.output
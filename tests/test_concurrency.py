@@ -0,0 +1,346 @@
+import itertools
+import threading
+import time
+from email.utils import formatdate
+from unittest import mock
+
+import pytest
+import syntropy_sdk as sdk
+from syntropy_sdk import models
+from syntropy_sdk.rest import ApiException
+
+from syntropynac import concurrency, stats
+
+
+class FakeResponse:
+    def __init__(self, data=b'{"data": []}', status=200, headers=None):
+        self.data = data
+        self.status = status
+        self.reason = "OK"
+        self.headers = headers or {}
+
+    def getheaders(self):
+        return self.headers
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name, default)
+
+
+def api_error(status, headers=None):
+    return ApiException(http_resp=FakeResponse(b"", status, headers))
+
+
+@pytest.fixture
+def api(api_lock_fix):
+    config = sdk.Configuration()
+    config.host = "http://server"
+    api = sdk.ApiClient(config)
+    with mock.patch.object(api.rest_client, "request", autospec=True) as the_mock:
+        the_mock.return_value = FakeResponse()
+        yield api
+
+
+@pytest.fixture
+def sleep_mock():
+    with mock.patch("syntropynac.concurrency.time.sleep", autospec=True) as the_mock:
+        yield the_mock
+
+
+def test_aimd_limiter():
+    limiter = concurrency.AIMDLimiter(4)
+    tokens = [limiter.acquire() for _ in range(4)]
+    assert limiter.in_flight == 4
+
+    # Requests that were in flight at the time of decrease don't decrease the limit again
+    limiter.release(tokens[0], throttled=True)
+    limiter.release(tokens[1], throttled=True)
+    assert limiter.limit == 2
+    assert limiter.throttled == 2
+
+    limiter.release(tokens[2])
+    limiter.release(tokens[3])
+    assert limiter.limit == pytest.approx(2.9)
+
+    for _ in range(10):
+        limiter.release(limiter.acquire())
+    assert limiter.limit == 4
+    assert limiter.in_flight == 0
+
+
+def test_aimd_limiter__minimum():
+    limiter = concurrency.AIMDLimiter(2)
+    for _ in range(5):
+        limiter.release(limiter.acquire(), throttled=True)
+    assert limiter.limit == 1
+
+
+def test_adaptive_batch_size():
+    sizer = concurrency.AdaptiveBatchSize(100, minimum=10, maximum=300, target=4)
+    sizer.record(1)
+    assert sizer.next() == 200
+    sizer.record(1)
+    assert sizer.next() == 300
+    # Latency between half of the target and the target keeps the size
+    sizer.record(3)
+    assert sizer.next() == 300
+    sizer.record(5)
+    assert sizer.next() == 150
+    sizer.record(1, errors=1)
+    assert sizer.next() == 75
+    for _ in range(5):
+        sizer.record(10)
+    assert sizer.next() == 10
+
+
+def test_run_graph():
+    order = []
+    started = threading.Event()
+
+    def task(name, wait=None):
+        def func():
+            order.append(name)
+            if name == "a":
+                started.set()
+            if wait is not None:
+                # Independent tasks run at the same time
+                assert wait.wait(5)
+            return name
+
+        return func
+
+    assert (
+        concurrency.run_graph(
+            {
+                "a": (task("a"), ()),
+                "b": (task("b", started), ()),
+                "c": (task("c"), ("a", "b")),
+            }
+        )
+        == {"a": "a", "b": "b", "c": "c"}
+    )
+    assert order[-1] == "c"
+
+
+def test_run_graph__failure():
+    ran = []
+
+    def fail():
+        raise ValueError("broken")
+
+    with pytest.raises(ValueError):
+        concurrency.run_graph(
+            {
+                "a": (fail, ()),
+                "b": (lambda: ran.append("b"), ("a",)),
+                "c": (lambda: ran.append("c"), ()),
+            }
+        )
+    assert ran == ["c"]
+
+
+def test_run_pipeline():
+    sizes = itertools.chain([2, 3], itertools.repeat(10))
+    batches = []
+    totals = []
+
+    def batch(items):
+        batches.append(items)
+        return [sum(items)]
+
+    concurrency.run_pipeline(
+        range(5),
+        [
+            concurrency.Stage("double", lambda item: [item, item]),
+            concurrency.Stage("batch", batch, workers=3, batch=lambda: next(sizes)),
+            concurrency.Stage("collect", lambda total: totals.append(total) or []),
+        ],
+    )
+    # Batches keep the input order and the last one is cut short by the end of input.
+    assert batches == [[0, 0], [1, 1, 2], [2, 3, 3, 4, 4]]
+    assert sorted(totals) == [0, 4, 16]
+
+
+def test_run_pipeline__backpressure():
+    fed = []
+    release = threading.Event()
+
+    def source():
+        for item in range(100):
+            fed.append(item)
+            yield item
+
+    def block(item):
+        assert release.wait(5)
+        return []
+
+    stages = [
+        concurrency.Stage("pass", lambda item: [item], queue_size=2),
+        concurrency.Stage("block", block, queue_size=2),
+    ]
+    thread = threading.Thread(target=concurrency.run_pipeline, args=(source(), stages))
+    thread.start()
+    time.sleep(0.1)
+    # Items held by the workers and the full queues stop the source.
+    assert len(fed) <= 8
+    release.set()
+    thread.join(5)
+    assert len(fed) == 100
+
+
+def test_run_pipeline__failure():
+    fed = []
+    done = []
+
+    def source():
+        for item in range(1000):
+            fed.append(item)
+            yield item
+
+    def fail(item):
+        if item == 3:
+            raise ValueError("broken")
+        return [item]
+
+    stages = [
+        concurrency.Stage("fail", fail, workers=2, queue_size=1),
+        concurrency.Stage("done", lambda item: done.append(item) or []),
+    ]
+    with pytest.raises(ValueError):
+        concurrency.run_pipeline(source(), stages)
+    # Feeding stopped and the items already fed were processed.
+    assert len(fed) < 1000
+    assert sorted(done) == [item for item in fed if item != 3]
+
+
+def test_run_pipeline__cancel_on_error():
+    started = []
+
+    def fail(item):
+        started.append(item)
+        if item == 1:
+            raise ValueError("broken")
+        return [item]
+
+    stages = [
+        concurrency.Stage("fail", fail, cancel_on_error=True),
+    ]
+    with pytest.raises(ValueError):
+        concurrency.run_pipeline(range(1000), stages)
+    # Items queued after the failure were dropped without being started.
+    assert started == [0, 1]
+
+
+def test_aimd_limiter__blocks():
+    limiter = concurrency.AIMDLimiter(1)
+    token = limiter.acquire()
+    acquired = threading.Event()
+
+    def worker():
+        limiter.release(limiter.acquire())
+        acquired.set()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not acquired.wait(0.05)
+    limiter.release(token)
+    assert acquired.wait(1)
+    thread.join()
+
+
+def test_retry_after_delay():
+    assert concurrency.retry_after_delay(api_error(429)) is None
+    assert concurrency.retry_after_delay(api_error(429, {"Retry-After": "3"})) == 3
+    assert concurrency.retry_after_delay(api_error(429, {"Retry-After": "-3"})) == 0
+    assert (
+        concurrency.retry_after_delay(api_error(429, {"Retry-After": "soon"})) is None
+    )
+    date = formatdate(time.time() + 60, usegmt=True)
+    assert (
+        55 < concurrency.retry_after_delay(api_error(429, {"Retry-After": date})) <= 60
+    )
+
+
+def test_retry_policy():
+    policy = concurrency.RetryPolicy(retries=2, base=1, cap=3)
+    get, post, search = ("GET", "/agents"), ("POST", "/p2p"), ("POST", "/search")
+
+    assert policy.should_retry(0, *get, api_error(502))
+    assert policy.should_retry(0, *search, api_error(500))
+    assert not policy.should_retry(0, *post, api_error(502))
+    assert policy.should_retry(0, *get, api_error(503))
+    # A write that got 503 might have been processed unless the platform asks to retry it.
+    assert not policy.should_retry(0, *post, api_error(503))
+    assert policy.should_retry(0, *post, api_error(503, {"Retry-After": "1"}))
+    assert policy.should_retry(1, *post, api_error(429))
+    assert not policy.should_retry(2, *post, api_error(429))
+    assert not policy.should_retry(0, *get, api_error(404))
+
+    for attempt in range(5):
+        assert 0 <= policy.delay(attempt) <= min(3, 2 ** attempt)
+    assert policy.delay(0, api_error(503, {"Retry-After": "100000"})) == (
+        concurrency.MAX_RETRY_AFTER
+    )
+
+
+def test_install(api, sleep_mock):
+    api_stats = stats.install(api)
+    limiter = concurrency.AIMDLimiter(4)
+    concurrency.install(api, concurrency.RetryPolicy(), limiter)
+    api.rest_client.request.side_effect = [
+        api_error(429, {"Retry-After": "2"}),
+        api_error(502),
+        FakeResponse(),
+    ]
+
+    sdk.AgentsApi(api).v1_network_agents_get(_preload_content=False)
+
+    assert api.rest_client.request.call_count == 3
+    assert sleep_mock.call_args_list[0] == mock.call(2.0)
+    assert api_stats.endpoints["v1_network_agents_get"].retries == 2
+    assert limiter.limit == pytest.approx(2.9)
+    assert limiter.in_flight == 0
+    assert api.limiter is limiter
+
+
+def test_retry_counter(api, sleep_mock):
+    concurrency.install(api)
+    api.rest_client.request.side_effect = [
+        api_error(429),
+        FakeResponse(),
+        api_error(429),
+        FakeResponse(),
+    ]
+
+    with concurrency.RetryCounter() as counter:
+        sdk.AgentsApi(api).v1_network_agents_get(_preload_content=False)
+        # Retries of requests made by other threads are not counted.
+        thread = threading.Thread(
+            target=sdk.AgentsApi(api).v1_network_agents_get,
+            kwargs={"_preload_content": False},
+        )
+        thread.start()
+        thread.join()
+    assert api.rest_client.request.call_count == 4
+    assert counter.retries == 1
+
+
+def test_install__gives_up(api, sleep_mock):
+    concurrency.install(api, concurrency.RetryPolicy(retries=2))
+    api.rest_client.request.side_effect = api_error(503)
+
+    with pytest.raises(ApiException):
+        sdk.AgentsApi(api).v1_network_agents_get(_preload_content=False)
+    assert api.rest_client.request.call_count == 3
+    assert sleep_mock.call_count == 2
+
+
+def test_install__no_retry_for_writes(api, sleep_mock):
+    concurrency.install(api)
+    api.rest_client.request.side_effect = api_error(502)
+
+    with pytest.raises(ApiException):
+        sdk.ConnectionsApi(api).v1_network_connections_create_p2_p(
+            body=models.V1NetworkConnectionsCreateP2PRequest(agent_pairs=[]),
+        )
+    assert api.rest_client.request.call_count == 1
+    sleep_mock.assert_not_called()
@@ -1,19 +1,40 @@
+import threading
+import time
 from unittest import mock
 
 import pytest
 import syntropy_sdk as sdk
 from syntropy_sdk import models
 
-from syntropynac import configure, exceptions, resolve, transform
+from syntropynac import (
+    concurrency,
+    configure,
+    exceptions,
+    report,
+    resolve,
+    settings,
+    subnets,
+    transform,
+    watch,
+)
 
 
 @pytest.fixture
-def config_mock():
+def services_mock():
     with mock.patch(
-        "syntropynac.configure.configure_connections",
+        "syntropynac.configure.fetch_services",
         autospec=True,
-        return_value=(1, 3),
-    ) as the_mock:
+        side_effect=lambda api, services, connections, silent=False: [
+            (service, None) for service in services
+        ],
+    ) as the_mock, mock.patch(
+        "syntropynac.configure.apply_services",
+        autospec=True,
+        side_effect=lambda api, matched, updates=None, task=None: (
+            len(matched),
+            3 * len(matched),
+        ),
+    ):
         yield the_mock
 
 
@@ -145,13 +166,22 @@ def connections_stub():
     return stub
 
 
-def test_create_connections(api_connections, with_pagination, created_connections):
-    sdk.ConnectionsApi.v1_network_connections_get.side_effect = (
-        lambda *args, **kwargs: models.V1NetworkConnectionsGetResponse(
-            data=created_connections
-        )
+def create_response(*args, body=None, **kwargs):
+    return models.V1NetworkConnectionsCreateResponse(
+        data=[
+            models.V1ConnectionCreateItem(
+                agent_1_id=pair.agent_1_id,
+                agent_2_id=pair.agent_2_id,
+                agent_connection_group_id=pair.agent_1_id * 100 + pair.agent_2_id,
+            )
+            for pair in body.agent_pairs
+        ]
     )
 
+
+def test_create_connections(api_connections):
+    sdk.ConnectionsApi.v1_network_connections_create_p2_p.side_effect = create_response
+
     result = configure.create_connections(
         mock.Mock(spec=sdk.ApiClient), [(13, 11), (14, 13)], True
     )
@@ -173,6 +203,30 @@ def test_create_connections(api_connections, with_pagination, created_connection
             _preload_content=False,
         ),
     ]
+    assert sdk.ConnectionsApi.v1_network_connections_search.call_count == 0
+    assert result == [
+        {
+            "agent_1": {"agent_id": 13},
+            "agent_2": {"agent_id": 11},
+            "agent_connection_group_id": 1311,
+        },
+        {
+            "agent_1": {"agent_id": 14},
+            "agent_2": {"agent_id": 13},
+            "agent_connection_group_id": 1413,
+        },
+    ]
+
+
+def test_create_connections__search(api_connections, created_connections):
+    sdk.ConnectionsApi.v1_network_connections_search.return_value = (
+        models.V1NetworkConnectionsSearchResponse(data=created_connections)
+    )
+
+    result = configure.create_connections(
+        mock.Mock(spec=sdk.ApiClient), [(13, 11), (14, 13)], True
+    )
+    assert sdk.ConnectionsApi.v1_network_connections_search.call_count == 1
     assert result == [
         {
             "agent_1": {"agent_id": 13, "agent_name": "iot_mqtt"},
@@ -187,6 +241,50 @@ def test_create_connections(api_connections, with_pagination, created_connection
     ]
 
 
+def test_create_connections__batches(api_connections):
+    sdk.ConnectionsApi.v1_network_connections_create_p2_p.side_effect = create_response
+    peers = [(1, i) for i in range(2, 27)]
+    batches = []
+
+    result = configure.create_connections(
+        mock.Mock(spec=sdk.ApiClient),
+        peers,
+        True,
+        on_created=batches.append,
+        sizer=concurrency.AdaptiveBatchSize(10, minimum=1, maximum=10),
+    )
+    calls = sdk.ConnectionsApi.v1_network_connections_create_p2_p.call_args_list
+    assert sorted(len(call[1]["body"].agent_pairs) for call in calls) == [5, 10, 10]
+    assert sorted(len(batch) for batch in batches) == [5, 10, 10]
+    assert sorted(con["agent_connection_group_id"] for con in result) == [
+        100 + i for i in range(2, 27)
+    ]
+
+
+def test_create_connections__failed_batch(api_connections):
+    def create(*args, body=None, **kwargs):
+        if body.agent_pairs[0].agent_2_id == 12:
+            raise ValueError("timeout")
+        return create_response(body=body)
+
+    sdk.ConnectionsApi.v1_network_connections_create_p2_p.side_effect = create
+    api = mock.Mock(spec=sdk.ApiClient)
+    api.session = settings.SessionSettings(jobs=1)
+    batches = []
+
+    with pytest.raises(ValueError):
+        configure.create_connections(
+            api,
+            [(1, i) for i in range(2, 42)],
+            True,
+            on_created=batches.append,
+            sizer=concurrency.AdaptiveBatchSize(10, minimum=10, maximum=10),
+        )
+    # The first batch was handed over and no batch was started after the failed one.
+    assert [len(batch) for batch in batches] == [10]
+    assert sdk.ConnectionsApi.v1_network_connections_create_p2_p.call_count == 2
+
+
 def test_delete_connections(api_connections):
     result = configure.delete_connections(
         mock.Mock(spec=sdk.ApiClient),
@@ -203,6 +301,64 @@ def test_delete_connections(api_connections):
     ]
 
 
+def test_delete_connections__known(api_connections, p2p_connections):
+    result = configure.delete_connections(
+        mock.Mock(spec=sdk.ApiClient),
+        [(2, 1), (13, 11)],
+        configure.connections_by_pair(p2p_connections[:1]),
+    )
+    assert result == 2
+    # Only the pair that isn't known is searched for.
+    assert sdk.ConnectionsApi.v1_network_connections_search.call_args_list == [
+        mock.call(
+            mock.ANY,
+            body=models.V1NetworkConnectionsSearchRequest(
+                filter=models.V1ConnectionFilter(
+                    agent_pair=[models.V1AgentPairFilter(agent_1_id=13, agent_2_id=11)]
+                )
+            ),
+            _preload_content=False,
+        )
+    ]
+    assert sdk.ConnectionsApi.v1_network_connections_remove.call_args_list == [
+        mock.call(
+            mock.ANY,
+            body=models.V1NetworkConnectionsRemoveRequest(
+                agent_connection_group_ids=[1, 2],
+            ),
+        ),
+    ]
+
+
+def test_delete_connections__chunks(api_connections):
+    def remove(_, body=None):
+        if 3 in body.agent_connection_group_ids:
+            raise ValueError("timeout")
+
+    sdk.ConnectionsApi.v1_network_connections_remove.side_effect = remove
+    current = {
+        frozenset((i, i + 100)): {"agent_connection_group_id": i} for i in range(5)
+    }
+    chunks = []
+
+    with mock.patch.object(configure, "DELETE_CHUNK_SIZE", 2), pytest.raises(
+        ValueError
+    ):
+        configure.delete_connections(
+            mock.Mock(spec=sdk.ApiClient),
+            [(i, i + 100) for i in range(5)],
+            current,
+            silent=True,
+            on_chunk=lambda chunk, error: chunks.append((chunk, repr(error))),
+        )
+    assert sdk.ConnectionsApi.v1_network_connections_search.call_count == 0
+    assert sorted(chunks) == [
+        ([0, 1], "None"),
+        ([2, 3], "ValueError('timeout')"),
+        ([4], "None"),
+    ]
+
+
 @pytest.mark.parametrize(
     "config, result",
     [
@@ -262,6 +418,65 @@ def test_configure_connection(
     )
 
 
+def test_configure_connections(api_services, with_batched):
+    connections = [
+        {
+            "agent_connection_group_id": 169,
+            "agent_1": {"agent_id": 9},
+            "agent_2": {"agent_id": 22},
+        },
+        {
+            "agent_connection_group_id": 170,
+            "agent_1": {"agent_id": 1},
+            "agent_2": {"agent_id": 2},
+        },
+        {
+            "agent_connection_group_id": 171,
+            "agent_1": {"agent_id": 22},
+            "agent_2": {"agent_id": 3},
+        },
+    ]
+    result = configure.configure_connections(
+        mock.Mock(spec=sdk.ApiClient),
+        [resolve.ConnectionServices(22, 9, ["nats-streaming"], [])],
+        connections,
+        silent=True,
+    )
+    assert result == (1, 2)
+    # Only services of the connections to configure are fetched.
+    assert sdk.ConnectionsApi.v1_network_connections_services_get.call_args_list == [
+        mock.call(mock.ANY, filter="169", _preload_content=False)
+    ]
+
+
+def test_configure_connections__buffered(api_services, with_batched):
+    connection = {
+        "agent_connection_group_id": 169,
+        "agent_1": {"agent_id": 9},
+        "agent_2": {"agent_id": 22},
+    }
+    updates = subnets.ServicesUpdates()
+    for services in (["nats-streaming"], ["sdn-bi"]):
+        assert (
+            configure.configure_connections(
+                mock.Mock(spec=sdk.ApiClient),
+                [resolve.ConnectionServices(9, 22, services, [])],
+                [connection],
+                silent=True,
+                updates=updates,
+            )
+            == (1, 0)
+        )
+    assert sdk.ConnectionsApi.v1_network_connections_services_update.call_count == 0
+
+    # Subnets of both documents are enabled and only the unused one is disabled.
+    assert configure.flush_services_updates(mock.Mock(spec=sdk.ApiClient), updates) == (
+        1,
+        3,
+    )
+    assert sdk.ConnectionsApi.v1_network_connections_services_update.call_count == 1
+
+
 def test_configure_network__validation_fail(
     api_connections,
     api_agents_search,
@@ -285,6 +500,27 @@ def test_configure_network__validation_fail(
     )
 
 
+@pytest.mark.parametrize(
+    "config, error",
+    [
+        [{"topology": "p2p"}, "topology and state must be present"],
+        [{"topology": "p2p", "state": "gone"}, "Invalid state gone"],
+        [
+            {"topology": "star", "state": "present"},
+            "Network topology star not supported.",
+        ],
+    ],
+)
+def test_configure_network__invalid_document(config, error):
+    with mock.patch(
+        "syntropynac.configure.configure_network_update", autospec=True
+    ) as the_mock, pytest.raises(exceptions.ConfigureNetworkError, match=error):
+        configure.configure_network(
+            mock.Mock(spec=sdk.ApiClient), config, False, silent=True
+        )
+    the_mock.assert_not_called()
+
+
 def test_configure_network__create(validate_connections_mock):
     config = {"name": "test", "topology": "P2P", "state": "present"}
     with mock.patch(
@@ -298,7 +534,16 @@ def test_configure_network__create(validate_connections_mock):
             )
             == "changed"
         )
-        the_mock.assert_called_once_with(mock.ANY, config, "False", silent="silent")
+        the_mock.assert_called_once_with(
+            mock.ANY,
+            config,
+            "False",
+            silent="silent",
+            index=None,
+            snapshot=None,
+            report=mock.ANY,
+            updates=None,
+        )
         validate_connections_mock.assert_called_once_with({}, silent="silent")
 
 
@@ -343,6 +588,73 @@ def test_delete_network(
     ]
 
 
+def test_configure_network__present_then_absent(
+    api_agents_search, api_agents_get, api_connections, p2p_connections
+):
+    def fetch_services(api, services, connections, silent=False):
+        by_pair = configure.connections_by_pair(connections)
+        return [
+            (
+                service,
+                {
+                    **by_pair[frozenset((service.agent_1, service.agent_2))],
+                    "agent_1": {"agent_id": service.agent_1, "agent_services": []},
+                    "agent_2": {"agent_id": service.agent_2, "agent_services": []},
+                    "agent_connection_subnets": [],
+                },
+            )
+            for service in services
+        ]
+
+    api = mock.Mock(spec=sdk.ApiClient)
+
+    def document(state):
+        return {
+            "topology": "p2p",
+            "state": state,
+            "connections": {
+                "agent1": {
+                    "type": "endpoint",
+                    "state": state,
+                    "connect_to": {"agent2": {"type": "endpoint"}},
+                }
+            },
+        }
+
+    snapshot = watch.ConnectionSnapshot(p2p_connections)
+    updates = subnets.ServicesUpdates()
+    with mock.patch(
+        "syntropynac.configure.fetch_services",
+        autospec=True,
+        side_effect=fetch_services,
+    ):
+        configure.configure_network(
+            api,
+            document("present"),
+            False,
+            silent=True,
+            snapshot=snapshot,
+            updates=updates,
+        )
+        assert len(updates) == 1
+        configure.configure_network(
+            api,
+            document("absent"),
+            False,
+            silent=True,
+            snapshot=snapshot,
+            updates=updates,
+        )
+
+    # The connection configured by the first document was removed by the second one.
+    assert len(updates) == 0
+    with mock.patch.object(
+        sdk.ConnectionsApi, "v1_network_connections_services_update", autospec=True
+    ) as update:
+        assert configure.flush_services_updates(api, updates) == (0, 0)
+    update.assert_not_called()
+
+
 def test_update_network__p2p_dry_run(
     api_agents_search, api_agents_get, with_pagination, api_connections
 ):
@@ -374,7 +686,7 @@ def test_update_network__p2p_dry_run(
 
 
 def test_update_network__p2p(
-    api_agents_search, api_agents_get, api_connections, with_pagination, config_mock
+    api_agents_search, api_agents_get, api_connections, with_pagination, services_mock
 ):
     config = {
         "topology": "p2p",
@@ -389,16 +701,19 @@ def test_update_network__p2p(
             "agent5": {"connect_to": {"agent6": {}}},
         },
     }
+    sdk.ConnectionsApi.v1_network_connections_create_p2_p.side_effect = create_response
     assert (
         configure.configure_network_update(mock.Mock(spec=sdk.ApiClient), config, False)
         == True
     )
-    assert sdk.ConnectionsApi.v1_network_connections_get.call_count == 2
+    assert sdk.ConnectionsApi.v1_network_connections_get.call_count == 1
+    # Group ids of the fetched connections are used without searching for them.
+    assert sdk.ConnectionsApi.v1_network_connections_search.call_count == 0
     assert sdk.ConnectionsApi.v1_network_connections_remove.call_args_list == [
         mock.call(
             mock.ANY,
             body=models.V1NetworkConnectionsRemoveRequest(
-                agent_connection_group_ids=[1, 2],
+                agent_connection_group_ids=[1],
             ),
         ),
     ]
@@ -418,6 +733,213 @@ def test_update_network__p2p(
     ]
 
 
+def test_update_network__p2p_report(
+    api_agents_search, api_agents_get, api_connections, services_mock
+):
+    config = {
+        "topology": "p2p",
+        "state": "present",
+        "connections": {
+            "agent1": {
+                "state": "absent",
+                "connect_to": {
+                    "agent2": {},
+                },
+            },
+            "agent5": {"connect_to": {"agent6": {}}},
+        },
+    }
+    sdk.ConnectionsApi.v1_network_connections_create_p2_p.side_effect = create_response
+    document_report = report.DocumentReport()
+    assert configure.configure_network_update(
+        mock.Mock(spec=sdk.ApiClient), config, False, report=document_report
+    )
+    assert document_report == report.DocumentReport(
+        pairs_planned=1,
+        pairs_to_create=1,
+        pairs_to_delete=1,
+        created=1,
+        deleted=1,
+        delete_chunks=[{"connections": 1, "error": None}],
+        connections_configured=1,
+        subnets_toggled=3,
+    )
+    # Services of the created connection are fetched along with its batch.
+    assert services_mock.call_args_list == [
+        mock.call(
+            mock.ANY,
+            [mock.ANY],
+            [
+                {
+                    "agent_connection_group_id": 506,
+                    "agent_1": {"agent_id": 5},
+                    "agent_2": {"agent_id": 6},
+                }
+            ],
+            silent=False,
+        )
+    ]
+
+
+def test_update_network__existing_and_created(
+    api_agents_search, api_agents_get, api_connections, services_mock
+):
+    config = {
+        "topology": "p2p",
+        "state": "present",
+        "connections": {
+            "agent1": {"connect_to": {"agent2": {}}},
+            "agent5": {"connect_to": {"agent6": {}}},
+        },
+    }
+    sdk.ConnectionsApi.v1_network_connections_create_p2_p.side_effect = create_response
+    document_report = report.DocumentReport()
+    assert configure.configure_network_update(
+        mock.Mock(spec=sdk.ApiClient), config, False, report=document_report
+    )
+    assert document_report.pairs_unchanged == 1
+    assert document_report.created == 1
+    assert document_report.connections_configured == 2
+    # The existing connection streams through the create batch of the new one.
+    assert sdk.ConnectionsApi.v1_network_connections_create_p2_p.call_count == 1
+    assert services_mock.call_count == 1
+    services, connections = services_mock.call_args[0][1:]
+    assert [(service.agent_1, service.agent_2) for service in services] == [
+        (1, 2),
+        (5, 6),
+    ]
+    assert [con["agent_connection_group_id"] for con in connections] == [1, 506]
+
+
+def test_update_network__single_pass(
+    api_agents_search, api_agents_get, api_connections, services_mock
+):
+    config = {
+        "topology": "p2p",
+        "state": "present",
+        "connections": {
+            "agent1": {"connect_to": {"agent2": {}}},
+            "agent5": {"connect_to": {"agent6": {}}},
+        },
+    }
+    sdk.ConnectionsApi.v1_network_connections_create_p2_p.side_effect = create_response
+    document_report = report.DocumentReport()
+    # Pairs are counted while they are applied rather than in a pass of their own.
+    with mock.patch.object(
+        resolve.PresentPairs, "links", side_effect=AssertionError("second pass")
+    ):
+        assert configure.configure_network_update(
+            mock.Mock(spec=sdk.ApiClient), config, False, report=document_report
+        )
+    assert document_report.pairs_planned == 2
+    assert document_report.pairs_unchanged == 1
+    assert document_report.pairs_to_create == 1
+
+
+def test_update_network__snapshot(
+    api_agents_search, api_agents_get, api_connections, p2p_connections, services_mock
+):
+    config = {
+        "topology": "p2p",
+        "state": "present",
+        "connections": {
+            "agent1": {"state": "absent", "connect_to": {"agent2": {}}},
+            "agent5": {"connect_to": {"agent6": {}}},
+        },
+    }
+    sdk.ConnectionsApi.v1_network_connections_create_p2_p.side_effect = create_response
+    snapshot = watch.ConnectionSnapshot(p2p_connections)
+    sdk.ConnectionsApi.v1_network_connections_search.reset_mock()
+    assert configure.configure_network_update(
+        mock.Mock(spec=sdk.ApiClient), config, False, snapshot=snapshot
+    )
+    # Known changes are applied to the snapshot without searching for them.
+    sdk.ConnectionsApi.v1_network_connections_search.assert_not_called()
+    assert sorted(snapshot.connections) == [2, 506]
+    assert snapshot.connections[506]["agent_1"]["agent_name"] == "auto gen 5"
+
+
+@pytest.mark.parametrize(
+    "destination, concurrent",
+    [
+        ["agent6", True],
+        ["agent2", False],
+    ],
+)
+def test_update_network__concurrent_phases(
+    api_agents_search,
+    api_agents_get,
+    api_connections,
+    services_mock,
+    destination,
+    concurrent,
+):
+    config = {
+        "topology": "p2p",
+        "state": "present",
+        "connections": {
+            "agent1": {
+                "state": "absent",
+                "connect_to": {
+                    "agent2": {},
+                },
+            },
+            "agent5": {"connect_to": {destination: {}}},
+        },
+    }
+    order = []
+    created = threading.Event()
+
+    def remove(*args, **kwargs):
+        if concurrent:
+            # Creating connections between other agents doesn't wait for deletes.
+            assert created.wait(5)
+        else:
+            time.sleep(0.05)
+        order.append("remove")
+
+    def create(*args, body=None, **kwargs):
+        order.append("create")
+        created.set()
+        return create_response(body=body)
+
+    sdk.ConnectionsApi.v1_network_connections_remove.side_effect = remove
+    sdk.ConnectionsApi.v1_network_connections_create_p2_p.side_effect = create
+    assert configure.configure_network_update(
+        mock.Mock(spec=sdk.ApiClient), config, False
+    )
+    assert order == (["create", "remove"] if concurrent else ["remove", "create"])
+    # Services are fetched once for the only batch of pairs.
+    assert services_mock.call_count == 1
+
+
+def test_update_network__failed_delete(
+    api_agents_search, api_agents_get, api_connections, services_mock
+):
+    config = {
+        "topology": "p2p",
+        "state": "present",
+        "connections": {
+            "agent1": {"state": "absent", "connect_to": {"agent2": {}}},
+            "agent5": {"connect_to": {"agent2": {}}},
+            "agent3": {"connect_to": {"agent6": {}}},
+        },
+    }
+    sdk.ConnectionsApi.v1_network_connections_remove.side_effect = ValueError("failed")
+    sdk.ConnectionsApi.v1_network_connections_create_p2_p.side_effect = create_response
+    with pytest.raises(ValueError, match="failed"):
+        configure.configure_network_update(
+            mock.Mock(spec=sdk.ApiClient), config, False, silent=True
+        )
+    # Only the pair that does not share an endpoint with the failed delete is created.
+    (
+        (_, kwargs),
+    ) = sdk.ConnectionsApi.v1_network_connections_create_p2_p.call_args_list
+    assert [
+        (pair.agent_1_id, pair.agent_2_id) for pair in kwargs["body"].agent_pairs
+    ] == [(3, 6)]
+
+
 def test_update_network__p2m_dry_run(
     api_agents_search, api_agents_get, with_pagination, api_connections
 ):
@@ -445,7 +967,7 @@ def test_update_network__p2m_dry_run(
 
 
 def test_update_network__p2m(
-    api_agents_search, api_agents_get, api_connections, with_pagination, config_mock
+    api_agents_search, api_agents_get, api_connections, with_pagination, services_mock
 ):
     config = {
         "topology": "p2m",
@@ -465,12 +987,12 @@ def test_update_network__p2m(
         configure.configure_network_update(mock.Mock(spec=sdk.ApiClient), config, False)
         == True
     )
-    assert sdk.ConnectionsApi.v1_network_connections_get.call_count == 2
+    assert sdk.ConnectionsApi.v1_network_connections_get.call_count == 1
     assert sdk.ConnectionsApi.v1_network_connections_remove.call_args_list == [
         mock.call(
             mock.ANY,
             body=models.V1NetworkConnectionsRemoveRequest(
-                agent_connection_group_ids=[1, 2],
+                agent_connection_group_ids=[1],
             ),
         ),
     ]
@@ -529,7 +1051,7 @@ def test_update_network__mesh_dry_run(
 
 
 def test_update_network__mesh(
-    api_agents_search, api_agents_get, api_connections, with_pagination, config_mock
+    api_agents_search, api_agents_get, api_connections, with_pagination, services_mock
 ):
     config = {
         "topology": "mesh",
@@ -553,7 +1075,7 @@ def test_update_network__mesh(
         configure.configure_network_update(mock.Mock(spec=sdk.ApiClient), config, False)
         == True
     )
-    assert sdk.ConnectionsApi.v1_network_connections_get.call_count == 2
+    assert sdk.ConnectionsApi.v1_network_connections_get.call_count == 1
     assert sdk.ConnectionsApi.v1_network_connections_remove.call_args_list == [
         mock.call(
             mock.ANY,
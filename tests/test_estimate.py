@@ -0,0 +1,174 @@
+from unittest import mock
+
+import pytest
+import syntropy_sdk as sdk
+
+from syntropynac import estimate, resolve
+
+
+@pytest.fixture
+def index():
+    agents = {
+        i: {
+            "agent_id": i,
+            "agent_name": f"agent{i}",
+            "agent_tags": [
+                {"agent_tag_name": "even" if i % 2 == 0 else "odd"},
+                *([{"agent_tag_name": "small"}] if i < 4 else []),
+            ],
+        }
+        for i in range(20)
+    }
+    return resolve.AgentIndex(agents)
+
+
+@pytest.mark.parametrize(
+    "topology,connections",
+    (
+        (
+            "mesh",
+            {
+                "even": {"type": "tag", "services": ["ssh"]},
+                "small": {"type": "tag", "state": "absent"},
+                "agent1": {"type": "endpoint"},
+                "agent19": {"type": "endpoint", "services": ["web"]},
+            },
+        ),
+        (
+            "p2m",
+            {
+                "agent1": {
+                    "type": "endpoint",
+                    "connect_to": {
+                        "even": {"type": "tag"},
+                        "small": {"type": "tag", "state": "absent"},
+                        "agent3": {"type": "endpoint", "services": ["web"]},
+                    },
+                },
+                "agent5": {
+                    "type": "endpoint",
+                    "state": "absent",
+                    "connect_to": {"odd": {"type": "tag"}},
+                },
+            },
+        ),
+        (
+            "p2p",
+            {
+                "agent1": {
+                    "type": "endpoint",
+                    "connect_to": {"agent2": {"type": "endpoint"}},
+                },
+                "agent3": {
+                    "type": "endpoint",
+                    "state": "absent",
+                    "connect_to": {"agent4": {"type": "endpoint"}},
+                },
+                "agent5": {"type": "endpoint"},
+            },
+        ),
+    ),
+)
+def test_estimate_document__matches_resolve(index, topology, connections):
+    resolvers = {
+        "mesh": resolve.resolve_mesh_connections,
+        "p2m": resolve.resolve_p2m_connections,
+        "p2p": resolve.resolve_p2p_connections,
+    }
+    present, absent, services = resolvers[topology](
+        mock.Mock(spec=sdk.ApiClient), connections, silent=True, index=index
+    )
+    result = estimate.estimate_document(
+        {"topology": topology, "state": "present", "connections": connections},
+        index,
+        latency=1,
+    )
+    assert result.pairs_present == len(present)
+    assert result.pairs_absent == len(absent)
+    assert result.services_update_calls == sum(
+        1
+        for service in services
+        if service.agent_1_service_names or service.agent_2_service_names
+    )
+    assert result.create_calls == 1
+    assert result.delete_calls == 2
+    assert result.duration == result.api_calls
+
+
+def test_estimate_document__mesh_blow_up():
+    index = resolve.AgentIndex(
+        {
+            i: {
+                "agent_id": i,
+                "agent_name": f"agent{i}",
+                "agent_tags": [{"agent_tag_name": "fleet"}],
+            }
+            for i in range(4000)
+        }
+    )
+    result = estimate.estimate_document(
+        {
+            "topology": "mesh",
+            "state": "present",
+            "connections": {"fleet": {"type": "tag"}},
+        },
+        index,
+    )
+    assert (result.endpoints, result.pairs) == (4000, 7998000)
+    assert estimate.over_budget(result, max_pairs=10000) == [
+        "7998000 pairs exceed the budget of 10000."
+    ]
+
+
+def test_estimate_document__absent_and_invalid(index):
+    connections = {
+        "agent1": {"type": "endpoint", "connect_to": {"agent2": {"type": "endpoint"}}},
+        "agent3": {
+            "type": "endpoint",
+            "state": "absent",
+            "connect_to": {"agent4": {"type": "endpoint"}},
+        },
+    }
+    result = estimate.estimate_document(
+        {"topology": "p2p", "state": "absent", "connections": connections}, index
+    )
+    assert (result.pairs_present, result.pairs_absent, result.create_calls) == (0, 1, 0)
+
+    result = estimate.estimate_document({"topology": "star", "state": "present"}, index)
+    assert result.error == "Network topology star not supported."
+    assert result.pairs == 0
+
+
+def test_estimate_documents(index):
+    documents = [
+        {
+            "topology": "mesh",
+            "state": "present",
+            "connections": {"odd": {"type": "tag"}},
+        },
+        {
+            "name": "b",
+            "topology": "mesh",
+            "state": "present",
+            "connections": {"small": {"type": "tag"}},
+        },
+    ]
+    estimates, total = estimate.estimate_documents(documents, index)
+    assert [i.index for i in estimates] == [0, 1]
+    assert total.pairs == 45 + 6
+    assert total.api_calls == sum(i.api_calls for i in estimates)
+
+
+@pytest.mark.parametrize(
+    "budgets,count",
+    (
+        ({}, 0),
+        ({"max_pairs": 10, "max_calls": 100, "max_duration": 100}, 0),
+        ({"max_pairs": 9}, 1),
+        ({"max_pairs": 9, "max_calls": 1, "max_duration": 0.1}, 3),
+    ),
+)
+def test_over_budget(budgets, count):
+    result = estimate.Estimate(pairs_present=10, create_calls=1, services_calls=1)
+    result.duration = 0.5
+    assert len(estimate.over_budget(result, **budgets)) == count
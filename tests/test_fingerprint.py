@@ -0,0 +1,81 @@
+from unittest import mock
+
+import pytest
+import syntropy_sdk as sdk
+
+from syntropynac import fingerprint
+
+
+def test_get_agents_fingerprint(
+    api_connections_services, api_services, with_batched_filter
+):
+    result = fingerprint.get_agents_fingerprint(mock.Mock(spec=sdk.ApiClient), [9, 22])
+    assert len(result) == 2
+    assert result.agent_ids == {9, 22}
+    assert sdk.ConnectionsApi.v1_network_connections_search.call_count == 1
+    assert sdk.ConnectionsApi.v1_network_connections_services_get.call_args_list == [
+        mock.call(mock.ANY, filter="1,2", _preload_content=False)
+    ]
+    assert len(result.hexdigest()) == 64
+
+
+def test_get_agents_fingerprint__outside_agents(
+    api_connections_services, api_services, with_batched_filter
+):
+    result = fingerprint.get_agents_fingerprint(mock.Mock(spec=sdk.ApiClient), [9])
+    assert len(result) == 0
+    assert result.hexdigest() == "0" * 64
+    assert sdk.ConnectionsApi.v1_network_connections_services_get.call_count == 0
+
+
+def test_fingerprint__extend(
+    api_connections_services, api_services, with_batched_filter
+):
+    api = mock.Mock(spec=sdk.ApiClient)
+    result = fingerprint.get_agents_fingerprint(api, [9])
+    result.extend(api, [9, 22])
+    assert result == fingerprint.get_agents_fingerprint(api, [9, 22])
+    # Already known agents must not trigger any requests
+    call_count = sdk.ConnectionsApi.v1_network_connections_search.call_count
+    result.extend(api, [22])
+    assert sdk.ConnectionsApi.v1_network_connections_search.call_count == call_count
+
+
+def test_fingerprint__combine(p2p_connection_services):
+    digests = [
+        fingerprint.connection_digest(connection, connection)
+        for connection in p2p_connection_services
+    ]
+    first = fingerprint.Fingerprint([9], {1: digests[0]})
+    second = fingerprint.Fingerprint([22], {2: digests[1], 1: digests[0]})
+    combined = first + second
+    assert len(combined) == 2
+    assert combined.agent_ids == {9, 22}
+    assert combined == fingerprint.Fingerprint([], {2: digests[1], 1: digests[0]})
+    combined.remove(2)
+    assert combined == first
+
+
+@pytest.mark.parametrize("enabled", [True, False])
+def test_connection_digest__subnet_state(p2p_connection_services, enabled):
+    connection = p2p_connection_services[0]
+    changed = {
+        **connection,
+        "agent_connection_subnets": [
+            {**subnet, "agent_connection_subnet_is_enabled": enabled}
+            for subnet in connection["agent_connection_subnets"]
+        ],
+    }
+    assert fingerprint.connection_digest(
+        connection, connection
+    ) != fingerprint.connection_digest(connection, changed)
+    # Subnet order and swapped agents do not matter
+    swapped = {
+        **connection,
+        "agent_1": connection["agent_2"],
+        "agent_2": connection["agent_1"],
+        "agent_connection_subnets": connection["agent_connection_subnets"][::-1],
+    }
+    assert fingerprint.connection_digest(
+        connection, connection
+    ) == fingerprint.connection_digest(swapped, swapped)
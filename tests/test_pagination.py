@@ -0,0 +1,118 @@
+import threading
+import time
+from unittest import mock
+
+import pytest
+import syntropy_sdk as sdk
+
+from syntropynac import pagination
+
+
+class FakeResponse:
+    def __init__(self, data, headers=None):
+        self.data = data
+        self.headers = headers or {}
+
+    def to_dict(self):
+        return {"data": self.data}
+
+
+class FakeList:
+    def __init__(self, count, total_header=False, delay=0.0):
+        self.records = list(range(count))
+        self.total_header = total_header
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def __call__(self, skip=0, take=None, **kwargs):
+        with self.lock:
+            self.calls.append((skip, take, kwargs))
+        if self.delay:
+            # NOTE: Later pages arrive first to check that the order is restored.
+            time.sleep(self.delay / (1 + skip))
+        headers = {"X-Total-Count": str(len(self.records))} if self.total_header else {}
+        return FakeResponse(self.records[skip : skip + take], headers)
+
+
+@pytest.mark.parametrize("count", (0, 5, 10, 11, 57))
+@pytest.mark.parametrize("jobs", (1, 3))
+def test_parallel_pagination(count, jobs):
+    func = FakeList(count, delay=0.01)
+    result = pagination.ParallelPagination(func, jobs=jobs, max_take=10)(
+        _preload_content=False
+    )
+    assert result == {"data": list(range(count))}
+    assert all(kwargs == {"_preload_content": False} for _, _, kwargs in func.calls)
+    # NOTE: At most `jobs` speculative requests are made past the end of the list.
+    assert len(func.calls) <= count // 10 + jobs + 1
+
+
+def test_parallel_pagination__total_count():
+    func = FakeList(57, total_header=True)
+    paginator = pagination.ParallelPagination(func, jobs=4, max_take=10)
+    assert paginator()["data"] == list(range(57))
+    assert sorted(skip for skip, _, _ in func.calls) == [0, 10, 20, 30, 40, 50]
+
+
+def test_parallel_pagination__skip_take():
+    func = FakeList(57)
+    paginator = pagination.ParallelPagination(func, jobs=2, max_take=10)
+    assert paginator(skip=5, take=23)["data"] == list(range(5, 28))
+    assert paginator(take=20)["data"] == list(range(20))
+
+
+def test_parallel_pagination__streams_pages():
+    func = FakeList(35)
+    pages = pagination.ParallelPagination(func, jobs=2, max_take=10).iter_pages()
+    assert next(pages) == list(range(10))
+    assert len(func.calls) == 1
+    assert list(pages) == [
+        list(range(10, 20)),
+        list(range(20, 30)),
+        list(range(30, 35)),
+    ]
+
+
+def test_parallel_pagination__error():
+    def func(skip=0, take=None, **kwargs):
+        if skip == 20:
+            raise ValueError("page failed")
+        return FakeResponse(list(range(skip, skip + take)))
+
+    records = pagination.ParallelPagination(func, jobs=2, max_take=10).iter_records()
+    with pytest.raises(ValueError):
+        list(records)
+
+
+@pytest.mark.parametrize(
+    "headers,expected",
+    (
+        (None, None),
+        ({}, None),
+        ({"X-Total-Count": "42"}, 42),
+        ({"X-Total-Count": "many"}, None),
+    ),
+)
+def test_total_count(headers, expected):
+    assert pagination.total_count(FakeResponse([], headers)) == expected
+
+
+def test_search_agents_connections():
+    records = FakeList(250)
+
+    def search(_, body=None, **kwargs):
+        assert body.filter.agent_id == [1, 2]
+        return records(skip=body.skip, take=body.take, **kwargs)
+
+    with mock.patch.object(
+        sdk.ConnectionsApi,
+        "v1_network_connections_search",
+        autospec=True,
+        side_effect=search,
+    ):
+        result = pagination.search_agents_connections(
+            mock.Mock(spec=sdk.ApiClient), {2, 1}, jobs=2
+        )
+    # Results beyond the first page are not dropped.
+    assert result == list(range(250))
@@ -0,0 +1,64 @@
+from concurrent.futures import Future
+from unittest import mock
+
+import syntropy_sdk as sdk
+
+from syntropynac import configure, prefetch, watch
+
+
+def test_endpoint_lookups():
+    config = {
+        "topology": "p2m",
+        "state": "present",
+        "connections": {
+            "agent1": {
+                "type": "endpoint",
+                "connect_to": {
+                    "iot": {"type": "tag"},
+                    "agent2": {"type": "endpoint", "id": 2},
+                    "3": {"type": "id"},
+                    "agent4": {"type": "endpoint", "state": "absent"},
+                },
+            },
+        },
+    }
+    assert prefetch.endpoint_lookups(config) == ({"agent1", "agent4"}, {"iot"})
+    assert prefetch.endpoint_lookups({**config, "state": "gone"}) == (set(), set())
+
+
+def test_prefetch(api_agents_get, api_agents_search, api_connections, all_agents):
+    api = sdk.ApiClient()
+    with prefetch.Prefetch(api) as reads:
+        reads.discover(
+            {
+                "topology": "p2m",
+                "state": "present",
+                "connections": {
+                    "agent1": {
+                        "type": "endpoint",
+                        "connect_to": {"iot": {"type": "tag"}},
+                    },
+                },
+            }
+        )
+        assert reads.agents == all_agents
+        assert reads.resolve_name("agent1") == [1]
+        assert reads.resolve_name("agent2") == [2]
+        assert [agent["agent_id"] for agent in reads.resolve_tag("iot")] == [
+            30,
+            31,
+            32,
+        ]
+        snapshot = watch.ConnectionSnapshot(reads.connections)
+        assert (
+            snapshot.get_connections() == configure.get_all_connections(api)()["data"]
+        )
+    # NOTE: Discovered lookups are made once, in the background.
+    assert api_agents_search.call_count == 3
+
+
+def test_connection_snapshot__future(p2p_connections):
+    future = Future()
+    snapshot = watch.ConnectionSnapshot(future)
+    future.set_result(p2p_connections)
+    assert snapshot.get_connections() == p2p_connections
@@ -0,0 +1,88 @@
+import os
+import pstats
+import threading
+import time
+
+from syntropynac import profiling
+
+
+def test_phase__disabled():
+    with profiling.phase("noop"):
+        pass
+    assert profiling._profiler is None
+
+
+def test_profile_run(capsys):
+    @profiling.timed("inner")
+    def inner():
+        time.sleep(0.001)
+
+    with profiling.profile_run() as profiler:
+        with profiling.phase("outer"):
+            inner()
+            inner()
+        inner()
+
+    assert profiling._profiler is None
+    assert [(row["phase"], row["calls"]) for row in profiler.summary()] == [
+        ("total", 1),
+        ("total/outer", 1),
+        ("total/outer/inner", 2),
+        ("total/inner", 1),
+    ]
+    assert all(row["wall"] > 0 for row in profiler.summary())
+    assert "outer" in capsys.readouterr().err
+
+
+def test_profile_run__output(tmp_path, capsys):
+    def worker():
+        pass
+
+    output = str(tmp_path / "run")
+    with profiling.profile_run(False, output):
+        with profiling.phase("busy"):
+            end = time.perf_counter() + 0.05
+            while time.perf_counter() < end:
+                pass
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+
+    # Functions run by other threads are profiled too.
+    functions = pstats.Stats(f"{output}.pstats").stats
+    assert any(name == "worker" for _, _, name in functions)
+    # The phases are only printed with --profile.
+    assert capsys.readouterr().err == ""
+    with open(f"{output}.collapsed") as f:
+        lines = f.read().splitlines()
+    assert lines
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("test_profile_run__output" in line for line in lines)
+
+
+def test_inherit():
+    with profiling.collect_phases() as collected:
+        with profiling.phase("outer"):
+
+            def worker():
+                with profiling.phase("inner"):
+                    pass
+
+            thread = threading.Thread(target=profiling.inherit(worker))
+            thread.start()
+            thread.join()
+    assert [row["phase"] for row in collected.summary()] == ["outer", "outer/inner"]
+
+
+def test_collect_phases(capsys):
+    with profiling.profile_run() as profiler:
+        with profiling.phase("outer"):
+            with profiling.collect_phases() as collected:
+                with profiling.phase("inner"):
+                    pass
+    assert [row["phase"] for row in collected.summary()] == ["inner"]
+    assert [row["phase"] for row in profiler.summary()] == [
+        "total",
+        "total/outer",
+        "total/outer/inner",
+    ]
@@ -0,0 +1,87 @@
+import io
+from unittest import mock
+
+import pytest
+
+from syntropynac import concurrency, progress
+
+
+@pytest.fixture
+def stream():
+    stream = io.StringIO()
+    yield stream
+    progress.stop()
+
+
+def test_task__disabled():
+    progress.stop()
+    with progress.task("create", 10) as task:
+        task.advance(10)
+    assert task is progress.NOOP_TASK
+
+
+def test_task__off(stream):
+    assert progress.start(progress.OFF, stream=stream) is None
+    assert progress.task("create", 10) is progress.NOOP_TASK
+
+
+def test_task__log(stream):
+    progress.start(progress.LOG, interval=0, stream=stream)
+    api = mock.Mock(limiter=concurrency.AIMDLimiter(4))
+    api.limiter.acquire()
+    with progress.task("create", 4, api) as task:
+        task.advance()
+        task.advance(3)
+
+    lines = stream.getvalue().splitlines()
+    assert lines[0].startswith("create: 1/4 (25%), ")
+    assert "1 in flight" in lines[0]
+    assert "ETA" in lines[0]
+    assert lines[-1].startswith("create: 4/4 (100%), ")
+    assert "done in 0s" in lines[-1]
+
+
+def test_task__tty(stream):
+    progress.start(progress.TTY, interval=0, stream=stream)
+    with progress.task("delete", 2) as task:
+        task.advance()
+        task.advance()
+    output = stream.getvalue()
+    assert output.startswith("\rdelete: 1/2 (50%)")
+    assert output.count("\r") == 3
+    assert output.endswith("\n")
+    assert "in flight" not in output
+
+
+def test_task__rate_limited(stream):
+    progress.start(progress.LOG, interval=60, stream=stream)
+    with progress.task("configure services", 1000) as task:
+        for _ in range(1000):
+            task.advance()
+    # NOTE: Phases shorter than the interval are not shown at all.
+    assert stream.getvalue() == ""
+
+
+def test_start__auto(stream):
+    assert progress.start(progress.AUTO, stream=stream).tty is False
+    assert progress._reporter.interval == progress.LOG_INTERVAL
+    with mock.patch.object(stream, "isatty", return_value=True):
+        assert progress.start(progress.AUTO, stream=stream).tty is True
+    assert progress._reporter.interval == progress.TTY_INTERVAL
+
+
+def test_task__rate():
+    reporter = progress.Reporter(False, 60, io.StringIO())
+    task = reporter.task("create", 100)
+    with mock.patch("time.monotonic", return_value=task.start + 2):
+        task.advance(10)
+    assert task.rate(task.start + 2) == pytest.approx(5)
+    assert "ETA 18s" in task.describe(task.start + 2)
+
+
+@pytest.mark.parametrize(
+    "seconds,expected",
+    ((0.4, "0s"), (59, "59s"), (61, "1m01s"), (3600 + 120, "1h02m")),
+)
+def test_format_duration(seconds, expected):
+    assert progress.format_duration(seconds) == expected
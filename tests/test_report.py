@@ -0,0 +1,68 @@
+import json
+from unittest import mock
+
+import pytest
+import syntropy_sdk as sdk
+
+from syntropynac import profiling, report, stats
+
+
+def test_document_report__measure():
+    api = mock.Mock(spec=sdk.ApiClient)
+    api_stats = stats.ApiStats()
+    api_stats.record("v1_network_agents_get", 0.1, 10, 100, 200)
+    api.stats = api_stats
+
+    document = report.DocumentReport(index=0)
+    with document.measure(api):
+        with profiling.phase("fetch"):
+            api_stats.record("v1_network_connections_get", 0.1, 20, 300, 200)
+            api_stats.record("v1_network_connections_get", 0.1, 20, 500, 200)
+        with profiling.phase("diff"):
+            with profiling.phase("inner"):
+                pass
+
+    assert (document.api_calls, document.request_bytes, document.response_bytes) == (
+        2,
+        40,
+        800,
+    )
+    assert list(document.phases) == ["fetch", "diff", "diff/inner"]
+    assert document.duration >= document.phases["fetch"]
+    assert document.error is None
+
+
+def test_document_report__error():
+    document = report.DocumentReport()
+    with pytest.raises(ValueError):
+        with document.measure(mock.Mock(spec=sdk.ApiClient)):
+            raise ValueError("broken")
+    assert document.error == "broken"
+
+
+def test_run_report(tmp_path, capsys):
+    run = report.RunReport()
+    first = run.add(0, {"name": "a", "topology": "p2p", "state": "present"})
+    first.pairs_planned, first.created, first.api_calls = 3, 2, 4
+    second = run.add(1, ["invalid"])
+    second.error = "Skipped"
+    first.subnets_toggled = 1
+    run.services_updated(2, 5)
+
+    summary = run.summary()
+    assert summary["total"]["documents"] == 2
+    assert summary["total"]["errors"] == 1
+    assert summary["total"]["pairs_planned"] == 3
+    assert summary["total"]["created"] == 2
+    assert summary["total"]["api_calls"] == 4
+    assert summary["total"]["subnets_toggled"] == 6
+    assert summary["total"]["services_updates"] == 2
+    assert summary["documents"][0]["name"] == "a"
+    assert summary["documents"][0]["topology"] == "p2p"
+    assert summary["documents"][1]["error"] == "Skipped"
+
+    path = tmp_path / "report.json"
+    run.write(str(path))
+    assert json.loads(path.read_text())["documents"] == summary["documents"]
+    run.write("-")
+    assert json.loads(capsys.readouterr().err)["total"]["documents"] == 2
@@ -1,9 +1,12 @@
+import io
+import json
 from unittest import mock
 
 import pytest
 import syntropy_sdk as sdk
+import urllib3
 
-from syntropynac import exceptions, resolve
+from syntropynac import exceptions, resolve, tracing
 
 
 @pytest.fixture
@@ -44,6 +47,95 @@ def test_resolve_present_absent(config_connections):
     )
 
 
+def test_resolve_present_absent__lazy(config_connections):
+    agents = {f"agent {i}": i for i in range(5)}
+    config_connections = list(config_connections.items())
+    present = [
+        (config_connections[0], config_connections[1]),
+        (config_connections[2], config_connections[0]),
+        (config_connections[3], config_connections[4]),
+    ]
+    absent = [(config_connections[0], config_connections[2])]
+    pairs, absent_ids = resolve.resolve_present_absent(
+        agents, present, absent, lazy=True
+    )
+    assert isinstance(pairs, resolve.PresentPairs)
+    assert absent_ids == [[0, 2]]
+    assert len(pairs) == 2
+    assert list(pairs.links()) == [[0, 1], [3, 4]]
+    # Pairs are resolved again on every iteration.
+    assert (
+        list(pairs)
+        == list(pairs)
+        == [
+            ([0, 1], resolve.ConnectionServices(0, 1, ["a", "b"], ["b", "c"])),
+            ([3, 4], resolve.ConnectionServices(3, 4, ["f", "g"], ["h", "i"])),
+        ]
+    )
+
+
+def test_resolve_present_absent__span(config_connections):
+    agents = {f"agent {i}": i for i in range(5)}
+    config_connections = list(config_connections.items())
+    present = [(config_connections[0], config_connections[1])]
+    absent = [(config_connections[0], config_connections[2])]
+    tracer = tracing.start()
+    try:
+        with tracing.span("resolve config"):
+            resolve.resolve_present_absent(agents, present, absent, lazy=True)
+    finally:
+        tracing.stop()
+    events = {event["name"]: event for event in tracer.events}
+    assert events["pairs"]["args"] == {"present": 1, "absent": 1}
+    assert events["resolve config"]["args"] == {}
+
+
+def test_connection_services():
+    services = resolve.ConnectionServices(1, 2, ["a"], [])
+    assert services == resolve.ConnectionServices(1, 2, ["a"], [])
+    assert services != resolve.ConnectionServices(1, 2, ["a"], ["b"])
+    assert not hasattr(services, "__dict__")
+    assert repr(services) == (
+        "ConnectionServices(agent_1=1, agent_2=2, "
+        "agent_1_service_names=['a'], agent_2_service_names=[])"
+    )
+
+
+def test_connection_services__get_subnets():
+    agents = {
+        1: {
+            "agent_id": 1,
+            "agent_services": [
+                {
+                    "agent_service_name": "a",
+                    "agent_service_subnets": [
+                        {"agent_service_subnet_id": 10},
+                        {"agent_service_subnet_id": 11},
+                    ],
+                },
+                {
+                    "agent_service_name": "b",
+                    "agent_service_subnets": [{"agent_service_subnet_id": 12}],
+                },
+            ],
+        },
+        2: {"agent_id": 2, "agent_services": []},
+    }
+    cache = resolve.SubnetCache()
+    assert resolve.ConnectionServices(1, 2, ["b", "a"], []).get_subnets(
+        1, agents, cache
+    ) == [10, 11, 12]
+    assert resolve.ConnectionServices(2, 1, [], ["b"]).get_subnets(
+        2, agents, cache
+    ) == [12]
+    # Subnets of the same agent and service names are computed once.
+    agents[1]["agent_services"] = []
+    assert resolve.ConnectionServices(1, 3, ["b", "a"], []).get_subnets(
+        1, agents, cache
+    ) == [10, 11, 12]
+    assert resolve.ConnectionServices(1, 3, ["b", "a"], []).get_subnets(1, agents) == []
+
+
 def test_resolve_present_absent__no_services():
     agents = {f"agent {i}": i for i in range(5)}
     present = [
@@ -455,6 +547,44 @@ def test_resolve_mesh_connections(api_connections, api_agents_search, with_pagin
     )
 
 
+def test_resolve_mesh_connections__lazy(
+    api_connections, api_agents_search, with_pagination
+):
+    connections = {
+        "agent1": {"services": "a"},
+        "agent2": {"services": "b"},
+        "3": {"type": "id", "services": "c"},
+        "agent4": {"state": "absent"},
+    }
+    pairs, absent = resolve.resolve_mesh_connections(
+        mock.Mock(spec=sdk.ApiClient), connections, lazy=True
+    )
+    # Mesh pairs are generated while iterating rather than listed upfront.
+    assert isinstance(pairs.present, resolve.MeshPairs)
+    assert len(pairs.present) == 3
+    assert list(pairs.links()) == [[1, 2], [1, 3], [2, 3]]
+    assert absent == [[1, 4], [2, 4], [3, 4]]
+
+
+def test_mesh_pairs():
+    endpoints = [
+        ("a", {}),
+        ("b", {"state": "invalid"}),
+        ("c", {"state": "present"}),
+        ("d", {"state": "invalid"}),
+    ]
+    pairs = resolve.MeshPairs(endpoints)
+    # Pairs of two endpoints with invalid states are left out.
+    assert [(src[0], dst[0]) for src, dst in pairs] == [
+        ("a", "b"),
+        ("a", "c"),
+        ("a", "d"),
+        ("b", "c"),
+        ("c", "d"),
+    ]
+    assert len(pairs) == 5
+
+
 def test_resolve_mesh_connections__tag(
     api_connections, api_agents_search, with_pagination
 ):
@@ -503,3 +633,74 @@ def test_resolve_mesh_connections__tags_not_found(api_connections):
             [],
         )
         the_mock.assert_called_once()
+
+
+def test_resolve_mesh_connections__index():
+    index = resolve.AgentIndex(
+        {
+            1: {"agent_id": 1, "agent_name": "agent1", "agent_tags": []},
+            2: {
+                "agent_id": 2,
+                "agent_name": "agent2",
+                "agent_tags": [{"agent_tag_name": "iot"}],
+            },
+            3: {
+                "agent_id": 3,
+                "agent_name": "agent3",
+                "agent_tags": [{"agent_tag_name": "iot"}],
+            },
+        }
+    )
+    connections = {
+        "agent1": {"services": "a"},
+        "iot": {"type": "tag", "services": "b"},
+    }
+    with mock.patch.object(
+        sdk.AgentsApi, "v1_network_agents_search", autospec=True
+    ) as the_mock:
+        assert resolve.resolve_mesh_connections(
+            mock.Mock(spec=sdk.ApiClient), connections, index=index
+        ) == (
+            [[2, 3], [2, 1], [3, 1]],
+            [],
+            [
+                resolve.ConnectionServices(2, 3, ["b"], ["b"]),
+                resolve.ConnectionServices(2, 1, ["b"], ["a"]),
+                resolve.ConnectionServices(3, 1, ["b"], ["a"]),
+            ],
+        )
+        the_mock.assert_not_called()
+
+
+def raw_response(payload):
+    return urllib3.HTTPResponse(
+        body=io.BytesIO(json.dumps(payload).encode()),
+        status=200,
+        preload_content=False,
+    )
+
+
+def test_resolve_agent_by_name__raw_response():
+    with mock.patch.object(
+        sdk.AgentsApi,
+        "v1_network_agents_search",
+        autospec=True,
+        return_value=raw_response({"data": [{"agent_id": 5, "agent_name": "a"}]}),
+    ) as search:
+        assert resolve.resolve_agent_by_name.__wrapped__(
+            mock.Mock(spec=sdk.ApiClient), "a"
+        ) == [5]
+    assert search.call_args[1]["_preload_content"] is False
+
+
+def test_expand_agents_tags__raw_response():
+    with mock.patch.object(
+        sdk.AgentsApi,
+        "v1_network_agents_search",
+        autospec=True,
+        return_value=raw_response({"data": [{"agent_id": 5, "agent_name": "a"}]}),
+    ) as search:
+        assert resolve.expand_agents_tags(
+            mock.Mock(spec=sdk.ApiClient), {"tag": {"type": "tag"}}
+        ) == {"a": {"id": 5, "state": "present", "type": "endpoint", "services": None}}
+    assert search.call_args[1]["_preload_content"] is False
@@ -0,0 +1,147 @@
+import gzip
+import io
+import json
+import socket
+from unittest import mock
+
+import syntropy_sdk as sdk
+import urllib3
+from syntropy_sdk import models
+
+from syntropynac import session
+
+
+class FakeResponse:
+    def __init__(self, data=b'{"data": []}', status=200):
+        self.data = data
+        self.status = status
+        self.reason = "OK"
+
+    def getheaders(self):
+        return {}
+
+    def getheader(self, name, default=None):
+        return default
+
+
+def make_config():
+    config = sdk.Configuration()
+    config.host = "http://server"
+    return config
+
+
+def test_session_settings__defaults():
+    settings = session.SessionSettings()
+    assert settings.jobs == session.DEFAULT_JOBS
+    assert settings.pool_size == session.DEFAULT_POOL_SIZE
+    assert settings.pool_maxsize == session.DEFAULT_JOBS + session.POOL_HEADROOM
+    assert settings.timeout is None
+
+    settings = session.SessionSettings(jobs=16, read_timeout=5)
+    assert settings.pool_maxsize == 16 + session.POOL_HEADROOM
+    assert settings.timeout == (None, 5)
+
+
+def test_create_api_client(api_lock_fix):
+    settings = session.SessionSettings(jobs=8, pool_size=2)
+    api = session.create_api_client(make_config(), settings)
+
+    pool_manager = api.rest_client.pool_manager
+    assert pool_manager.connection_pool_kw["maxsize"] == 10
+    assert pool_manager.pools._maxsize == 2
+    assert (
+        socket.SOL_SOCKET,
+        socket.SO_KEEPALIVE,
+        1,
+    ) in pool_manager.connection_pool_kw["socket_options"]
+    assert session.get_settings(api) is settings
+    assert "Connection" not in api.default_headers
+
+
+def test_create_api_client__no_keepalive(api_lock_fix):
+    api = session.create_api_client(
+        make_config(), session.SessionSettings(keepalive=False)
+    )
+    assert api.default_headers["Connection"] == "close"
+
+
+def test_create_api_client__timeout(api_lock_fix):
+    api = session.create_api_client(
+        make_config(), session.SessionSettings(connect_timeout=1, read_timeout=5)
+    )
+    with mock.patch.object(
+        api.rest_client, "request", autospec=True, return_value=FakeResponse()
+    ) as the_mock:
+        sdk.AgentsApi(api).v1_network_agents_get(_preload_content=False)
+        assert the_mock.call_args[1]["_request_timeout"] == (1, 5)
+
+        sdk.AgentsApi(api).v1_network_agents_get(
+            _preload_content=False, _request_timeout=30
+        )
+        assert the_mock.call_args[1]["_request_timeout"] == 30
+
+
+def test_create_api_client__compression(api_lock_fix):
+    api = session.create_api_client(make_config())
+    with mock.patch.object(
+        api.rest_client, "request", autospec=True, return_value=FakeResponse()
+    ) as the_mock:
+        sdk.AgentsApi(api).v1_network_agents_get(_preload_content=False)
+        assert the_mock.call_args[1]["headers"]["Accept-Encoding"] == "gzip"
+
+        sdk.AgentsApi(api).v1_network_agents_search(
+            body=models.V1NetworkAgentsSearchRequest(
+                filter=models.V1AgentFilter(agent_name="agent")
+            ),
+            _preload_content=False,
+        )
+        assert the_mock.call_args[1]["headers"]["Accept-Encoding"] == "gzip"
+
+        sdk.ConnectionsApi(api).v1_network_connections_create_p2_p(
+            body=models.V1NetworkConnectionsCreateP2PRequest(agent_pairs=[]),
+        )
+        assert "Accept-Encoding" not in the_mock.call_args[1]["headers"]
+
+
+def test_create_api_client__no_compression(api_lock_fix):
+    api = session.create_api_client(
+        make_config(), session.SessionSettings(compression=False)
+    )
+    with mock.patch.object(
+        api.rest_client, "request", autospec=True, return_value=FakeResponse()
+    ) as the_mock:
+        sdk.AgentsApi(api).v1_network_agents_get(_preload_content=False)
+        assert "Accept-Encoding" not in the_mock.call_args[1]["headers"]
+
+
+def test_create_api_client__decodes_compressed(api_lock_fix):
+    api = session.create_api_client(make_config())
+    payload = {"data": [{"agent_id": 1}]}
+    response = urllib3.HTTPResponse(
+        body=io.BytesIO(gzip.compress(json.dumps(payload).encode())),
+        headers={"Content-Encoding": "gzip", "Content-Type": "application/json"},
+        status=200,
+        preload_content=False,
+    )
+    with mock.patch.object(
+        api.rest_client.pool_manager, "request", autospec=True, return_value=response
+    ):
+        result = sdk.AgentsApi(api).v1_network_agents_get(_preload_content=False)
+    assert sdk.utils.deserialize_result(result) == payload
+
+
+def test_get_settings__defaults():
+    assert session.get_settings(mock.Mock(spec=sdk.ApiClient)).jobs == (
+        session.DEFAULT_JOBS
+    )
+
+
+def test_connect(api_lock_fix, login_mock):
+    login_mock.return_value = "token"
+    settings = session.SessionSettings(jobs=2)
+    api = session.connect("http://server", "api token", settings=settings)
+
+    login_mock.assert_called_once_with("http://server", "api token")
+    assert api.configuration.api_key["Authorization"] == "Bearer token"
+    assert session.get_settings(api) is settings
+    assert api.stats.calls == 0
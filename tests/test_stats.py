@@ -0,0 +1,116 @@
+import gzip
+import io
+import json
+from unittest import mock
+
+import pytest
+import syntropy_sdk as sdk
+import urllib3
+from syntropy_sdk import models
+from syntropy_sdk.rest import ApiException, RESTResponse
+
+from syntropynac import stats
+
+
+class FakeResponse:
+    def __init__(self, data=b'{"data": []}', status=200):
+        self.data = data
+        self.status = status
+        self.reason = "OK"
+
+    def getheaders(self):
+        return {}
+
+    def getheader(self, name, default=None):
+        return default
+
+
+@pytest.fixture
+def api(api_lock_fix):
+    config = sdk.Configuration()
+    config.host = "http://server"
+    api = sdk.ApiClient(config)
+    with mock.patch.object(api.rest_client, "request", autospec=True) as the_mock:
+        the_mock.return_value = FakeResponse()
+        yield api
+
+
+def test_install(api):
+    api_stats = stats.install(api)
+    assert stats.get_stats(api) is api_stats
+
+    sdk.AgentsApi(api).v1_network_agents_get(_preload_content=False)
+    sdk.AgentsApi(api).v1_network_agents_get(take=10)
+    sdk.ConnectionsApi(api).v1_network_connections_search(
+        body=models.V1NetworkConnectionsSearchRequest(
+            filter=models.V1ConnectionFilter(agent_id=[1, 2]),
+        ),
+    )
+
+    summary = api_stats.summary()
+    assert api_stats.calls == 3
+    assert summary["total"]["calls"] == 3
+    assert summary["total"]["response_bytes"] == 3 * len(b'{"data": []}')
+    assert sorted(summary["endpoints"]) == [
+        "v1_network_agents_get",
+        "v1_network_connections_search",
+    ]
+    agents_get = summary["endpoints"]["v1_network_agents_get"]
+    assert agents_get["calls"] == 2
+    assert agents_get["errors"] == 0
+    assert agents_get["statuses"] == {"200": 2}
+    assert sum(agents_get["latency"]["histogram_ms"].values()) == 2
+    search = summary["endpoints"]["v1_network_connections_search"]
+    assert search["request_bytes"] > len('{"filter": {"agent_id": [1, 2]}}')
+
+
+def test_install__retries(api):
+    api_stats = stats.install(api)
+    api.rest_client.request.side_effect = [
+        ApiException(status=503, reason="Unavailable"),
+        FakeResponse(),
+    ]
+
+    with pytest.raises(ApiException):
+        sdk.AgentsApi(api).v1_network_agents_get()
+    sdk.AgentsApi(api).v1_network_agents_get()
+
+    summary = api_stats.summary()["endpoints"]["v1_network_agents_get"]
+    assert summary["calls"] == 2
+    assert summary["errors"] == 1
+    # Only the retry layer accounts retries, see `concurrency.install`.
+    assert summary["retries"] == 0
+    assert summary["statuses"] == {"503": 1, "200": 1}
+
+
+def test_install__compressed_size(api):
+    body = gzip.compress(b'{"data": []}' * 100)
+    raw = urllib3.HTTPResponse(
+        body=io.BytesIO(body), headers={"Content-Encoding": "gzip"}, status=200
+    )
+    api.rest_client.request.return_value = RESTResponse(raw)
+    api_stats = stats.install(api)
+
+    sdk.AgentsApi(api).v1_network_agents_get(_preload_content=False)
+
+    # Bytes received are accounted rather than the decoded body.
+    assert api_stats.summary()["total"]["response_bytes"] == len(body)
+
+
+def test_write(tmp_path, capsys):
+    api_stats = stats.ApiStats()
+    api_stats.record("v1_network_agents_get", 0.02, 10, 100, 200)
+    api_stats.record_retry("v1_network_agents_get")
+
+    api_stats.write(str(tmp_path / "stats.json"))
+    with open(tmp_path / "stats.json") as f:
+        summary = json.load(f)
+    assert summary["total"]["calls"] == 1
+    assert summary["total"]["retries"] == 1
+    assert (
+        summary["endpoints"]["v1_network_agents_get"]["latency"]["histogram_ms"]["25"]
+        == 1
+    )
+
+    api_stats.write("-")
+    assert json.loads(capsys.readouterr().err) == summary
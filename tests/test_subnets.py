@@ -0,0 +1,134 @@
+import random
+
+import pytest
+
+from syntropynac import resolve, subnets
+
+
+def agent(agent_id, services):
+    return {
+        "agent_id": agent_id,
+        "agent_services": [
+            {
+                "agent_service_name": name,
+                "agent_service_subnets": [
+                    {"agent_service_subnet_id": subnet_id} for subnet_id in ids
+                ],
+            }
+            for name, ids in services.items()
+        ],
+    }
+
+
+def connection(agent_1, agent_2, current):
+    return {
+        "agent_connection_group_id": 1,
+        "agent_1": agent_1,
+        "agent_2": agent_2,
+        "agent_connection_subnets": [
+            {
+                "agent_service_subnet_id": subnet_id,
+                "agent_connection_subnet_is_enabled": enabled,
+            }
+            for subnet_id, enabled in current
+        ],
+    }
+
+
+def random_pairs(count, seed=0):
+    rng = random.Random(seed)
+    pairs = []
+    for index in range(count):
+        services_1 = {f"s{i}": [index * 10 + i] for i in range(3)}
+        services_2 = {f"s{i}": [index * 10 + 5 + i] for i in range(3)}
+        ids = [i for ids in [*services_1.values(), *services_2.values()] for i in ids]
+        current = [(i, rng.random() < 0.5) for i in ids if rng.random() < 0.7]
+        rng.shuffle(current)
+        config = resolve.ConnectionServices(
+            index * 2,
+            index * 2 + 1,
+            rng.sample(sorted(services_1), rng.randint(0, 3)),
+            rng.sample(sorted(services_2), rng.randint(0, 3)),
+        )
+        pairs.append(
+            (
+                config,
+                connection(
+                    agent(index * 2, services_1),
+                    agent(index * 2 + 1, services_2),
+                    current,
+                ),
+            )
+        )
+    return pairs
+
+
+def test_diff():
+    config = resolve.ConnectionServices(1, 2, ["a", "b"], ["c"])
+    pairs = [
+        (
+            config,
+            connection(
+                agent(1, {"a": [5], "b": [3]}),
+                agent(2, {"c": [7], "d": [9]}),
+                [(9, True), (5, False), (3, True), (1, False)],
+            ),
+        ),
+        (
+            resolve.ConnectionServices(3, 4, ["a"], []),
+            connection(agent(3, {}), agent(4, {}), []),
+        ),
+    ]
+    assert subnets.diff(subnets.SubnetStates.collect(pairs), use_numpy=False) == [
+        [(9, False), (5, True), (7, True)],
+        [],
+    ]
+
+
+def test_diff__empty():
+    assert subnets.diff(subnets.SubnetStates.collect([])) == []
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_diff__nothing_desired(use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    config = resolve.ConnectionServices(1, 2, [], [])
+    pairs = [(config, connection(agent(1, {}), agent(2, {}), [(4, True), (3, False)]))]
+    assert subnets.diff(subnets.SubnetStates.collect(pairs), use_numpy=use_numpy) == [
+        [(4, False)]
+    ]
+
+
+def test_diff__numpy_missing(monkeypatch):
+    monkeypatch.setattr(subnets, "numpy", None)
+    states = subnets.SubnetStates.collect(random_pairs(1))
+    with pytest.raises(ImportError):
+        subnets.diff(states, use_numpy=True)
+    assert subnets.diff(states) == subnets.diff(states, use_numpy=False)
+
+
+@pytest.mark.parametrize("count", [1, 50, 500])
+def test_diff__numpy(count):
+    pytest.importorskip("numpy")
+    states = subnets.SubnetStates.collect(random_pairs(count))
+    assert subnets.diff(states, use_numpy=True) == subnets.diff(states, use_numpy=False)
+
+
+def test_services_updates():
+    agent_1 = agent(1, {"a": [5], "b": [3]})
+    agent_2 = agent(2, {"c": [7]})
+    current = connection(agent_1, agent_2, [(5, True), (3, True), (7, False)])
+    other = {
+        **connection(agent_1, agent(4, {}), [(5, True)]),
+        "agent_connection_group_id": 2,
+    }
+    updates = subnets.ServicesUpdates()
+    updates.add(resolve.ConnectionServices(1, 2, ["a"], []), current)
+    # Subnets enabled by any document stay enabled.
+    updates.add(resolve.ConnectionServices(2, 1, ["c"], ["b"]), current)
+    updates.add(resolve.ConnectionServices(1, 4, [], []), other)
+    assert len(updates) == 2
+
+    assert updates.plan() == [(current, [(7, True)]), (other, [(5, False)])]
+    assert len(updates) == 0
@@ -0,0 +1,58 @@
+import json
+import threading
+
+from syntropynac import profiling, tracing
+
+
+def test_span__disabled():
+    assert tracing.span("noop", a=1) is tracing.NOOP_SPAN
+    assert profiling.phase("noop") is tracing.NOOP_SPAN
+    with tracing.span("noop") as span:
+        span.set(b=2)
+    assert tracing.current_span() is tracing.NOOP_SPAN
+
+
+def test_trace(tmp_path):
+    tracer = tracing.start()
+    try:
+        with profiling.phase("configure", topology="P2P") as span:
+            with tracing.span("create p2p", batch_size=10):
+                tracing.current_span().set(created=9)
+            span.set(pairs=10)
+
+        thread = threading.Thread(
+            target=lambda: tracing.span("worker")
+            .__enter__()
+            .__exit__(None, None, None),
+            name="worker-thread",
+        )
+        thread.start()
+        thread.join()
+    finally:
+        assert tracing.stop(str(tmp_path / "trace.json")) is tracer
+
+    with open(tmp_path / "trace.json") as f:
+        trace = json.load(f)
+    events = {
+        event["name"]: event for event in trace["traceEvents"] if event["ph"] == "X"
+    }
+    assert events["configure"]["args"] == {"topology": "P2P", "pairs": 10}
+    assert events["create p2p"]["args"] == {"batch_size": 10, "created": 9}
+    assert events["create p2p"]["ts"] >= events["configure"]["ts"]
+    assert events["create p2p"]["dur"] <= events["configure"]["dur"]
+    assert events["worker"]["tid"] != events["configure"]["tid"]
+    assert {
+        event["args"]["name"] for event in trace["traceEvents"] if event["ph"] == "M"
+    } >= {"worker-thread"}
+
+
+def test_span__error():
+    tracer = tracing.start()
+    try:
+        with tracing.span("failing"):
+            raise ValueError()
+    except ValueError:
+        pass
+    finally:
+        tracing.stop()
+    assert tracer.events[0]["args"] == {"error": "ValueError"}
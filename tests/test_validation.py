@@ -0,0 +1,82 @@
+import pytest
+
+from syntropynac import validation
+
+
+def errors(issues):
+    return [message for severity, message in issues if severity == validation.ERROR]
+
+
+@pytest.mark.parametrize(
+    "config,expected",
+    (
+        ({"topology": "p2p", "state": "present"}, []),
+        ({"topology": "MESH", "state": "absent", "connections": {}}, []),
+        ({"state": "present"}, ["topology and state must be present"]),
+        ({"topology": "p2p", "state": "gone"}, ["Invalid state gone"]),
+        (
+            {"topology": "star", "state": "present"},
+            ["Network topology star not supported."],
+        ),
+        (
+            {"topology": "p2p", "state": "present", "connections": []},
+            ["Field connections must be a dictionary, but found list."],
+        ),
+        (
+            {
+                "topology": "p2p",
+                "state": "present",
+                "connections": {"a": {"type": "id"}, "b": {"type": "fail"}},
+            },
+            [
+                "Endpoint 'a' type is id, however, it appears to be an endpoint.",
+                "Endpoint 'b' type 'fail' is not allowed.",
+            ],
+        ),
+        ([], ["Document must be a dictionary, but found list."]),
+    ),
+)
+def test_document_issues(config, expected):
+    assert errors(validation.document_issues(config)) == expected
+
+
+def test_connection_issues__warnings():
+    issues = list(
+        validation.connection_issues(
+            {"1": {"type": "endpoint", "connect_to": {"b": {"type": "tag"}}}}
+        )
+    )
+    assert issues == [
+        (
+            validation.WARNING,
+            "Endpoint '1' type is endpoint, however, it appears to be an id.",
+        )
+    ]
+    assert list(validation.connection_issues({}, level=2))[0][0] == validation.WARNING
+
+
+def test_validate_file(tmp_path):
+    path = tmp_path / "config.yaml"
+    path.write_text(
+        "topology: p2p\nstate: present\n---\ntopology: p2p\nstate: gone\n---\n"
+    )
+    assert validation.validate_file(str(path)) == (
+        2,
+        [(1, validation.ERROR, "Invalid state gone")],
+    )
+
+    path = tmp_path / "config.json"
+    path.write_text('[{"topology": "p2m", "state": "absent"}]')
+    assert validation.validate_file(str(path)) == (1, [])
+
+
+def test_validate_file__load_errors(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text('{"topology": ')
+    count, ((index, severity, _),) = validation.validate_file(str(path))
+    assert (count, index, severity) == (0, None, validation.ERROR)
+
+    count, ((index, severity, _),) = validation.validate_file(
+        str(tmp_path / "missing.yaml")
+    )
+    assert (count, index, severity) == (0, None, validation.ERROR)
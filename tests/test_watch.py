@@ -0,0 +1,155 @@
+import os
+from unittest import mock
+
+import pytest
+import syntropy_sdk as sdk
+from syntropy_sdk import models
+
+from syntropynac import resolve, watch
+
+
+@pytest.fixture
+def config_mock():
+    with mock.patch(
+        "syntropynac.configure.configure_network", autospec=True
+    ) as the_mock:
+        yield the_mock
+
+
+def write(path, content):
+    with open(path, "w") as f:
+        f.write(content)
+    # Make sure that modification time changes even on coarse filesystems.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+
+
+def test_document_watcher(tmp_path):
+    write(tmp_path / "a.yaml", "name: a\n---\nname: b\n")
+    write(tmp_path / "b.json", '{"name": "c"}')
+    write(tmp_path / "ignored.txt", "name: d")
+    watcher = watch.DocumentWatcher(str(tmp_path))
+
+    assert [(os.path.basename(p), i, d) for p, i, d in watcher.poll()] == [
+        ("a.yaml", 0, {"name": "a"}),
+        ("a.yaml", 1, {"name": "b"}),
+        ("b.json", 0, {"name": "c"}),
+    ]
+    assert watcher.poll() == []
+
+    write(tmp_path / "a.yaml", "name: a\n---\nname: changed\n")
+    assert [(os.path.basename(p), i, d) for p, i, d in watcher.poll()] == [
+        ("a.yaml", 1, {"name": "changed"}),
+    ]
+
+    # Touching a file without changing it does not report anything
+    write(tmp_path / "b.json", '{"name": "c"}')
+    assert watcher.poll() == []
+
+
+def test_document_watcher__parse_error(tmp_path):
+    write(tmp_path / "a.json", '{"name": ')
+    watcher = watch.DocumentWatcher(str(tmp_path))
+    assert watcher.poll(silent=True) == []
+    write(tmp_path / "a.json", '{"name": "a"}')
+    assert [d for _, _, d in watcher.poll()] == [{"name": "a"}]
+
+
+def test_connection_snapshot__refresh(p2p_connections):
+    snapshot = watch.ConnectionSnapshot(p2p_connections)
+    refreshed = {
+        "agent_connection_group_id": 3,
+        "agent_1": {"agent_id": 1, "agent_name": "de-hetzner-db01"},
+        "agent_2": {"agent_id": 5, "agent_name": "other"},
+    }
+    with mock.patch.object(
+        sdk.ConnectionsApi,
+        "v1_network_connections_search",
+        autospec=True,
+        return_value=models.V1NetworkConnectionsSearchResponse(data=[refreshed]),
+    ) as search:
+        snapshot.refresh(mock.Mock(spec=sdk.ApiClient), [1])
+        assert search.call_args[1]["body"].filter.agent_id == [1]
+    assert snapshot.get_connections() == [p2p_connections[1], refreshed]
+
+
+def test_connection_snapshot__apply(p2p_connections, all_agents):
+    snapshot = watch.ConnectionSnapshot(p2p_connections)
+    created = {
+        "agent_connection_group_id": 3,
+        "agent_1": {"agent_id": 1},
+        "agent_2": {"agent_id": 2},
+    }
+    snapshot.apply(
+        created=[created],
+        deleted=[p2p_connections[0]["agent_connection_group_id"]],
+        agents=all_agents,
+    )
+    connections = snapshot.get_connections()
+    assert connections[0] == p2p_connections[1]
+    assert connections[1]["agent_connection_group_id"] == 3
+    # Created connections are completed with agent names for transforming them.
+    assert connections[1]["agent_1"]["agent_name"] == all_agents[1]["agent_name"]
+    assert connections[1]["agent_2"]["agent_name"] == all_agents[2]["agent_name"]
+
+
+@pytest.mark.parametrize("live", (True, False))
+def test_connection_snapshot__update(p2p_connections, live):
+    snapshot = watch.ConnectionSnapshot(p2p_connections, live=live)
+    with mock.patch.object(
+        watch.ConnectionSnapshot, "refresh", autospec=True
+    ) as refresh, mock.patch.object(
+        watch.ConnectionSnapshot, "apply", autospec=True
+    ) as apply:
+        snapshot.update(mock.Mock(spec=sdk.ApiClient), [1], deleted=[2])
+    assert refresh.called == live
+    assert apply.called != live
+
+
+def test_watch(tmp_path, config_mock, p2p_connections, all_agents):
+    write(tmp_path / "a.yaml", "name: a\ntopology: p2p\nstate: present\n")
+    write(tmp_path / "b.yaml", "name: b\n")
+    with mock.patch.object(
+        resolve.AgentIndex, "fetch", return_value=resolve.AgentIndex(all_agents)
+    ), mock.patch.object(
+        watch.ConnectionSnapshot,
+        "fetch",
+        return_value=watch.ConnectionSnapshot(p2p_connections),
+    ):
+        watch.watch(
+            mock.Mock(spec=sdk.ApiClient),
+            str(tmp_path),
+            False,
+            silent=True,
+            iterations=1,
+        )
+    config_mock.assert_called_once_with(
+        mock.ANY,
+        {"name": "a", "topology": "p2p", "state": "present"},
+        False,
+        silent=True,
+        index=mock.ANY,
+        snapshot=mock.ANY,
+    )
+
+
+def test_watch__document_error(tmp_path, config_mock, p2p_connections, all_agents):
+    write(tmp_path / "a.yaml", "name: a\ntopology: p2p\nstate: present\n")
+    write(tmp_path / "b.yaml", "name: b\ntopology: p2p\nstate: present\n")
+    config_mock.side_effect = [KeyError("agent_name"), True]
+    with mock.patch.object(
+        resolve.AgentIndex, "fetch", return_value=resolve.AgentIndex(all_agents)
+    ), mock.patch.object(
+        watch.ConnectionSnapshot,
+        "fetch",
+        return_value=watch.ConnectionSnapshot(p2p_connections),
+    ):
+        watch.watch(
+            mock.Mock(spec=sdk.ApiClient),
+            str(tmp_path),
+            False,
+            silent=True,
+            iterations=1,
+        )
+    # The failing document does not stop the others from being applied.
+    assert [call[0][1]["name"] for call in config_mock.call_args_list] == ["a", "b"]